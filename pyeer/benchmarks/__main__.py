@@ -0,0 +1,9 @@
+# -*- coding:utf-8 -*-
+
+from .suite import run_benchmarks_cmd
+
+__copyright__ = 'Copyright 2017'
+__author__ = u'Bsc. Manuel Aguado Martínez'
+
+
+run_benchmarks_cmd()
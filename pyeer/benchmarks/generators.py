@@ -0,0 +1,211 @@
+# -*- coding:utf-8 -*-
+
+from os.path import join
+
+import numpy as np
+
+__copyright__ = 'Copyright 2017'
+__author__ = u'Bsc. Manuel Aguado Martínez'
+
+
+# Fraction of genuine scores among the generated scores
+GENUINE_RATIO = 0.1
+
+# Highest score of the integer and histogram format cases
+INTEGER_SCORE_LEVELS = 1000
+
+# Score cases accepted by generate_scores
+SCORE_CASES = ('normal', 'ties', 'integer')
+
+
+def generate_scores(size, case='normal', seed=0):
+    """Generates synthetic genuine and impostor scores
+
+    Genuine scores follow a normal distribution N(0.7, 0.1) and impostor
+    scores a normal distribution N(0.3, 0.1), so curves have the usual
+    overlap between both classes.
+
+    - normal: continuous (float64) scores, almost no ties.
+    - ties: scores rounded to two decimals, so every threshold is shared
+      by many scores.
+    - integer: integer (int64) scores in [0, INTEGER_SCORE_LEVELS].
+
+    @param size: The total number of scores
+    @type size: int
+    @param case: The score case (see SCORE_CASES)
+    @type case: str
+    @param seed: Seed of the random scores
+    @type seed: int
+
+    @returns: (genuine scores, impostor scores)
+    @rtype: tuple
+    """
+    if case not in SCORE_CASES:
+        raise ValueError('Unknown score case: %s' % case)
+
+    rng = np.random.default_rng(seed)
+    gnumber = max(1, int(size * GENUINE_RATIO))
+    inumber = max(1, size - gnumber)
+
+    gen_scores = rng.normal(0.7, 0.1, gnumber)
+    imp_scores = rng.normal(0.3, 0.1, inumber)
+
+    if case == 'ties':
+        gen_scores = np.round(gen_scores, 2)
+        imp_scores = np.round(imp_scores, 2)
+    elif case == 'integer':
+        gen_scores = __to_levels(gen_scores)
+        imp_scores = __to_levels(imp_scores)
+
+    return gen_scores, imp_scores
+
+
+def generate_hist_scores(size, seed=0):
+    """Generates synthetic scores with impostor scores in histogram format
+
+    @param size: The total number of scores
+    @type size: int
+    @param seed: Seed of the random scores
+    @type seed: int
+
+    @returns: (genuine integer scores, impostor histogram). The impostor
+        histogram holds the number of impostor scores of each integer
+        value in [0, INTEGER_SCORE_LEVELS].
+    @rtype: tuple
+    """
+    gen_scores, imp_scores = generate_scores(size, 'integer', seed)
+    imp_hist = np.bincount(imp_scores, minlength=INTEGER_SCORE_LEVELS + 1)
+
+    return gen_scores, imp_hist
+
+
+def generate_cmc_scores(size, ds_scores=False, seed=0):
+    """Generates a synthetic gallery/probe identification experiment
+
+    Every probe is compared against every gallery template. Each probe
+    has a single true template, whose score follows the genuine
+    distribution of generate_scores, while the remaining scores follow
+    the impostor distribution.
+
+    @param size: The total number of scores (probes x gallery templates)
+    @type size: int
+    @param ds_scores: Indicates whether to generate dissimilarity scores
+    @type ds_scores: bool
+    @param seed: Seed of the random scores
+    @type seed: int
+
+    @returns: (probes, templates, scores matrix, true template index of
+        each probe)
+    @rtype: tuple
+    """
+    rng = np.random.default_rng(seed)
+    gallery = max(1, int(np.ceil(np.sqrt(size))))
+    probes = max(1, size // gallery)
+
+    scores = rng.normal(0.3, 0.1, (probes, gallery))
+    true_templates = rng.integers(gallery, size=probes)
+    scores[np.arange(probes), true_templates] = rng.normal(0.7, 0.1, probes)
+
+    if ds_scores:
+        scores = 1 - scores
+
+    return (['p%d' % i for i in range(probes)],
+            ['t%d' % i for i in range(gallery)],
+            scores, true_templates)
+
+
+def get_cmc_match_info(probes, templates, scores, true_templates,
+                       ds_scores=False):
+    """Builds the match information dictionary of a CMC experiment
+
+    @param probes: The probe ids
+    @type probes: list
+    @param templates: The gallery template ids
+    @type templates: list
+    @param scores: The scores matrix (probes x gallery templates)
+    @type scores: ndarray
+    @param true_templates: The true template index of each probe
+    @type true_templates: ndarray
+    @param ds_scores: Indicates whether the scores are dissimilarity
+        scores
+    @type ds_scores: bool
+
+    @returns: A dictionary like the one returned by
+        pyeer.cmc_stats.load_scores_from_file
+    @rtype: dict
+    """
+    order = np.argsort(scores if ds_scores else -scores, axis=1,
+                       kind='stable')
+
+    match_info = {}
+    for i, probe in enumerate(probes):
+        candidates = [(templates[j], float(scores[i, j])) for j in order[i]]
+        match_info[probe] = ([templates[true_templates[i]]], candidates)
+
+    return match_info
+
+
+def write_scores(path, gen_scores, imp_scores, prefix='bench'):
+    """Writes genuine and impostor scores to text files (one per line)
+
+    @param path: The directory of the files
+    @type path: str
+    @param gen_scores: The genuine scores
+    @type gen_scores: ndarray
+    @param imp_scores: The impostor scores (or impostor histogram)
+    @type imp_scores: ndarray
+    @param prefix: Prefix of the file names
+    @type prefix: str
+
+    @returns: (genuine scores filename, impostor scores filename)
+    @rtype: tuple
+    """
+    filenames = (join(path, prefix + '_true.txt'),
+                 join(path, prefix + '_false.txt'))
+
+    for filename, scores in zip(filenames, [gen_scores, imp_scores]):
+        fmt = '%d' if scores.dtype.kind in 'iu' else '%.17g'
+        np.savetxt(filename, scores, fmt=fmt)
+
+    return filenames
+
+
+def write_cmc_scores(path, probes, templates, scores, true_templates,
+                     prefix='bench'):
+    """Writes a CMC experiment to text files (see getcmcinf)
+
+    @param path: The directory of the files
+    @type path: str
+    @param probes: The probe ids
+    @type probes: list
+    @param templates: The gallery template ids
+    @type templates: list
+    @param scores: The scores matrix (probes x gallery templates)
+    @type scores: ndarray
+    @param true_templates: The true template index of each probe
+    @type true_templates: ndarray
+    @param prefix: Prefix of the file names
+    @type prefix: str
+
+    @returns: (scores filename, true pairs filename)
+    @rtype: tuple
+    """
+    scores_filename = join(path, prefix + '_scores.txt')
+    tp_filename = join(path, prefix + '_tp.txt')
+
+    with open(scores_filename, 'w') as sf:
+        for i, probe in enumerate(probes):
+            sf.writelines('%s %s %.17g\n' % (probe, template, score)
+                          for template, score in zip(templates, scores[i]))
+
+    with open(tp_filename, 'w') as tf:
+        for probe, template in zip(probes, true_templates):
+            tf.write('%s %s\n' % (probe, templates[template]))
+
+    return scores_filename, tp_filename
+
+
+def __to_levels(scores):
+    """Maps normal scores to integer levels in [0, INTEGER_SCORE_LEVELS]"""
+    levels = np.round(scores * INTEGER_SCORE_LEVELS)
+    return np.clip(levels, 0, INTEGER_SCORE_LEVELS).astype(np.int64)
@@ -0,0 +1,512 @@
+# -*- coding:utf-8 -*-
+
+import argparse
+import datetime
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from collections import namedtuple
+from os.path import dirname, abspath
+
+import numpy as np
+
+from ..eer_stats import calculate_roc, calculate_roc_hist, get_matthews_ccoef
+from ..eer_info import get_eer_stats
+from ..cmc_stats import get_cmc_curve
+from ..profiling import RSS_UNIT
+from .generators import SCORE_CASES, generate_scores, generate_hist_scores,\
+    generate_cmc_scores, get_cmc_match_info, write_scores, write_cmc_scores
+
+__copyright__ = 'Copyright 2017'
+__author__ = u'Bsc. Manuel Aguado Martínez'
+
+
+# Version of the results file format
+RESULTS_VERSION = 1
+
+# Default numbers of scores of each benchmark
+DEFAULT_SIZES = (10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6)
+
+# Default maximum number of scores of the CMC and command line benchmarks.
+# Their inputs are Python objects or text files, far larger than arrays.
+DEFAULT_CMC_MAX_SIZE = 10 ** 6
+DEFAULT_COMMAND_MAX_SIZE = 10 ** 6
+
+# Default relative increase of time or memory flagged as a regression
+DEFAULT_THRESHOLD = 0.1
+
+# Time differences below this value (in seconds) are never regressions
+MIN_TIME_DIFFERENCE = 1e-3
+
+
+Benchmark = namedtuple('Benchmark', [
+    'name',  # Benchmark name
+    'cases',  # Score cases
+    'setup',  # setup(case, size, seed, tmp_dir) -> arguments of run
+    'run',  # Function or (for commands) entry point 'module:function'
+    'max_size',  # Maximum number of scores (None for no limit)
+])
+
+
+BenchmarkResult = namedtuple('BenchmarkResult', [
+    'benchmark',  # Benchmark name
+    'case',  # Score case
+    'size',  # Number of scores
+    'time',  # Minimum wall time (seconds)
+    'times',  # Wall time of each repetition (seconds)
+    'peak_memory',  # Peak memory (bytes)
+    'memory_kind',  # traced (Python/NumPy allocations) or rss (process)
+])
+
+
+Comparison = namedtuple('Comparison', [
+    'benchmark',  # Benchmark name
+    'case',  # Score case
+    'size',  # Number of scores
+    'base_time',  # Minimum wall time of the base run
+    'new_time',  # Minimum wall time of the new run
+    'time_ratio',  # new_time / base_time
+    'base_memory',  # Peak memory of the base run
+    'new_memory',  # Peak memory of the new run
+    'memory_ratio',  # new_memory / base_memory
+    'regression',  # Indicates whether time or memory regressed
+])
+
+
+def __setup_scores(case, size, seed, tmp_dir):
+    return generate_scores(size, case, seed)
+
+
+def __setup_hist_scores(case, size, seed, tmp_dir):
+    return generate_hist_scores(size, seed)
+
+
+def __setup_error_counts(case, size, seed, tmp_dir):
+    gen_scores, imp_scores = generate_scores(size, case, seed)
+    _, fm, fnm = calculate_roc(gen_scores, imp_scores, rates=False)
+    return fm, fnm, len(gen_scores), len(imp_scores)
+
+
+def __setup_eer_stats(case, size, seed, tmp_dir):
+    if case == 'hist':
+        return generate_hist_scores(size, seed) + (True,)
+    return generate_scores(size, case, seed) + (False,)
+
+
+def __setup_cmc_curve(case, size, seed, tmp_dir):
+    return get_cmc_match_info(*generate_cmc_scores(size, seed=seed)), 20
+
+
+def __setup_eer_command(case, size, seed, tmp_dir):
+    if case == 'hist':
+        gen_scores, imp_scores = generate_hist_scores(size, seed)
+    else:
+        gen_scores, imp_scores = generate_scores(size, case, seed)
+
+    gfile, ifile = write_scores(tmp_dir, gen_scores, imp_scores)
+    argv = ['-p', tmp_dir, '-g', gfile, '-i', ifile, '-e', 'bench',
+            '-sp', tmp_dir, '--no-cache']
+
+    return argv + ['-ht'] if case == 'hist' else argv
+
+
+def __setup_cmc_command(case, size, seed, tmp_dir):
+    sfile, tpfile = write_cmc_scores(tmp_dir,
+                                     *generate_cmc_scores(size, seed=seed))
+    return ['-p', tmp_dir, '-ms', sfile, '-t', tpfile, '-e', 'bench',
+            '-sp', tmp_dir]
+
+
+BENCHMARKS = [
+    Benchmark('calculate_roc', SCORE_CASES, __setup_scores, calculate_roc,
+              None),
+    Benchmark('calculate_roc_hist', ('hist',), __setup_hist_scores,
+              calculate_roc_hist, None),
+    Benchmark('get_matthews_ccoef', ('normal',), __setup_error_counts,
+              get_matthews_ccoef, None),
+    Benchmark('get_eer_stats', SCORE_CASES + ('hist',), __setup_eer_stats,
+              get_eer_stats, None),
+    Benchmark('get_cmc_curve', ('cmc',), __setup_cmc_curve, get_cmc_curve,
+              DEFAULT_CMC_MAX_SIZE),
+    Benchmark('geteerinf', ('normal', 'hist'), __setup_eer_command,
+              'pyeer.eer_info:get_eer_info_cmd', DEFAULT_COMMAND_MAX_SIZE),
+    Benchmark('getcmcinf', ('cmc',), __setup_cmc_command,
+              'pyeer.cmc_info:get_cmc_info', DEFAULT_COMMAND_MAX_SIZE),
+]
+
+
+def measure_function(func, args, repeat=3):
+    """Measures the wall time and peak memory of a function call
+
+    Times are measured without tracing memory. Then, the function is
+    called once more tracing the memory allocated by Python and NumPy
+    (tracemalloc), so the peak does not include the arguments.
+
+    @param func: The function
+    @type func: callable
+    @param args: The arguments of the function
+    @type args: tuple
+    @param repeat: The number of timed calls
+    @type repeat: int
+
+    @returns: (wall time of each call, peak memory in bytes)
+    @rtype: tuple
+    """
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        func(*args)
+        times.append(time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        base = tracemalloc.get_traced_memory()[0]
+        func(*args)
+        peak = tracemalloc.get_traced_memory()[1] - base
+    finally:
+        tracemalloc.stop()
+
+    return times, peak
+
+
+def measure_command(entry_point, argv, cwd=None, repeat=3):
+    """Measures the wall time and peak memory of a command line entry point
+
+    Each run is a new Python process, so times include the interpreter
+    start-up and imports, like the installed scripts. The peak memory is
+    the maximum resident set size of the process (None if not available
+    in this platform).
+
+    @param entry_point: The entry point ('module:function')
+    @type entry_point: str
+    @param argv: The command line arguments
+    @type argv: list
+    @param cwd: The working directory of the process
+    @type cwd: str
+    @param repeat: The number of runs
+    @type repeat: int
+
+    @returns: (wall time of each run, peak memory in bytes)
+    @rtype: tuple
+    """
+    module, function = entry_point.split(':')
+    code = ('import sys\nfrom %s import %s as main\nsys.argv[0] = %r\n'
+            'main()\n' % (module, function, function))
+
+    # The process must import the package being benchmarked
+    env = dict(os.environ, MPLBACKEND='Agg')
+    root = dirname(dirname(dirname(abspath(__file__))))
+    env['PYTHONPATH'] = os.pathsep.join(
+        [root] + [p for p in [os.environ.get('PYTHONPATH')] if p])
+
+    times = []
+    peak = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        process = subprocess.Popen([sys.executable, '-c', code] + argv,
+                                   cwd=cwd, env=env,
+                                   stdout=subprocess.DEVNULL)
+
+        if hasattr(os, 'wait4'):
+            _, status, usage = os.wait4(process.pid, 0)
+            process.returncode = os.waitstatus_to_exitcode(status)
+            peak = max(peak or 0, usage.ru_maxrss * RSS_UNIT)
+        else:
+            process.wait()
+        times.append(time.perf_counter() - start)
+
+        if process.returncode != 0:
+            raise RuntimeError('%s failed with exit code %d' %
+                               (entry_point, process.returncode))
+
+    return times, peak
+
+
+def run_benchmarks(benchmarks=None, sizes=DEFAULT_SIZES, repeat=3, seed=0,
+                   tmp_dir=None, limits=True, verbose=True):
+    """Runs the benchmarks
+
+    @param benchmarks: The names of the benchmarks to run (all if not
+        given, see BENCHMARKS)
+    @type benchmarks: iterable
+    @param sizes: The numbers of scores
+    @type sizes: iterable
+    @param repeat: The number of timed runs of each benchmark
+    @type repeat: int
+    @param seed: Seed of the synthetic scores
+    @type seed: int
+    @param tmp_dir: Directory of the temporary score files of the command
+        line benchmarks
+    @type tmp_dir: str
+    @param limits: Indicates whether to skip sizes larger than the maximum
+        size of each benchmark
+    @type limits: bool
+    @param verbose: Indicates whether to print each result
+    @type verbose: bool
+
+    @returns: The results
+    @rtype: list
+    """
+    selected = BENCHMARKS
+    if benchmarks is not None:
+        names = set(benchmarks)
+        unknown = names - set(b.name for b in BENCHMARKS)
+        if unknown:
+            raise ValueError('Unknown benchmarks: %s' %
+                             ', '.join(sorted(unknown)))
+        selected = [b for b in BENCHMARKS if b.name in names]
+
+    results = []
+    for benchmark in selected:
+        for case in benchmark.cases:
+            for size in sizes:
+                if (limits and benchmark.max_size is not None and
+                        size > benchmark.max_size):
+                    continue
+
+                with tempfile.TemporaryDirectory(dir=tmp_dir) as case_dir:
+                    args = benchmark.setup(case, size, seed, case_dir)
+
+                    if callable(benchmark.run):
+                        times, peak = measure_function(benchmark.run, args,
+                                                       repeat)
+                        memory_kind = 'traced'
+                    else:
+                        times, peak = measure_command(benchmark.run, args,
+                                                      case_dir, repeat)
+                        memory_kind = 'rss'
+                    del args
+
+                result = BenchmarkResult(benchmark.name, case, size,
+                                         min(times), times, peak,
+                                         memory_kind)
+                results.append(result)
+
+                if verbose:
+                    print('%s [%s, %d]: %s, %s' % (
+                        result.benchmark, result.case, result.size,
+                        __format_time(result.time),
+                        __format_memory(result.peak_memory)))
+
+    return results
+
+
+def save_results(results, filename, repeat=None, seed=None):
+    """Saves benchmark results to a JSON file
+
+    @param results: The results returned by run_benchmarks
+    @type results: list
+    @param filename: The results file
+    @type filename: str
+    @param repeat: The number of timed runs of each benchmark
+    @type repeat: int
+    @param seed: Seed of the synthetic scores
+    @type seed: int
+    """
+    data = {
+        'version': RESULTS_VERSION,
+        'metadata': {
+            'date': datetime.datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'machine': platform.machine(),
+            'repeat': repeat,
+            'seed': seed,
+        },
+        'results': [r._asdict() for r in results],
+    }
+
+    with open(filename, 'w') as rf:
+        json.dump(data, rf, indent=2)
+
+
+def load_results(filename):
+    """Loads benchmark results from a JSON file
+
+    @param filename: A results file saved with save_results
+    @type filename: str
+
+    @returns: The results
+    @rtype: list
+    """
+    with open(filename) as rf:
+        data = json.load(rf)
+
+    if data.get('version') != RESULTS_VERSION:
+        raise ValueError('Unknown benchmark results version in %s' %
+                         filename)
+
+    return [BenchmarkResult(**r) for r in data['results']]
+
+
+def compare_results(base, new, threshold=DEFAULT_THRESHOLD,
+                    memory_threshold=DEFAULT_THRESHOLD):
+    """Compares two benchmark runs
+
+    A benchmark regresses when its time grows by more than the given
+    relative threshold (and by more than MIN_TIME_DIFFERENCE seconds) or
+    its peak memory grows by more than the given memory threshold. Only
+    the benchmarks present in both runs are compared.
+
+    @param base: The results of the base run
+    @type base: list
+    @param new: The results of the new run
+    @type new: list
+    @param threshold: Relative time increase flagged as a regression
+    @type threshold: float
+    @param memory_threshold: Relative memory increase flagged as a
+        regression
+    @type memory_threshold: float
+
+    @returns: A comparison per benchmark
+    @rtype: list
+    """
+    base = dict(((r.benchmark, r.case, r.size), r) for r in base)
+
+    comparisons = []
+    for result in new:
+        key = (result.benchmark, result.case, result.size)
+        if key not in base:
+            continue
+        previous = base[key]
+
+        time_ratio = __ratio(result.time, previous.time)
+        memory_ratio = __ratio(result.peak_memory, previous.peak_memory)
+
+        slower = (time_ratio is not None and time_ratio > 1 + threshold and
+                  result.time - previous.time > MIN_TIME_DIFFERENCE)
+        larger = (memory_ratio is not None and
+                  memory_ratio > 1 + memory_threshold)
+
+        comparisons.append(Comparison(
+            result.benchmark, result.case, result.size, previous.time,
+            result.time, time_ratio, previous.peak_memory,
+            result.peak_memory, memory_ratio, slower or larger))
+
+    return comparisons
+
+
+def print_comparisons(comparisons):
+    """Prints a table of benchmark comparisons
+
+    @param comparisons: The comparisons returned by compare_results
+    @type comparisons: list
+    """
+    header = ('Benchmark', 'Case', 'Size', 'Base time', 'New time', 'Ratio',
+              'Base memory', 'New memory', 'Ratio', '')
+    rows = [header]
+    for c in comparisons:
+        rows.append((c.benchmark, c.case, str(c.size),
+                     __format_time(c.base_time), __format_time(c.new_time),
+                     __format_ratio(c.time_ratio),
+                     __format_memory(c.base_memory),
+                     __format_memory(c.new_memory),
+                     __format_ratio(c.memory_ratio),
+                     'REGRESSION' if c.regression else ''))
+
+    widths = [max(len(row[i]) for row in rows) for i in range(len(header))]
+    for row in rows:
+        print('  '.join(v.ljust(w) for v, w in zip(row, widths)).rstrip())
+
+
+def run_benchmarks_cmd():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("-s", "--sizes", required=False,
+                    default=','.join('%g' % s for s in DEFAULT_SIZES),
+                    help="The numbers of scores of each benchmark. Multiple"
+                         " sizes must be separated by a comma, e.g."
+                         " 1e3,1e4,1e8 (default=1e3,1e4,1e5,1e6)")
+    ap.add_argument("-b", "--benchmarks", required=False, default=None,
+                    help="The benchmarks to run. Multiple benchmarks must be"
+                         " separated by a comma. Valid benchmarks are: (%s)."
+                         " Default all" % ', '.join(b.name
+                                                    for b in BENCHMARKS))
+    ap.add_argument("-r", "--repeat", required=False, default=3,
+                    help="The number of timed runs of each benchmark. The"
+                         " minimum time is reported (default=3)")
+    ap.add_argument("-o", "--output", required=False,
+                    default='pyeer_benchmark.json',
+                    help="The results file (default=pyeer_benchmark.json)")
+    ap.add_argument("-sd", "--seed", required=False, default=0,
+                    help="Seed of the synthetic scores (default=0)")
+    ap.add_argument("-nl", "--no_limits", required=False,
+                    action='store_true',
+                    help="Indicates whether to run the CMC and command line"
+                         " benchmarks for sizes larger than %g" %
+                         DEFAULT_COMMAND_MAX_SIZE)
+    ap.add_argument("-tmp", "--tmp_dir", required=False, default=None,
+                    help="Directory of the temporary score files of the"
+                         " command line benchmarks")
+    ap.add_argument("-c", "--compare", required=False, default=None,
+                    help="Compares two results files instead of running the"
+                         " benchmarks. The files must be separated by a"
+                         " comma (base,new). Exits with status 1 if any"
+                         " benchmark regressed")
+    ap.add_argument("-th", "--threshold", required=False,
+                    default=DEFAULT_THRESHOLD,
+                    help="Relative time increase flagged as a regression"
+                         " (default=%g)" % DEFAULT_THRESHOLD)
+    ap.add_argument("-mth", "--memory_threshold", required=False,
+                    default=DEFAULT_THRESHOLD,
+                    help="Relative peak memory increase flagged as a"
+                         " regression (default=%g)" % DEFAULT_THRESHOLD)
+    args = ap.parse_args()
+
+    if args.compare is not None:
+        base_filename, new_filename = args.compare.split(',')
+        comparisons = compare_results(load_results(base_filename.strip()),
+                                      load_results(new_filename.strip()),
+                                      float(args.threshold),
+                                      float(args.memory_threshold))
+        print_comparisons(comparisons)
+
+        regressions = sum(c.regression for c in comparisons)
+        print('%d regression(s) in %d benchmark(s)' %
+              (regressions, len(comparisons)))
+        sys.exit(1 if regressions else 0)
+
+    sizes = [int(float(s)) for s in args.sizes.split(',')]
+    benchmarks = None
+    if args.benchmarks is not None:
+        benchmarks = [b.strip() for b in args.benchmarks.split(',')]
+    repeat = int(args.repeat)
+    seed = int(args.seed)
+
+    results = run_benchmarks(benchmarks, sizes, repeat, seed, args.tmp_dir,
+                             not args.no_limits)
+    save_results(results, args.output, repeat, seed)
+    print('Results saved to %s' % args.output)
+
+
+def __ratio(new, base):
+    if new is None or base is None or base == 0:
+        return None
+    return float(new) / base
+
+
+def __format_time(seconds):
+    if seconds is None:
+        return '-'
+    if seconds < 1:
+        return '%.3f ms' % (seconds * 1000)
+    return '%.3f s' % seconds
+
+
+def __format_memory(size):
+    if size is None:
+        return '-'
+    return '%.1f MB' % (size / 2.0 ** 20)
+
+
+def __format_ratio(ratio):
+    return '-' if ratio is None else '%.2fx' % ratio
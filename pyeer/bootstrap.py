@@ -0,0 +1,185 @@
+# -*- coding:utf-8 -*-
+
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .eer_stats import calculate_roc_counts, get_stats_from_roc,\
+    get_sorted_unique, merge_sorted_unique, get_eer_values_batch,\
+    get_fmr_op_batch, calculate_roc_auc_batch
+
+__copyright__ = 'Copyright 2017'
+__author__ = u'Bsc. Manuel Aguado Martínez'
+
+
+# Maximum number of curve points (resamples x thresholds) computed at once
+BOOTSTRAP_BATCH_POINTS = 2 ** 24
+
+# Maximum number of resamples computed at once
+BOOTSTRAP_BATCH_RESAMPLES = 50
+
+
+BootstrapStats = namedtuple('BootstrapStats', [
+    'stats',  # Point estimates (Stats)
+    'confidence',  # Confidence level of the intervals
+    'resamples',  # Number of bootstrap resamples
+    'eer_ci',  # Equal error rate confidence interval
+    'fmr1000_ci',  # 1000 false match rate confidence interval
+    'fmr100_ci',  # 100 false match rate confidence interval
+    'auc_ci',  # Area under the ROC curve confidence interval
+])
+
+
+# Presorted scores shared by the bootstrap workers
+__presorted = None
+
+
+def __init_worker(presorted):
+    """Sets the presorted scores of a bootstrap worker process"""
+    global __presorted
+    __presorted = presorted
+
+
+def __resample_batch(args):
+    """Computes EER, FMR1000, FMR100 and AUC for a batch of resamples
+
+    @param args: (number of resamples, seed sequence)
+    @type args: tuple
+
+    @returns: An array with one row per resample and columns
+        (EER, FMR1000, FMR100, AUC)
+    @rtype: ndarray
+    """
+    size, seed = args
+    gpos, gprobs, gnumber, ipos, iprobs, inumber, tnumber = __presorted
+    rng = np.random.default_rng(seed)
+
+    # Drawing multinomial counts for each unique score
+    gcounts = np.zeros((size, tnumber))
+    gcounts[:, gpos] = rng.multinomial(gnumber, gprobs, size=size)
+
+    icounts = np.zeros((size, tnumber))
+    icounts[:, ipos] = rng.multinomial(inumber, iprobs, size=size)
+
+    # Scores lower than each threshold
+    fnmr = (np.cumsum(gcounts, axis=1) - gcounts) / gnumber
+    fmr = (inumber - (np.cumsum(icounts, axis=1) - icounts)) / inumber
+    del gcounts, icounts
+
+    values = np.empty((size, 4))
+    values[:, 0] = get_eer_values_batch(fmr, fnmr)[3]
+    values[:, 1] = get_fmr_op_batch(fmr, fnmr, 0.001)[1]
+    values[:, 2] = get_fmr_op_batch(fmr, fnmr, 0.01)[1]
+    values[:, 3] = calculate_roc_auc_batch(fmr, fnmr)
+
+    return values
+
+
+def get_bootstrap_stats(gen_scores, imp_scores, ds_scores=False,
+                        resamples=1000, confidence=0.95, jobs=1, seed=None,
+                        fmr_ops=(), fnmr_ops=(), pauc_ranges=()):
+    """Calculates EER associated statistics and bootstrap confidence
+    intervals for EER, FMR1000, FMR100 and AUC
+
+    Scores are sorted once. Each resample is then drawn as a vector of
+    multinomial counts over the unique genuine and impostor scores, so
+    curves are computed over the thresholds of the original scores
+    without sorting again. Percentile intervals are returned.
+
+    @param gen_scores: The genuine scores
+    @type gen_scores: Union[list, ndarray]
+    @param imp_scores: The impostor scores
+    @type imp_scores: Union[list, ndarray]
+    @param ds_scores: Indicates whether the input scores are dissimilarity
+        scores
+    @type ds_scores: bool
+    @param resamples: The number of bootstrap resamples
+    @type resamples: int
+    @param confidence: The confidence level of the intervals
+    @type confidence: float
+    @param jobs: The number of worker processes
+    @type jobs: int
+    @param seed: Seed of the random resamples
+    @type seed: int
+    @param fmr_ops: Additional FMR operating points of the point estimates
+    @type fmr_ops: iterable
+    @param fnmr_ops: Additional FNMR operating points of the point
+        estimates
+    @type fnmr_ops: iterable
+    @param pauc_ranges: FMR ranges of the partial areas under the ROC
+        curve of the point estimates
+    @type pauc_ranges: iterable
+
+    @returns: The point estimates and the confidence intervals
+    @rtype: BootstrapStats
+
+    @raise ValueError: If resamples or jobs is lower than one.
+    """
+    if resamples < 1:
+        raise ValueError('The number of resamples must be at least one,'
+                         ' got %r' % (resamples,))
+    if jobs < 1:
+        raise ValueError('The number of jobs must be at least one, got %r' %
+                         (jobs,))
+
+    gscores = np.asarray(gen_scores, dtype=np.float64)
+    iscores = np.asarray(imp_scores, dtype=np.float64)
+
+    presorted = []
+    for scores in [gscores, iscores]:
+        scores = np.sort(scores * -1 if ds_scores else scores)
+        values = get_sorted_unique(scores)
+        counts = np.diff(np.append(
+            np.searchsorted(scores, values, side='left'), len(scores)))
+        presorted.append((values, counts))
+
+    (gvalues, gcounts), (ivalues, icounts) = presorted
+
+    # Point estimates
+    thrs, fm, fnm = calculate_roc_counts(gvalues, gcounts, ivalues, icounts,
+                                         rates=False)
+    if ds_scores:
+        thrs = thrs * -1
+
+    stats = get_stats_from_roc(thrs, fm, fnm, len(gscores), len(iscores),
+                               np.mean(gscores), np.std(gscores),
+                               np.mean(iscores), np.std(iscores),
+                               gen_scores, imp_scores, fmr_ops, fnmr_ops,
+                               pauc_ranges)
+
+    # Positions of the unique scores among thresholds
+    thresholds = merge_sorted_unique(gvalues, ivalues)
+    shared = (np.searchsorted(thresholds, gvalues), gcounts / len(gscores),
+              len(gscores), np.searchsorted(thresholds, ivalues),
+              icounts / len(iscores), len(iscores), len(thresholds))
+
+    # Splitting resamples in batches with a bounded number of curve points.
+    # Batches do not depend on the number of jobs, so results are the same
+    # for a given seed
+    batch = min(BOOTSTRAP_BATCH_POINTS // len(thresholds),
+                BOOTSTRAP_BATCH_RESAMPLES)
+    batch = max(1, batch)
+    sizes = [min(batch, resamples - i) for i in range(0, resamples, batch)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = list(zip(sizes, seeds))
+
+    if jobs > 1:
+        with ProcessPoolExecutor(jobs, initializer=__init_worker,
+                                 initargs=(shared,)) as executor:
+            values = list(executor.map(__resample_batch, tasks))
+    else:
+        __init_worker(shared)
+        values = [__resample_batch(task) for task in tasks]
+        __init_worker(None)
+
+    values = np.concatenate(values)
+
+    alpha = (1 - confidence) / 2
+    low, high = np.quantile(values, [alpha, 1 - alpha], axis=0)
+    cis = [(float(low[i]), float(high[i])) for i in range(values.shape[1])]
+
+    return BootstrapStats(stats=stats, confidence=confidence,
+                          resamples=resamples, eer_ci=cis[0],
+                          fmr1000_ci=cis[1], fmr100_ci=cis[2],
+                          auc_ci=cis[3])
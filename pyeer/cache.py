@@ -0,0 +1,175 @@
+# -*- coding:utf-8 -*-
+
+import hashlib
+import os
+import tempfile
+import zipfile
+
+from os.path import join, expanduser, realpath
+
+import numpy as np
+
+__copyright__ = 'Copyright 2017'
+__author__ = u'Bsc. Manuel Aguado Martínez'
+
+
+# Default maximum size in bytes of the cached entries
+DEFAULT_CACHE_SIZE = 2 ** 30
+
+# Version of the cached entries. Entries of other versions are ignored.
+CACHE_VERSION = 2
+
+
+def get_default_cache_dir():
+    """Returns the default cache directory
+
+    @returns: $XDG_CACHE_HOME/pyeer or ~/.cache/pyeer
+    @rtype: str
+    """
+    base = os.environ.get('XDG_CACHE_HOME') or join(expanduser('~'),
+                                                    '.cache')
+    return join(base, 'pyeer')
+
+
+class CurveCache(object):
+    """On-disk cache of computed curves
+
+    Each entry is a set of arrays saved in an uncompressed .npz file
+    named after the key of the entry. Keys are computed from the path,
+    size and modification time of the score files plus any option
+    affecting the result, so modified files are never read from the
+    cache. When the total size of the entries exceeds the given maximum,
+    the least recently used entries are removed (reading an entry updates
+    its modification time).
+    """
+
+    def __init__(self, cache_dir=None, max_size=DEFAULT_CACHE_SIZE):
+        """
+        @param cache_dir: The cache directory. If not given,
+            get_default_cache_dir() is used.
+        @type cache_dir: str
+        @param max_size: Maximum size in bytes of the cached entries
+        @type max_size: int
+        """
+        self.cache_dir = cache_dir or get_default_cache_dir()
+        self.max_size = max_size
+
+    def key(self, filenames, **options):
+        """Computes the key of an entry
+
+        @param filenames: The files the entry is computed from
+        @type filenames: iterable
+        @param options: Options affecting the entry
+        @type options: dict
+
+        @returns: The entry key
+        @rtype: str
+        """
+        digest = hashlib.sha1(('v%d' % CACHE_VERSION).encode())
+
+        for filename in filenames:
+            info = os.stat(filename)
+            digest.update(('%s|%d|%d|' % (realpath(filename), info.st_size,
+                                          info.st_mtime_ns)).encode())
+
+        for name in sorted(options):
+            digest.update(('%s=%r|' % (name, options[name])).encode())
+
+        return digest.hexdigest()
+
+    def get(self, key):
+        """Returns the arrays of an entry
+
+        @param key: The entry key
+        @type key: str
+
+        @returns: A dictionary with the arrays of the entry or None if the
+            entry is not cached
+        @rtype: dict
+        """
+        filename = self._filename(key)
+
+        try:
+            with np.load(filename) as arrays:
+                entry = dict((name, arrays[name]) for name in arrays.files)
+            os.utime(filename)
+        except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+            return None
+
+        return entry
+
+    def put(self, key, arrays):
+        """Stores an entry, removing the least recently used ones if the
+        cache exceeds its maximum size. Entries larger than the maximum
+        size are not stored (it would remove every other entry).
+
+        @param key: The entry key
+        @type key: str
+        @param arrays: The arrays of the entry
+        @type arrays: dict
+        """
+        size = sum(np.asarray(array).nbytes for array in arrays.values())
+        if size > self.max_size:
+            # Dropping the previous version of the entry
+            self._remove(self._filename(key))
+            return
+
+        if not os.path.isdir(self.cache_dir):
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+        # Writing to a temporary file first, so readers never see
+        # incomplete entries
+        fd, tmp_filename = tempfile.mkstemp(suffix='.tmp',
+                                            dir=self.cache_dir)
+        try:
+            with os.fdopen(fd, 'wb') as tf:
+                np.savez(tf, **arrays)
+            os.replace(tmp_filename, self._filename(key))
+        except BaseException:
+            self._remove(tmp_filename)
+            raise
+
+        self._evict()
+
+    def clear(self):
+        """Removes every entry"""
+        for filename, _, _ in self._entries():
+            self._remove(filename)
+
+    def _filename(self, key):
+        return join(self.cache_dir, key + '.npz')
+
+    def _entries(self):
+        """Returns (filename, size, last use) for each entry"""
+        if not os.path.isdir(self.cache_dir):
+            return []
+
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.npz'):
+                continue
+            filename = join(self.cache_dir, name)
+            try:
+                info = os.stat(filename)
+            except OSError:
+                continue
+            entries.append((filename, info.st_size, info.st_mtime))
+
+        return entries
+
+    def _evict(self):
+        """Removes the least recently used entries exceeding max_size"""
+        entries = sorted(self._entries(), key=lambda e: e[2], reverse=True)
+
+        size = 0
+        for filename, entry_size, _ in entries:
+            size += entry_size
+            if size > self.max_size:
+                self._remove(filename)
+
+    @staticmethod
+    def _remove(filename):
+        try:
+            os.remove(filename)
+        except OSError:
+            pass
@@ -4,9 +4,12 @@ import argparse
 
 from os.path import join
 
-from .cmc_stats import load_scores_from_file, get_cmc_curve, CMCstats
+from .cmc_stats import load_cmc_scores, get_cmc_curve, CMCstats,\
+    get_streamed_true_match_ranks, get_cmc_curve_from_ranks, load_cmc_matrix
 from .report import generate_cmc_report
 from .plot import plot_cmc_stats
+from .profiling import Profiler, stage, register_hook, unregister_hook,\
+    save_profile
 
 __copyright__ = 'Copyright 2017'
 __author__ = u'Manuel Aguado Martínez'
@@ -19,10 +22,25 @@ def get_cmc_info():
                     help="The path to the scores files")
     ap.add_argument("-ms", "--scores_filenames", required=True,
                     help="The scores file. Multiple files must be"
-                         " separated by a comma")
-    ap.add_argument("-t", "--true_pairs_file_names", required=True,
+                         " separated by a comma. Converted .npz files (see"
+                         " convscores) are also accepted. If -pl and -gl"
+                         " are given, .npy scores matrices (probes x"
+                         " gallery)")
+    ap.add_argument("-t", "--true_pairs_file_names", required=False,
+                    default=None,
                     help="Genuine pairs file. Multiple files must be"
-                         " separated by a comma.")
+                         " separated by a comma. Converted .npz files (see"
+                         " convscores) are also accepted")
+    ap.add_argument("-pl", "--probe_labels", required=False, default=None,
+                    help="The identity labels of the probes (rows) of the"
+                         " scores matrices (.npy or text, one label per"
+                         " line). Multiple files must be separated by a"
+                         " comma. Replaces the genuine pairs file")
+    ap.add_argument("-gl", "--gallery_labels", required=False, default=None,
+                    help="The identity labels of the gallery templates"
+                         " (columns) of the scores matrices (.npy or text,"
+                         " one label per line). Multiple files must be"
+                         " separated by a comma")
     ap.add_argument("-e", "--experiment_names", required=True,
                     help="Experiment ID. Multiple IDS must be separated by "
                          " comma")
@@ -51,13 +69,40 @@ def get_cmc_info():
     ap.add_argument("-ds", "--ds_scores", required=False, action='store_true',
                     help='Indicates whether the input scores are dissimilarity'
                          'scores')
+    ap.add_argument("-st", "--stream", required=False, action='store_true',
+                    help="Indicates that the scores of each query are"
+                         " contiguous in the scores files (e.g. logs written"
+                         " probe by probe). Files are processed one query at"
+                         " a time, so memory is bounded by the largest"
+                         " gallery of a query instead of the file size")
+    ap.add_argument("-pr", "--profile", required=False, action='store_true',
+                    help="Indicates whether to record the wall time, CPU"
+                         " time and peak memory of each stage (loading,"
+                         " computing, reporting, plotting) of each"
+                         " experiment. A summary table is printed and a JSON"
+                         " trace is saved to pyeer_profile.json")
     args = ap.parse_args()
 
+    matrices = args.probe_labels is not None or \
+        args.gallery_labels is not None
+    if matrices and (args.probe_labels is None or
+                     args.gallery_labels is None):
+        ap.error('-pl and -gl must be given together')
+    if not matrices and args.true_pairs_file_names is None:
+        ap.error('the genuine pairs files (-t) or the labels of the scores'
+                 ' matrices (-pl and -gl) are required')
+    if matrices and args.stream:
+        ap.error('-st is not available for scores matrices')
+
     # Parsing script arguments
     score_filenames = args.scores_filenames.split(',')
-    true_pairs_filenames = args.true_pairs_file_names.split(',')
-    if len(true_pairs_filenames) == 1:
-        true_pairs_filenames *= len(score_filenames)
+    if matrices:
+        true_pairs_filenames = list(zip(
+            __broadcast(args.probe_labels, len(score_filenames)),
+            __broadcast(args.gallery_labels, len(score_filenames))))
+    else:
+        true_pairs_filenames = __broadcast(args.true_pairs_file_names,
+                                           len(score_filenames))
     experiment_names = args.experiment_names.split(',')
     experiments = zip(score_filenames, true_pairs_filenames, experiment_names)
     rank = int(args.maximum_rank)
@@ -66,28 +111,66 @@ def get_cmc_info():
     ext = '.' + args.plots_format
     dpi = None if args.save_dpi is None else int(args.save_dpi)
 
+    profiler = None
+    if args.profile:
+        profiler = Profiler()
+        register_hook(profiler)
+
     # Calculating CMC values for each experiment and plotting them
     stats = []
     for i, exp in enumerate(experiments):
         s_filename = join(args.path, exp[0])
-        tp_filename = join(args.path, exp[1])
         experiment_name = exp[2]
 
-        print('%s: Loading scores file...' % experiment_name)
-        scores = load_scores_from_file(s_filename, tp_filename, args.ds_scores)
+        if matrices:
+            print('%s: Loading scores matrix...' % experiment_name)
+            with stage('load', experiment_name):
+                scores = load_cmc_matrix(s_filename,
+                                         join(args.path, exp[1][0]),
+                                         join(args.path, exp[1][1]),
+                                         args.ds_scores)
+        elif not args.stream:
+            print('%s: Loading scores file...' % experiment_name)
+            with stage('load', experiment_name):
+                scores = load_cmc_scores(s_filename,
+                                         join(args.path, exp[1]),
+                                         args.ds_scores, rank=False)
 
         print('%s: Calculating CMC cruve...' % experiment_name)
-        rank_values = get_cmc_curve(scores, rank)
+        with stage('cmc', experiment_name):
+            if args.stream:
+                ranks, total = get_streamed_true_match_ranks(
+                    s_filename, join(args.path, exp[1]), args.ds_scores,
+                    max_rank=rank)
+                rank_values = get_cmc_curve_from_ranks(ranks, total, rank)
+            else:
+                rank_values = get_cmc_curve(scores, rank)
 
         stats.append(CMCstats(exp_id=experiment_name, ranks=rank_values))
 
     # Generating reports
     print('Generating report...')
 
-    filename = join(args.save_path, 'pyeer_report.' + args.report_format)
-    generate_cmc_report(stats, rank, filename)
+    with stage('report'):
+        filename = join(args.save_path,
+                        'pyeer_report.' + args.report_format)
+        generate_cmc_report(stats, rank, filename)
 
     if not args.no_plots:
         print('Plotting...')
-        plot_cmc_stats(stats, rank, line_width, lgf_size, True,
-                       dpi, args.save_path, ext)
+        with stage('plot'):
+            plot_cmc_stats(stats, rank, line_width, lgf_size, True,
+                           dpi, args.save_path, ext)
+
+    if profiler is not None:
+        unregister_hook(profiler)
+        save_profile(profiler, args.save_path)
+
+
+def __broadcast(filenames, total):
+    """Splits a comma separated list of files, repeating a single file
+    for every experiment"""
+    filenames = filenames.split(',')
+    if len(filenames) == 1:
+        filenames *= total
+    return filenames
@@ -1,10 +1,14 @@
 # -*- coding:utf-8 -*-
 
+import heapq
 import operator
 
 from collections import namedtuple
+from os.path import splitext
 from warnings import warn
 
+import numpy as np
+
 __copyright__ = 'Copyright 2017'
 __author__ = u'Manuel Aguado Martínez'
 
@@ -12,95 +16,761 @@ TEMPLATE_POS = 0
 SCORE_POS = 1
 
 
+# Size in bytes of the blocks read from CMC scores files
+DEFAULT_BLOCK_SIZE = 2 ** 24
+
+
 CMCstats = namedtuple('CMCstats', ['exp_id',  # Exp id
                                    'ranks',  # Rank values
                                    ])
 
 
+CMCScores = namedtuple('CMCScores', [
+    'queries',  # Query ids (the index of each id is its integer code)
+    'templates',  # Template ids (the index of each id is its integer code)
+    'query_codes',  # Query code of each score
+    'template_codes',  # Template code of each score
+    'scores',  # Scores (ranked within each query, best first, if ranked)
+    'true_queries',  # Query code of each true pair
+    'true_templates',  # Template code of each true pair
+    'ranked',  # Whether scores are grouped by query and ranked
+    'ds_scores',  # Whether scores are dissimilarity scores
+])
+
+
+CMCMatrix = namedtuple('CMCMatrix', [
+    'matrix',  # Scores matrix (probes x gallery), possibly memory-mapped
+    'probe_labels',  # Identity code of each probe (row)
+    'gallery_labels',  # Identity code of each gallery template (column)
+    'ds_scores',  # Whether scores are dissimilarity scores
+])
+
+
 def load_scores_from_file(scores_filename, true_pairs_filename,
-                          ds_scores=False, delimiter=' '):
+                          ds_scores=False, delimiter=' ', max_rank=None):
     """Loads the match information from the files.
 
+    If max_rank is given, only the best max_rank candidates of each query
+    are kept (top-k selection with a heap instead of sorting every
+    candidate), which is all get_cmc_curve needs for that maximum rank.
+
     @param scores_filename: The scores file address. One score per
-        line with the following format: (query template score)
+        line with the following format: (query template score). A .npz
+        file with the arrays queries, templates and scores is also
+        accepted (see convert_cmc_file).
     @type scores_filename: str
     @param true_pairs_filename: The true pairs file address. Each line
         indicates the corresponding template of each query. Must have
-        the following format: (query true_template)
+        the following format: (query true_template). A .npz file with the
+        arrays queries and templates is also accepted.
     @type true_pairs_filename: str
     @param ds_scores: Indicates whether te input scores are dissimilarity
         scores.
     @type ds_scores: bool
     @param delimiter: The boundary string of input files.
     @type delimiter: str, default ' '
+    @param max_rank: If given, the number of candidates kept for each
+        query.
+    @type max_rank: int
 
     @returns: A dictionary {key=query, value=QueryMatchInfo}
     @rtype: dict
     """
     matching_scores = {}
 
-    with open(true_pairs_filename) as tpf:
+    for query, template in __read_true_pairs(true_pairs_filename, delimiter):
+        if query in matching_scores:
+            matching_scores[query][TEMPLATE_POS].append(template)
+        else:
+            matching_scores[query] = ([template], [])
+
+    for query, template, score in __read_scores(scores_filename, delimiter):
+        matching_scores[query][SCORE_POS].append((template, score))
+
+    key = operator.itemgetter(SCORE_POS)
+    if max_rank is None:
+        for query_match_info in matching_scores.values():
+            query_match_info[SCORE_POS].sort(key=key, reverse=not ds_scores)
+    else:
+        # Like sorted(...)[:max_rank], ties keep the order of the file
+        select = heapq.nsmallest if ds_scores else heapq.nlargest
+        for query, (true_templates, candidates) in matching_scores.items():
+            matching_scores[query] = (true_templates,
+                                      select(max_rank, candidates, key=key))
+
+    return matching_scores
+
+
+def load_cmc_scores(scores_filename, true_pairs_filename, ds_scores=False,
+                    delimiter=' ', block_size=DEFAULT_BLOCK_SIZE, rank=True):
+    """Loads the match information into contiguous arrays
+
+    Columnar alternative to load_scores_from_file for large experiments.
+    Query and template ids are interned into integer codes, scores files
+    are parsed by blocks into NumPy arrays (no Python object per score)
+    and the candidates of every query are ranked at once with a single
+    (stable) lexsort, so ties keep the order of the file like
+    load_scores_from_file does. Scores of queries without true pairs are
+    ignored.
+
+    Ranking every candidate is not needed to compute a CMC curve: with
+    rank=False scores are kept in the order of the file and the rank of
+    each true match is found by counting the candidates of its query
+    scoring better than it (see get_true_match_ranks), in linear time.
+
+    @param scores_filename: The scores file address (text or .npz, see
+        load_scores_from_file).
+    @type scores_filename: str
+    @param true_pairs_filename: The true pairs file address (text or
+        .npz, see load_scores_from_file).
+    @type true_pairs_filename: str
+    @param ds_scores: Indicates whether te input scores are dissimilarity
+        scores.
+    @type ds_scores: bool
+    @param delimiter: The boundary string of input files.
+    @type delimiter: str, default ' '
+    @param block_size: The number of bytes of the scores file read at once
+    @type block_size: int
+    @param rank: Indicates whether to rank the candidates of each query
+    @type rank: bool
+
+    @returns: The match information, accepted by get_cmc_curve
+    @rtype: CMCScores
+    """
+    query_codes = {}
+    template_codes = {}
+
+    # Queries of the true pairs get the first codes
+    true_pairs = __read_true_pair_codes(true_pairs_filename, delimiter,
+                                        query_codes, template_codes)
+    queries_total = len(query_codes)
+
+    blocks = []
+    for queries, templates, scores in __read_score_columns(
+            scores_filename, delimiter, block_size):
+        blocks.append((__intern(queries, query_codes),
+                       __intern(templates, template_codes), scores))
+
+    if blocks:
+        qcodes, tcodes, scores = (np.concatenate(c) for c in zip(*blocks))
+    else:
+        qcodes = tcodes = np.empty(0, dtype=np.int32)
+        scores = np.empty(0)
+    del blocks
+
+    # Ignoring the scores of queries without true pairs
+    known = qcodes < queries_total
+    if not known.all():
+        qcodes, tcodes, scores = qcodes[known], tcodes[known], scores[known]
+    del known
+
+    if rank:
+        # Grouping by query and ranking the candidates of each query
+        order = np.lexsort((scores if ds_scores else -scores, qcodes))
+        qcodes, tcodes, scores = qcodes[order], tcodes[order], scores[order]
+        del order
+
+    # Codes are assigned in order of appearance
+    queries = [query.decode() for query in query_codes]
+    templates = [template.decode() for template in template_codes]
+
+    return CMCScores(queries=queries[:queries_total], templates=templates,
+                     query_codes=qcodes, template_codes=tcodes,
+                     scores=scores, true_queries=true_pairs[:, 0],
+                     true_templates=true_pairs[:, 1], ranked=rank,
+                     ds_scores=ds_scores)
+
+
+def load_cmc_matrix(matrix, probe_labels, gallery_labels, ds_scores=False):
+    """Loads the match information of a dense scores matrix
+
+    The true templates of each probe are the gallery templates with its
+    same label, so no (query template score) triplets are needed. .npy
+    matrices are memory-mapped and get_cmc_curve reads them by blocks of
+    probes (rows).
+
+    @param matrix: The scores matrix (probes x gallery) or its .npy file
+    @type matrix: Union[ndarray, str]
+    @param probe_labels: The identity label of each probe, or its file
+        (.npy or text, one label per line)
+    @type probe_labels: Union[ndarray, list, str]
+    @param gallery_labels: The identity label of each gallery template, or
+        its file (.npy or text, one label per line)
+    @type gallery_labels: Union[ndarray, list, str]
+    @param ds_scores: Indicates whether te input scores are dissimilarity
+        scores.
+    @type ds_scores: bool
+
+    @returns: The match information, accepted by get_cmc_curve
+    @rtype: CMCMatrix
+    """
+    if isinstance(matrix, str):
+        matrix = np.load(matrix, mmap_mode='r')
+
+    probe_labels = __read_labels(probe_labels)
+    gallery_labels = __read_labels(gallery_labels)
+
+    if matrix.ndim != 2 or matrix.shape != (len(probe_labels),
+                                            len(gallery_labels)):
+        raise ValueError('The scores matrix shape %s does not match the'
+                         ' number of probe (%d) and gallery (%d) labels' %
+                         (matrix.shape, len(probe_labels),
+                          len(gallery_labels)))
+
+    # Labels are compared as integer codes
+    _, codes = np.unique(np.concatenate((probe_labels, gallery_labels)),
+                         return_inverse=True)
+    codes = codes.ravel()
+
+    return CMCMatrix(matrix=matrix, probe_labels=codes[:len(probe_labels)],
+                     gallery_labels=codes[len(probe_labels):],
+                     ds_scores=ds_scores)
+
+
+def convert_cmc_file(filename, out_filename, delimiter=' '):
+    """Converts a text scores file or true pairs file to a .npz file
+
+    Scores files (query template score) are saved as the arrays queries,
+    templates and scores. True pairs files (query true_template) are
+    saved as the arrays queries and templates.
+
+    @param filename: The text scores or true pairs file
+    @type filename: str
+    @param out_filename: The .npz file
+    @type out_filename: str
+    @param delimiter: The boundary string of the input file.
+    @type delimiter: str, default ' '
+    """
+    with open(filename) as sf:
+        first = sf.readline()
+
+    if len(first.split(delimiter)) < 3:
+        queries, templates = zip(*__read_true_pairs(filename, delimiter))
+        np.savez(out_filename, queries=np.array(queries),
+                 templates=np.array(templates))
+    else:
+        queries, templates, scores = zip(*__read_scores(filename, delimiter))
+        np.savez(out_filename, queries=np.array(queries),
+                 templates=np.array(templates),
+                 scores=np.array(scores, dtype=np.float64))
+
+
+def __read_true_pairs(filename, delimiter):
+    """Reads the (query, true template) pairs of a true pairs file
+
+    @param filename: The true pairs file (text or .npz)
+    @type filename: str
+    @param delimiter: The boundary string of text files
+    @type delimiter: str
+
+    @returns: A generator of (query, template) tuples
+    @rtype: generator
+    """
+    if splitext(filename)[1].lower() == '.npz':
+        with np.load(filename) as arrays:
+            queries = arrays['queries'].astype(str).tolist()
+            templates = arrays['templates'].astype(str).tolist()
+        for pair in zip(queries, templates):
+            yield pair
+        return
+
+    with open(filename) as tpf:
         for line in tpf:
             query, template = line.split(delimiter, 1)
+            yield query, template.strip()
 
-            if query in matching_scores:
-                matching_scores[query][TEMPLATE_POS].append(template.strip())
-            else:
-                matching_scores[query] = ([template.strip()], [])
 
-    with open(scores_filename) as sf:
+def __read_labels(labels):
+    """Reads a labels vector (.npy or text file, one label per line)
+
+    @param labels: The labels or the labels file
+    @type labels: Union[ndarray, list, str]
+
+    @returns: The labels
+    @rtype: ndarray
+    """
+    if not isinstance(labels, str):
+        return np.asarray(labels).ravel()
+
+    if splitext(labels)[1].lower() == '.npy':
+        return np.load(labels).ravel()
+
+    with open(labels) as lf:
+        return np.array([line.strip() for line in lf if line.strip()])
+
+
+def __read_true_pair_codes(filename, delimiter, query_codes,
+                           template_codes):
+    """Reads the true pairs of a true pairs file as integer codes
+
+    @param filename: The true pairs file (text or .npz)
+    @type filename: str
+    @param delimiter: The boundary string of text files
+    @type delimiter: str
+    @param query_codes: Dictionary {query id (bytes): code}, new queries
+        are added to it
+    @type query_codes: dict
+    @param template_codes: Dictionary {template id (bytes): code}, new
+        templates are added to it
+    @type template_codes: dict
+
+    @returns: The (query code, template code) of each true pair
+    @rtype: ndarray
+    """
+    true_pairs = [(query_codes.setdefault(query.encode(), len(query_codes)),
+                   template_codes.setdefault(template.encode(),
+                                             len(template_codes)))
+                  for query, template in __read_true_pairs(filename,
+                                                           delimiter)]
+    return np.array(true_pairs, dtype=np.int64).reshape(-1, 2)
+
+
+def __read_scores(filename, delimiter):
+    """Reads the (query, template, score) tuples of a scores file
+
+    @param filename: The scores file (text or .npz)
+    @type filename: str
+    @param delimiter: The boundary string of text files
+    @type delimiter: str
+
+    @returns: A generator of (query, template, score) tuples
+    @rtype: generator
+    """
+    if splitext(filename)[1].lower() == '.npz':
+        with np.load(filename) as arrays:
+            queries = arrays['queries'].astype(str).tolist()
+            templates = arrays['templates'].astype(str).tolist()
+            scores = arrays['scores'].tolist()
+        for match in zip(queries, templates, scores):
+            yield match
+        return
+
+    with open(filename) as sf:
         for line in sf:
             query, template, score = line.split(delimiter)[:3]
-            matching_scores[query][SCORE_POS].append((template, float(score)))
+            yield query, template, float(score)
 
-    for query_match_info in matching_scores.values():
-        query_match_info[SCORE_POS].sort(key=operator.itemgetter(SCORE_POS),
-                                         reverse=not ds_scores)
 
-    return matching_scores
+def get_true_match_ranks(scores, max_rank=None):
+    """Finds the rank of the true matches of each query
+
+    @param scores: The dictionary returned by the function
+        load_scores_from_file or a similar one, or the arrays returned by
+        load_cmc_scores or load_cmc_matrix.
+    @type scores: Union[dict, CMCScores, CMCMatrix]
+    @param max_rank: If given, only candidates ranked up to max_rank are
+        checked.
+    @type max_rank: int
+
+    @return: The rank (starting from zero) of each candidate which is a
+        true template of its query. Queries with several true templates
+        found among their candidates have a rank for each one.
+    @rtype: ndarray
+    """
+    if isinstance(scores, CMCScores):
+        return __get_columnar_ranks(scores, max_rank)
+    if isinstance(scores, CMCMatrix):
+        return __get_matrix_ranks(scores, max_rank)
+
+    ranks = []
+    for true_templates, candidates in scores.values():
+        true_templates = set(true_templates)
+        if max_rank is not None:
+            candidates = candidates[:max_rank]
+
+        ranks.extend(r for r, (template, _) in enumerate(candidates)
+                     if template in true_templates)
+
+    return np.array(ranks, dtype=np.int64)
+
+
+def get_cmc_curve_from_ranks(ranks, queries_total, max_rank):
+    """Calculates the values of a CMC curve from the true match ranks
+
+    @param ranks: The rank of the true matches returned by
+        get_true_match_ranks
+    @type ranks: ndarray
+    @param queries_total: The number of queries
+    @type queries_total: int
+    @param max_rank: The maximum rank to calculate the penetration
+        coefficient.
+    @type max_rank : int
+
+    @return: A list with the rank values.
+    @rtype: list
+    """
+    ranks = np.asarray(ranks)
+    in_rank = np.bincount(ranks[ranks < max_rank], minlength=max_rank)
+
+    # Identification rates accumulated rank by rank
+    ranks_values = np.cumsum(in_rank[:max_rank] / queries_total)
+
+    # Values reaching 1.0 (and the following ones) are set to 1.0
+    reached = np.flatnonzero(ranks_values >= 1.0)
+    if len(reached):
+        ranks_values[reached[0]:] = 1.0
+
+    if (ranks_values[-1] if max_rank > 0 else 0.0) < 0.2:
+        warn("It is possible that you had set the wrong score"
+             " type. Please consider reviewing if you are using"
+             " dissimilarity or similarity scores")
+
+    return ranks_values.tolist()
 
 
 def get_cmc_curve(scores, max_rank):
     """Calculates the values of a CMC curve
 
+    The rank of the true matches of each query is found once (see
+    get_true_match_ranks) and the curve is computed from their counts.
+
     @param scores: The dictionary returned by the function
-        load_scores_from_file or a similar one.
-    @type scores: dict
+        load_scores_from_file or a similar one, or the arrays returned by
+        load_cmc_scores or load_cmc_matrix.
+    @type scores: Union[dict, CMCScores, CMCMatrix]
     @param max_rank: The maximum rank to calculate the penetration coefficient.
     @type max_rank : int
 
     @return: A list with the rank values.
     @rtype: list
     """
-    ranks_values = [0.0] * (max_rank + 1)
-    queries_total = len(scores)
+    ranks = get_true_match_ranks(scores, max_rank)
+    if isinstance(scores, CMCScores):
+        queries_total = len(scores.queries)
+    elif isinstance(scores, CMCMatrix):
+        queries_total = len(scores.probe_labels)
+    else:
+        queries_total = len(scores)
+    return get_cmc_curve_from_ranks(ranks, queries_total, max_rank)
 
-    # Calculating identification rates
-    for r in range(max_rank):
 
-        # Calculating identification rate at Rank-r
-        in_rank = 0.0
-        for query_match_info in scores.values():
+def get_streamed_true_match_ranks(scores_filename, true_pairs_filename,
+                                  ds_scores=False, delimiter=' ',
+                                  max_rank=None,
+                                  block_size=DEFAULT_BLOCK_SIZE):
+    """Finds the rank of the true matches reading a scores file grouped
+    by query
 
-            if r < len(query_match_info[SCORE_POS]):
-                # Candidate at position r
-                candidate = query_match_info[SCORE_POS][r][TEMPLATE_POS]
+    The scores of each query must be contiguous in the file (like the logs
+    written probe by probe, or files sorted externally by query). The file
+    is read by blocks and the rank of the true matches of each query is
+    found as soon as all of its candidates are read, so only the current
+    block and the candidates of a query are kept in memory instead of the
+    whole file.
 
-                # Checking if candidate is the corresponding positive id
-                true_template = query_match_info[TEMPLATE_POS]
-                if candidate in true_template:
-                    in_rank += 1
+    @param scores_filename: The scores file address, grouped by query
+        (text or .npz, see load_scores_from_file).
+    @type scores_filename: str
+    @param true_pairs_filename: The true pairs file address (text or
+        .npz, see load_scores_from_file).
+    @type true_pairs_filename: str
+    @param ds_scores: Indicates whether te input scores are dissimilarity
+        scores.
+    @type ds_scores: bool
+    @param delimiter: The boundary string of input files.
+    @type delimiter: str, default ' '
+    @param max_rank: If given, only candidates ranked up to max_rank are
+        checked.
+    @type max_rank: int
+    @param block_size: The number of bytes of the scores file read at once
+    @type block_size: int
 
-        # Updating rank values
-        ranks_values[r + 1] = in_rank / queries_total + ranks_values[r]
-        if ranks_values[r + 1] >= 1.0:
-            ranks_values[r + 1:] = [1.0] * (len(ranks_values) - r - 1)
+    @raise ValueError: If the scores of a query are not contiguous.
 
-            break
+    @returns: (rank of the true matches, see get_true_match_ranks, number
+        of queries). Both can be passed to get_cmc_curve_from_ranks.
+    @rtype: tuple
+    """
+    query_codes = {}
+    template_codes = {}
 
-    if ranks_values[-1] < 0.2:
-        warn("It is possible that you had set the wrong score"
-             " type. Please consider reviewing if you are using"
-             " dissimilarity or similarity scores")
+    true_pairs = __read_true_pair_codes(true_pairs_filename, delimiter,
+                                        query_codes, template_codes)
+    queries_total = len(query_codes)
+    true_pairs = (true_pairs[:, 0] << 32) | true_pairs[:, 1]
+
+    ranks = []
+    finished = set()
+    pending = None
+    for queries, templates, scores in __read_score_columns(
+            scores_filename, delimiter, block_size):
+        block = (__intern(queries, query_codes),
+                 __intern(templates, template_codes), scores)
+        if pending is not None:
+            block = tuple(np.concatenate(c) for c in zip(pending, block))
+
+        # The last query of the block may continue in the next one
+        qcodes = block[0]
+        if not len(qcodes):
+            continue
+        split = np.flatnonzero(qcodes != qcodes[-1])
+        split = split[-1] + 1 if len(split) else 0
+        pending = tuple(c[split:] for c in block)
+
+        ranks.append(__get_grouped_ranks(*(c[:split] for c in block),
+                                         true_pairs=true_pairs,
+                                         queries_total=queries_total,
+                                         ds_scores=ds_scores,
+                                         finished=finished))
+        del block, qcodes
+
+    if pending is not None:
+        ranks.append(__get_grouped_ranks(*pending, true_pairs=true_pairs,
+                                         queries_total=queries_total,
+                                         ds_scores=ds_scores,
+                                         finished=finished))
+
+    ranks = np.concatenate(ranks) if ranks else np.empty(0, dtype=np.int64)
+    if max_rank is not None:
+        ranks = ranks[ranks < max_rank]
+
+    return ranks, queries_total
+
+
+def __get_grouped_ranks(qcodes, tcodes, scores, true_pairs, queries_total,
+                        ds_scores, finished):
+    """Finds the rank of the true matches of the complete queries of a
+    block (see get_streamed_true_match_ranks)"""
+    if not len(qcodes):
+        return np.empty(0, dtype=np.int64)
+
+    # Queries of the block in order, checking that they are not repeated
+    starts = np.flatnonzero(np.diff(qcodes)) + 1
+    block_queries = qcodes[np.concatenate(([0], starts))].tolist()
+    repeated = finished.intersection(block_queries)
+    if repeated or len(set(block_queries)) < len(block_queries):
+        raise ValueError('The scores file is not grouped by query')
+    finished.update(block_queries)
+
+    # Ignoring the scores of queries without true pairs
+    known = qcodes < queries_total
+    if not known.all():
+        qcodes, tcodes, scores = qcodes[known], tcodes[known], scores[known]
+        if not len(qcodes):
+            return np.empty(0, dtype=np.int64)
+
+    # Queries of the block are numbered from zero
+    groups = np.concatenate(([0], np.diff(qcodes) != 0)).cumsum()
+
+    pairs = (qcodes.astype(np.int64) << 32) | tcodes
+    true_rows = np.flatnonzero(np.isin(pairs, true_pairs))
+
+    return __count_better_candidates(groups, scores, true_rows,
+                                     groups[-1] + 1, ds_scores)
+
+
+def __get_columnar_ranks(scores, max_rank):
+    """Finds the rank of the true matches of each query (see
+    get_true_match_ranks) from the arrays returned by load_cmc_scores"""
+    qcodes = scores.query_codes
+
+    # Candidates which are true templates of their query
+    templates_total = len(scores.templates)
+    pairs = qcodes.astype(np.int64) * templates_total + scores.template_codes
+    true_pairs = scores.true_queries * templates_total + scores.true_templates
+    is_true = np.isin(pairs, true_pairs)
+    del pairs
+
+    if scores.ranked:
+        # Position of each score within the candidates of its query
+        counts = np.bincount(qcodes, minlength=len(scores.queries))
+        starts = np.cumsum(counts) - counts
+        ranks = np.flatnonzero(is_true) - starts[qcodes[is_true]]
+    else:
+        ranks = __count_better_candidates(qcodes, scores.scores,
+                                          np.flatnonzero(is_true),
+                                          len(scores.queries),
+                                          scores.ds_scores)
+
+    if max_rank is not None:
+        ranks = ranks[ranks < max_rank]
+
+    return ranks.astype(np.int64)
+
+
+def __get_matrix_ranks(scores, max_rank):
+    """Finds the rank of the true matches of each query (see
+    get_true_match_ranks) from a scores matrix, by blocks of probes"""
+    matrix = scores.matrix
+    probes_total, gallery_total = matrix.shape
+    columns = np.arange(gallery_total)
+
+    # Probes read at once, so a block takes about DEFAULT_BLOCK_SIZE bytes
+    block_rows = max(1, DEFAULT_BLOCK_SIZE //
+                     max(1, gallery_total * matrix.dtype.itemsize))
+
+    ranks = []
+    for start in range(0, probes_total, block_rows):
+        block = np.asarray(matrix[start:start + block_rows])
+        labels = scores.probe_labels[start:start + block_rows]
+        rows, cols = np.nonzero(labels[:, None] == scores.gallery_labels)
+
+        # Probes with several true templates are handled one at a time
+        counts = np.bincount(rows, minlength=len(block))
+        starts = np.cumsum(counts) - counts
+        match = np.arange(len(rows)) - starts[rows]
+
+        block_ranks = np.empty(len(rows), dtype=np.int64)
+        for m in range(counts.max() if len(rows) else 0):
+            selected = match == m
+            values = block[rows[selected]]
+            true_scores = values[np.arange(len(values)),
+                                 cols[selected]][:, None]
+
+            # Better scores and same scores in previous columns
+            if scores.ds_scores:
+                before = values < true_scores
+            else:
+                before = values > true_scores
+            before |= ((values == true_scores) &
+                       (columns < cols[selected][:, None]))
+            block_ranks[selected] = before.sum(axis=1)
+
+        ranks.append(block_ranks)
+
+    ranks = np.concatenate(ranks) if ranks else np.empty(0, dtype=np.int64)
+    if max_rank is not None:
+        ranks = ranks[ranks < max_rank]
+
+    return ranks
+
+
+def __count_better_candidates(qcodes, values, true_rows, queries_total,
+                              ds_scores):
+    """Finds the rank of the true matches of unranked scores by counting
+    the candidates of their query ranked before them: those with a better
+    score and those with the same score found before in the file (like
+    the stable sort of the ranked scores)"""
+    positions = np.arange(len(qcodes))
+
+    # Queries with several true matches are handled one match at a time
+    true_queries = qcodes[true_rows]
+    order = np.argsort(true_queries, kind='stable')
+    counts = np.bincount(true_queries, minlength=queries_total)
+    starts = np.cumsum(counts) - counts
+    match = np.empty(len(true_rows), dtype=np.int64)
+    match[order] = np.arange(len(true_rows)) - starts[true_queries[order]]
+
+    ranks = np.empty(len(true_rows), dtype=np.int64)
+    for m in range(counts.max() if len(true_rows) else 0):
+        rows = true_rows[match == m]
+        queries = qcodes[rows]
+
+        # Score and position of the true match of the query of each score
+        true_scores = np.full(queries_total, np.nan)
+        true_scores[queries] = values[rows]
+        true_positions = np.full(queries_total, -1, dtype=np.int64)
+        true_positions[queries] = rows
+        true_scores = true_scores[qcodes]
+
+        if ds_scores:
+            before = values < true_scores
+        else:
+            before = values > true_scores
+        before |= ((values == true_scores) &
+                   (positions < true_positions[qcodes]))
+
+        ranks[match == m] = np.bincount(qcodes[before],
+                                        minlength=queries_total)[queries]
+
+    return ranks
+
+
+def __read_score_columns(filename, delimiter, block_size):
+    """Reads the columns of a scores file by blocks
+
+    @param filename: The scores file (text or .npz)
+    @type filename: str
+    @param delimiter: The boundary string of text files
+    @type delimiter: str
+    @param block_size: The number of bytes read at once
+    @type block_size: int
+
+    @returns: A generator of (queries, templates, scores), the ids as
+        lists of bytes and the scores as an array
+    @rtype: generator
+    """
+    if splitext(filename)[1].lower() == '.npz':
+        with np.load(filename) as arrays:
+            queries = arrays['queries'].astype(str).tolist()
+            templates = arrays['templates'].astype(str).tolist()
+            yield ([q.encode() for q in queries],
+                   [t.encode() for t in templates],
+                   arrays['scores'].astype(np.float64))
+        return
+
+    delimiter = delimiter.encode()
+    with open(filename, 'rb') as sf:
+        tail = b''
+        while True:
+            block = sf.read(block_size)
+            if not block:
+                break
+
+            # Parsing only complete lines
+            end = block.rfind(b'\n') + 1
+            if end == 0:
+                tail += block
+                continue
+
+            lines = tail + block[:end]
+            tail = block[end:]
+            yield __parse_score_lines(lines, delimiter)
+
+        if tail.strip():
+            yield __parse_score_lines(tail + b'\n', delimiter)
+
+
+def __parse_score_lines(lines, delimiter):
+    """Parses a block of complete lines of a scores file
+
+    @param lines: Complete lines (query template score)
+    @type lines: bytes
+    @param delimiter: The boundary string
+    @type delimiter: bytes
+
+    @returns: (queries, templates, scores), the ids as lists of bytes and
+        the scores as an array
+    @rtype: tuple
+    """
+    lines = lines.replace(b'\r\n', b'\n')
+
+    # Lines with exactly three columns are split at once
+    fields = None
+    if len(delimiter) == 1:
+        data = np.frombuffer(lines, dtype=np.uint8)
+        ends = np.flatnonzero(data == ord('\n'))
+        line_index = np.searchsorted(ends,
+                                     np.flatnonzero(data == delimiter[0]))
+        columns = np.bincount(line_index, minlength=len(ends))
+        if (columns == 2).all():
+            fields = lines[:-1].replace(b'\n', delimiter).split(delimiter)
+
+    if fields is None:
+        fields = []
+        for line in lines.split(b'\n'):
+            if line.strip():
+                fields.extend(line.split(delimiter)[:3])
+
+    scores = fields[2::3]
+    return (fields[0::3], fields[1::3],
+            np.fromiter(map(float, scores), dtype=np.float64,
+                        count=len(scores)))
+
+
+def __intern(ids, codes):
+    """Maps ids to integer codes, adding the new ones to codes
+
+    @param ids: The ids
+    @type ids: list
+    @param codes: Dictionary {id: code}
+    @type codes: dict
+
+    @returns: The code of each id
+    @rtype: ndarray
+    """
+    for i in dict.fromkeys(ids):
+        codes.setdefault(i, len(codes))
 
-    return ranks_values[1:]
+    return np.fromiter(map(codes.__getitem__, ids), dtype=np.int32,
+                       count=len(ids))
@@ -1,17 +1,32 @@
 # -*- coding:utf-8 -*-
 
 import argparse
+import tempfile
 
-from os.path import join, isdir, basename
+from warnings import warn
+from concurrent.futures import ProcessPoolExecutor
+
+from os.path import join, isdir, basename, getsize
 from os import listdir
 
 import numpy as np
 
-from .eer_stats import calculate_roc, calculate_roc_hist, calculate_roc_auc,\
-    get_fmr_op, get_fnmr_op, get_eer_values, Stats, get_decidability_value,\
-    get_youden_index, get_matthews_ccoef
-from .report import generate_eer_report, export_error_rates
-from .plot import plot_eer_stats
+from .eer_stats import calculate_roc, calculate_roc_hist, get_stats_from_roc,\
+    calculate_roc_ooc, is_out_of_core, DEFAULT_MAX_MEMORY, Stats,\
+    calculate_roc_batch, get_eer_values_batch, get_fmr_op_batch,\
+    get_fnmr_op_batch, calculate_roc_auc_batch, get_youden_index_batch,\
+    get_matthews_ccoef_batch, get_decidability_value, decimate_stats,\
+    LazyStats, compact_stats, calculate_rank_auc, get_score_histogram,\
+    ScoreHistogram
+from .bootstrap import get_bootstrap_stats
+from .report import generate_eer_report, export_error_rates,\
+    generate_bootstrap_report
+from .plot import plot_eer_stats, plt_distributions
+from .loaders import load_scores, is_binary_file, convert_scores,\
+    load_binary_scores
+from .cache import CurveCache
+from .profiling import Profiler, stage, register_hook, unregister_hook,\
+    has_hooks, emit, save_profile
 
 __copyright__ = 'Copyright 2017'
 __author__ = u'Bsc. Manuel Aguado Martínez'
@@ -32,17 +47,263 @@ def __get_files(base_path, arg_val):
         return [f.strip() for f in arg_val.split(',')]
 
 
-def __get_score(line):
-    """Get the score value from an input score file line
+def __load_scores(scores, hformat, dtype):
+    """Loads the score filenames given to get_eer_stats
+
+    Binary files are kept as filenames (processed out-of-core) except in
+    histogram format, raw files without a known extension are
+    memory-mapped if their dtype is given and text files are loaded by
+    blocks.
+    """
+    if not isinstance(scores, str):
+        return scores
+
+    if not is_binary_file(scores) and dtype is not None:
+        scores = load_binary_scores(scores, dtype)
+    elif hformat or not is_binary_file(scores):
+        scores = load_scores(scores)
+
+    return np.asarray(scores) if hformat else scores
+
+
+def __get_cache_entry(stats, hformat, bins):
+    """Returns the arrays to cache for the given stats
+
+    @param stats: Stats computed with get_eer_stats(lazy=True)
+    @type stats: LazyStats
+    @param hformat: Indicates whether the impostor scores are in histogram
+        format
+    @type hformat: bool
+    @param bins: The number of bins of the score histograms (ignored if
+        hformat=True)
+    @type bins: int
+
+    @returns: The arrays of the cache entry
+    @rtype: dict
+    """
+    entry = {
+        'thrs': np.asarray(stats.thrs),
+        'thrs_list': np.asarray(isinstance(stats.thrs, list)),
+        'fm': stats.fm,
+        'fnm': stats.fnm,
+        'moments': np.array([stats.gnumber, stats.inumber, stats.gmean,
+                             stats.gstd, stats.imean, stats.istd]),
+        'bins': np.asarray(bins),
+    }
+
+    # Scores are kept as the histograms of the distribution plots
+    if stats.gen_scores is not None:
+        entry['gedges'], entry['gcounts'] = get_score_histogram(
+            stats.gen_scores, bins, hformat)
+    if stats.imp_scores is not None:
+        if hformat:
+            entry['icounts'] = np.asarray(stats.imp_scores)
+            entry['iedges'] = np.arange(len(entry['icounts']) + 1)
+        else:
+            entry['iedges'], entry['icounts'] = get_score_histogram(
+                stats.imp_scores, bins)
+
+    return entry
+
+
+def __get_cached_stats(entry, fmr_ops, fnmr_ops, pauc_ranges):
+    """Calculates the stats of a cache entry
+
+    @param entry: The arrays of the cache entry
+    @type entry: dict
+    @param fmr_ops: Additional FMR operating points
+    @type fmr_ops: iterable
+    @param fnmr_ops: Additional FNMR operating points
+    @type fnmr_ops: iterable
+    @param pauc_ranges: FMR ranges of partial areas under the ROC curve
+    @type pauc_ranges: iterable
+
+    @returns: The statistics (with score histograms instead of scores)
+    @rtype: LazyStats
+    """
+    thrs = entry['thrs']
+    if entry['thrs_list']:
+        thrs = thrs.tolist()
+
+    gnumber, inumber, gmean, gstd, imean, istd = entry['moments']
+
+    stats = get_stats_from_roc(thrs, entry['fm'], entry['fnm'], gnumber,
+                               inumber, gmean, gstd, imean, istd,
+                               fmr_ops=fmr_ops, fnmr_ops=fnmr_ops,
+                               pauc_ranges=pauc_ranges, lazy=True)
+    if 'gedges' in entry:
+        stats.gen_hist = ScoreHistogram(edges=entry['gedges'],
+                                        counts=entry['gcounts'])
+    if 'iedges' in entry:
+        stats.imp_hist = ScoreHistogram(edges=entry['iedges'],
+                                        counts=entry['icounts'])
+
+    return stats
 
-    @param line: An input score file line
-    @type line: str
 
-    @returns: The parsed score
-    @rtype: float
+def __evaluate_experiment(task):
+    """Loads the scores of an experiment and calculates its stats
+
+    @param task: ((genuine file, impostor file, experiment id), options)
+    @type task: tuple
+
+    @returns: (stats, bootstrap stats or None, stage records). Stages are
+        recorded here only for worker processes (options['profile']),
+        otherwise they are sent to the registered hooks.
+    @rtype: tuple
     """
-    sline = line.strip().split(' ')
-    return float(sline[-1])
+    exp, options = task
+    if not options['profile']:
+        return __run_experiment(exp, options) + ([],)
+
+    with Profiler() as profiler:
+        results = __run_experiment(exp, options)
+    return results + (profiler.records,)
+
+
+def __run_experiment(exp, options):
+    """Loads the scores of an experiment and calculates its stats
+
+    @param exp: (genuine file, impostor file, experiment id)
+    @type exp: tuple
+    @param options: The evaluation options
+    @type options: dict
+
+    @returns: (stats, bootstrap stats or None)
+    @rtype: tuple
+    """
+    gfile = join(options['path'], exp[0])
+    ifile = join(options['path'], exp[1])
+
+    fmr_ops = options['fmr_ops']
+    fnmr_ops = options['fnmr_ops']
+    pauc_ranges = options['pauc_ranges']
+
+    bootstrap = options['resamples'] > 0 and not options['hist']
+    out_of_core = not options['hist'] and (
+        getsize(gfile) > options['ooc_size'] or
+        getsize(ifile) > options['ooc_size'])
+
+    # Curves are cached unless bootstrap intervals are requested. Entries
+    # of out-of-core runs have no scores (for distribution plots), so the
+    # mode is part of the key
+    cache = key = None
+    exp_stats = exp_bstats = None
+    if options['cache'] and not bootstrap:
+        cache = CurveCache(options['cache_dir'], options['cache_size'])
+        key = cache.key([gfile, ifile], hist=options['hist'],
+                        ds_scores=options['ds_scores'],
+                        column=options['column'],
+                        delimiter=options['delimiter'],
+                        score_range=options['score_range'],
+                        out_of_core=out_of_core)
+
+        with stage('cache', exp[2]):
+            entry = cache.get(key)
+
+        # Histograms of another number of bins are computed again
+        if (entry is not None and not options['hist'] and
+                entry['bins'] != options['bins']):
+            entry = None
+
+        if entry is not None:
+            print('%s: Loading cached stats...' % exp[2])
+            exp_stats = __get_cached_stats(entry, fmr_ops, fnmr_ops,
+                                           pauc_ranges)
+
+    if exp_stats is not None:
+        pass
+    elif out_of_core:
+        with tempfile.TemporaryDirectory(dir=options['tmp_dir']) as tmp_dir:
+            # Binary files are memory-mapped, text files are converted
+            files = []
+            for name, filename in [('genuine', gfile), ('impostor', ifile)]:
+                if not is_binary_file(filename):
+                    print('%s: Converting %s scores file...' % (exp[2], name))
+                    bin_filename = join(tmp_dir, name + '_scores.f64')
+                    with stage('convert', exp[2]):
+                        convert_scores(filename, bin_filename,
+                                       options['column'],
+                                       options['delimiter'])
+                    filename = bin_filename
+                files.append(filename)
+            gen_scores, imp_scores = files
+
+            print('%s: Calculating stats out-of-core...' % exp[2])
+            with stage('roc', exp[2]):
+                exp_stats = get_eer_stats(gen_scores, imp_scores, False,
+                                          options['ds_scores'],
+                                          options['max_memory'], np.float64,
+                                          tmp_dir, fmr_ops, fnmr_ops,
+                                          pauc_ranges=pauc_ranges, lazy=True)
+    else:
+        # Loading scores
+        with stage('load', exp[2]):
+            print('%s: Loading genuine scores file...' % exp[2])
+            gen_scores = np.asarray(load_scores(gfile, options['column'],
+                                                options['delimiter']))
+
+            print('%s: Loading impostor scores file...' % exp[2])
+            imp_scores = np.asarray(load_scores(ifile, options['column'],
+                                                options['delimiter']))
+
+        if bootstrap:
+            print('%s: Calculating stats and bootstrap intervals...' %
+                  exp[2])
+            with stage('bootstrap', exp[2]):
+                exp_bstats = get_bootstrap_stats(gen_scores, imp_scores,
+                                                 options['ds_scores'],
+                                                 options['resamples'],
+                                                 options['confidence'],
+                                                 options['bootstrap_jobs'],
+                                                 fmr_ops=fmr_ops,
+                                                 fnmr_ops=fnmr_ops,
+                                                 pauc_ranges=pauc_ranges)
+            exp_stats = exp_bstats.stats
+        else:
+            print('%s: Calculating stats...' % exp[2])
+            with stage('roc', exp[2]):
+                exp_stats = get_eer_stats(gen_scores, imp_scores,
+                                          options['hist'],
+                                          options['ds_scores'],
+                                          fmr_ops=fmr_ops, fnmr_ops=fnmr_ops,
+                                          pauc_ranges=pauc_ranges, lazy=True,
+                                          score_range=options['score_range'])
+
+    if isinstance(exp_stats, LazyStats):
+        if cache is not None:
+            with stage('cache', exp[2]):
+                entry = __get_cache_entry(exp_stats, options['hist'],
+                                          options['bins'])
+                cache.put(key, entry)
+
+        with stage('metrics', exp[2]):
+            exp_stats = exp_stats.to_stats()
+
+    if options['decimation'] is not None:
+        with stage('decimate', exp[2]):
+            exp_stats = decimate_stats(exp_stats, *options['decimation'])
+
+    if options['distributions'] is not None:
+        hformat, bins, lgf_size, dpi, save_path, ext = \
+            options['distributions']
+        with stage('plot', exp[2]):
+            plt_distributions([exp_stats], [exp[2]], hformat, bins,
+                              lgf_size, True, dpi, save_path, ext)
+
+    if options['histograms'] is not None:
+        # Replacing the raw scores by histograms
+        exp_stats = compact_stats(exp_stats, options['hist'],
+                                  options['histograms'])
+        if exp_bstats is not None:
+            exp_bstats = exp_bstats._replace(stats=exp_stats)
+    elif options['compact']:
+        # Dropping the raw scores
+        exp_stats = exp_stats._replace(gen_scores=None, imp_scores=None)
+        if exp_bstats is not None:
+            exp_bstats = exp_bstats._replace(stats=exp_stats)
+
+    return exp_stats, exp_bstats
 
 
 def get_eer_info_cmd():
@@ -56,7 +317,8 @@ def get_eer_info_cmd():
                          " case, it is strongly recommended that genuine"
                          " scores files are specified in the same way and that"
                          " corresponding pairs of scores files (genuine and"
-                         " impostor) have the same name.")
+                         " impostor) have the same name. Binary files (.npy,"
+                         " .npz, .f32 and .f64) are also accepted.")
     ap.add_argument("-g", "--gscores_files", required=True,
                     help="The genuine scores files. Multiple files must be"
                          " separated by a comma. Instead of the filenames, a"
@@ -64,7 +326,8 @@ def get_eer_info_cmd():
                          " case, it is strongly recommended that impostor"
                          " scores files are specified in the same way and that"
                          " corresponding pairs of scores files (genuine and"
-                         " impostor) have the same name.")
+                         " impostor) have the same name. Binary files (.npy,"
+                         " .npz, .f32 and .f64) are also accepted.")
     ap.add_argument("-e", "--experiment_ids", required=False,
                     help="Experiment ID. Multiple IDs must be separated by"
                          " a comma. If not given, genuine score file names"
@@ -100,6 +363,92 @@ def get_eer_info_cmd():
     ap.add_argument("-nrs", "--no_resample_curves", required=False,
                     action='store_true',
                     help="Plotting all sample points for ROC and DET curves.")
+    ap.add_argument("-oc", "--ooc_size", required=False, default=1024,
+                    help="Size in MB of the scores files above which stats"
+                         " are computed out-of-core. Will be ignored if -ht"
+                         " is passed as parameter (default=1024)")
+    ap.add_argument("-mm", "--max_memory", required=False, default=256,
+                    help="Memory budget in MB to sort and merge scores"
+                         " out-of-core (default=256)")
+    ap.add_argument("-tmp", "--tmp_dir", required=False, default=None,
+                    help="Directory for temporary files of out-of-core"
+                         " computations. If not given, the system default"
+                         " is used")
+    ap.add_argument("-bs", "--bootstrap", required=False, default=0,
+                    help="The number of bootstrap resamples used to compute"
+                         " confidence intervals of EER, FMR1000, FMR100 and"
+                         " AUC. Will be ignored if -ht is passed as parameter"
+                         " or scores are processed out-of-core (default=0,"
+                         " no confidence intervals)")
+    ap.add_argument("-bc", "--bootstrap_confidence", required=False,
+                    default=0.95,
+                    help="The confidence level of bootstrap intervals"
+                         " (default=0.95)")
+    ap.add_argument("-bj", "--bootstrap_jobs", required=False, default=1,
+                    help="The number of processes used to compute bootstrap"
+                         " resamples (default=1)")
+    ap.add_argument("-fo", "--fmr_ops", required=False, default='',
+                    help="Additional FMR operating points to report. Multiple"
+                         " values must be separated by a comma"
+                         " (e.g. 1e-5,1e-6)")
+    ap.add_argument("-fno", "--fnmr_ops", required=False, default='',
+                    help="Additional FNMR operating points to report."
+                         " Multiple values must be separated by a comma"
+                         " (e.g. 0.01,0.05)")
+    ap.add_argument("-pa", "--pauc_ranges", required=False, default='',
+                    help="FMR ranges of partial areas under the ROC curve to"
+                         " report. Ranges must be given as low:high and"
+                         " multiple ranges must be separated by a comma"
+                         " (e.g. 0:0.001,0:0.01)")
+    ap.add_argument("-sc", "--score_column", required=False, default=-1,
+                    help="The index of the score column in the scores files."
+                         " Negative indexes count from the last column"
+                         " (default=-1, the last column)")
+    ap.add_argument("-sd", "--score_delimiter", required=False, default=None,
+                    help="The column delimiter of the scores files. If not"
+                         " given, columns are separated by whitespaces")
+    ap.add_argument("-j", "--jobs", required=False, default=1,
+                    help="The number of processes used to evaluate"
+                         " experiments in parallel (default=1)")
+    ap.add_argument("-nc", "--no-cache", dest='no_cache', required=False,
+                    action='store_true',
+                    help="Indicates whether to not use the cache of computed"
+                         " curves. The cache is used by default and written"
+                         " to ~/.cache/pyeer (see -cd). Curves are cached by"
+                         " score file (path, size and modification time) and"
+                         " score type, so changing only report or plot"
+                         " options does not recompute them. Not used with"
+                         " -bs")
+    ap.add_argument("-cd", "--cache_dir", required=False, default=None,
+                    help="The cache directory (default=$XDG_CACHE_HOME/pyeer"
+                         " or ~/.cache/pyeer)")
+    ap.add_argument("-cs", "--cache_size", required=False, default=1024,
+                    help="Maximum size in MB of the cache. The least recently"
+                         " used curves are removed first (default=1024)")
+    ap.add_argument("-sh", "--score_histograms", required=False,
+                    action='store_true',
+                    help="Indicates whether to keep only histograms (with"
+                         " the bins given by -hb) of the scores of each"
+                         " experiment instead of the raw scores, which are"
+                         " released as soon as its stats are computed."
+                         " Distribution plots are the same. Reduces memory"
+                         " when evaluating many experiments (see also -dt)")
+    ap.add_argument("-pr", "--profile", required=False, action='store_true',
+                    help="Indicates whether to record the wall time, CPU"
+                         " time and peak memory of each stage (loading,"
+                         " computing, reporting, plotting) of each"
+                         " experiment. A summary table is printed and a JSON"
+                         " trace is saved to pyeer_profile.json")
+    ap.add_argument("-dt", "--decimation", required=False, default=None,
+                    help="Maximum distance between the exported/plotted"
+                         " DET curves and the full curves. If given, curves"
+                         " are decimated to the points needed to keep"
+                         " within this distance. Stats are always computed"
+                         " from the full curves")
+    ap.add_argument("-ld", "--log_decimation", required=False,
+                    action='store_true',
+                    help="Indicates that the decimation distance is measured"
+                         " in log scale (decades)")
     args = ap.parse_args()
 
     # Parsing arguments
@@ -119,52 +468,136 @@ def get_eer_info_cmd():
     ext = '.' + args.plots_format
     bins = int(args.distribution_bins)
 
+    # Operating points arguments
+    fmr_ops = [float(op) for op in args.fmr_ops.split(',') if op.strip()]
+    fnmr_ops = [float(op) for op in args.fnmr_ops.split(',') if op.strip()]
+    pauc_ranges = [tuple(float(v) for v in r.split(':'))
+                   for r in args.pauc_ranges.split(',') if r.strip()]
+
+    # Per experiment options
+    options = {
+        'path': args.path,
+        'column': int(args.score_column),
+        'delimiter': args.score_delimiter,
+        'hist': args.hist,
+        'ds_scores': args.ds_scores,
+        'ooc_size': float(args.ooc_size) * 2 ** 20,
+        'max_memory': int(float(args.max_memory) * 2 ** 20),
+        'tmp_dir': args.tmp_dir,
+        'resamples': int(args.bootstrap),
+        'confidence': float(args.bootstrap_confidence),
+        'bootstrap_jobs': int(args.bootstrap_jobs),
+        'fmr_ops': fmr_ops,
+        'fnmr_ops': fnmr_ops,
+        'pauc_ranges': pauc_ranges,
+        'score_range': None,
+        'cache': not args.no_cache,
+        'cache_dir': args.cache_dir,
+        'cache_size': int(float(args.cache_size) * 2 ** 20),
+        'bins': bins,
+        'compact': False,
+        'distributions': None,
+        'histograms': bins if args.score_histograms else None,
+        'decimation': None,
+        'profile': False,
+    }
+
+    # Curves are decimated as soon as each experiment is evaluated
+    if args.decimation is not None:
+        options['decimation'] = (float(args.decimation),
+                                 args.log_decimation)
+
+    profiler = None
+    if args.profile:
+        profiler = Profiler()
+        register_hook(profiler)
+
+    jobs = int(args.jobs)
+    tasks = [(exp, options) for exp in experiments]
+
+    if jobs > 1:
+        # Score distributions are plotted by the workers, so raw scores
+        # are not sent back to the main process
+        options['compact'] = True
+        if not args.no_plots and not args.score_histograms:
+            options['distributions'] = (args.hist, bins, lgf_size, dpi,
+                                        args.save_path, ext)
+
+        # Stages run by the workers are recorded there and sent back
+        options['profile'] = has_hooks()
+
+        with ProcessPoolExecutor(jobs) as executor:
+            results = list(executor.map(__evaluate_experiment, tasks))
+    else:
+        results = [__evaluate_experiment(task) for task in tasks]
+
     # Experiment stats
     stats = []
     ids = []
+    bootstrap_stats = []
+    bootstrap_ids = []
 
-    for exp in experiments:
-        # Loading scores
-        print('%s: Loading genuine scores file...' % exp[2])
-        with open(join(args.path, exp[0])) as tf:
-            gen_scores = [__get_score(line) for line in tf]
-
-        print('%s: Loading impostor scores file...' % exp[2])
-        with open(join(args.path, exp[1])) as tf:
-            imp_scores = [__get_score(line) for line in tf]
+    for (exp, _), (exp_stats, exp_bstats, records) in zip(tasks, results):
+        for record in records:
+            emit(record)
 
-        print('%s: Calculating stats...' % exp[2])
-        exp_stats = get_eer_stats(gen_scores, imp_scores,
-                                  args.hist, args.ds_scores)
         stats.append(exp_stats)
         ids.append(exp[2])
 
+        if exp_bstats is not None:
+            bootstrap_stats.append(exp_bstats)
+            bootstrap_ids.append(exp[2])
+
     # Generating reports
     print('Generating report...')
 
-    filename = join(args.save_path, 'pyeer_report.' + args.report_format)
-    generate_eer_report(stats, ids, filename)
+    with stage('report'):
+        filename = join(args.save_path,
+                        'pyeer_report.' + args.report_format)
+        generate_eer_report(stats, ids, filename)
+
+        if bootstrap_stats:
+            filename = join(args.save_path, 'pyeer_bootstrap_report.csv')
+            generate_bootstrap_report(bootstrap_stats, bootstrap_ids,
+                                      filename)
 
     # Exporting error rates
-    for i, st in enumerate(stats):
-        filename = join(args.save_path, ids[i] + ' (Rates).csv')
-        export_error_rates(st.fmr, st.fnmr, filename)
+    with stage('export'):
+        for i, st in enumerate(stats):
+            filename = join(args.save_path, ids[i] + ' (Rates).csv')
+            export_error_rates(st.fmr, st.fnmr, filename)
 
     if not args.no_plots:
         print('Plotting...')
-        plot_eer_stats(stats, ids, line_width, args.hist, bins, lgf_size,
-                       True, dpi, args.save_path, ext,
-                       not args.no_resample_curves)
+        with stage('plot'):
+            plot_eer_stats(stats, ids, line_width, args.hist, bins,
+                           lgf_size, True, dpi, args.save_path, ext,
+                           not args.no_resample_curves)
+
+    if profiler is not None:
+        unregister_hook(profiler)
+        save_profile(profiler, args.save_path)
 
 
-def get_eer_stats(gen_scores, imp_scores, hformat=False, ds_scores=False):
+def get_eer_stats(gen_scores, imp_scores, hformat=False, ds_scores=False,
+                  max_memory=DEFAULT_MAX_MEMORY, dtype=None,
+                  tmp_dir=None, fmr_ops=(), fnmr_ops=(), lazy=False,
+                  score_range=None, pauc_ranges=()):
     """Calculates EER associated statistics
 
+    Memory-mapped arrays (e.g. loaded from .npy files) and binary score
+    filenames (.npy, .npz, .f32 and .f64) are processed out-of-core. In
+    that case, the raw scores are not stored in the returned stats
+    (gen_scores and imp_scores will be None). Raw binary files without a
+    known extension are processed out-of-core too if their dtype is
+    given. Other filenames (and every filename in histogram format) are
+    loaded with loaders.load_scores.
+
     Keyword Arguments:
     @param gen_scores: The genuine scores
-    @type gen_scores: list
+    @type gen_scores: Union[list, ndarray, memmap, str]
     @param imp_scores: The impostor scores
-    @type imp_scores: list
+    @type imp_scores: Union[list, ndarray, memmap, str]
     @param id: An id for the experiment
     @type id: str
     @param hformat: Indicates whether the impostor scores are in histogram
@@ -173,7 +606,51 @@ def get_eer_stats(gen_scores, imp_scores, hformat=False, ds_scores=False):
     @param ds_scores: Indicates whether the input scores are dissimilarity
         scores
     @type ds_scores: bool
+    @param max_memory: Memory budget in bytes to sort and merge scores
+        out-of-core
+    @type max_memory: int
+    @param dtype: The data type of raw binary score files without a known
+        extension. If not given, such files are loaded as text files.
+    @type dtype: numpy.dtype
+    @param tmp_dir: Directory for the temporary files of the out-of-core
+        computation. If not given, the system default is used.
+    @type tmp_dir: str
+    @param fmr_ops: Additional FMR operating points (e.g. [1e-5, 1e-6])
+        reported in the custom_ops field of the stats
+    @type fmr_ops: iterable
+    @param fnmr_ops: Additional FNMR operating points (e.g. [0.01, 0.05])
+        reported in the custom_ops field of the stats
+    @type fnmr_ops: iterable
+    @param lazy: Indicates whether to return a LazyStats object computing
+        each statistic on first access (e.g. only the EER for a quick
+        check) instead of computing all of them
+    @type lazy: bool
+    @param score_range: (lowest, highest) possible integer score. If
+        given, scores are counted instead of sorted (see
+        eer_stats.calculate_roc). Integer scores spanning a small range
+        are detected and counted even if not given.
+    @type score_range: tuple
+    @param pauc_ranges: (lowest, highest) FMR of each partial area under
+        the ROC curve (e.g. [(0, 0.001)]) reported in the paucs field of
+        the stats
+    @type pauc_ranges: iterable
     """
+    gen_scores, imp_scores = [__load_scores(scores, hformat, dtype)
+                              for scores in [gen_scores, imp_scores]]
+
+    if not hformat and (is_out_of_core(gen_scores) or
+                        is_out_of_core(imp_scores)):
+        thrs, fm, fnm, gdist, idist = calculate_roc_ooc(
+            gen_scores, imp_scores, ds_scores, False, max_memory, dtype,
+            tmp_dir, moments=True)
+        gnumber, gmean, gstd = gdist
+        inumber, imean, istd = idist
+
+        return get_stats_from_roc(thrs, fm, fnm, gnumber, inumber, gmean,
+                                  gstd, imean, istd, fmr_ops=fmr_ops,
+                                  fnmr_ops=fnmr_ops, pauc_ranges=pauc_ranges,
+                                  lazy=lazy)
+
     if hformat:
         # Calculating probabilities histogram format
         roc_info = calculate_roc_hist(gen_scores, imp_scores,
@@ -183,38 +660,13 @@ def get_eer_stats(gen_scores, imp_scores, hformat=False, ds_scores=False):
     else:
         # Calculating probabilities using scores as thrs
         roc_info = calculate_roc(gen_scores, imp_scores,
-                                 ds_scores, rates=False)
+                                 ds_scores, rates=False,
+                                 score_range=score_range)
         gnumber = len(gen_scores)
         inumber = len(imp_scores)
 
     # Unboxing probability rates and info
     thrs, fm, fnm = roc_info
-    fmr = fm / inumber
-    fnmr = fnm / gnumber
-
-    # Estimating EER
-    eer_ind, eer_low, eer_high, eer = get_eer_values(fmr, fnmr)
-    eer_th = thrs[eer_ind]
-
-    # Estimating FMR operating points
-    ind, fmr0 = get_fmr_op(fmr, fnmr, 0)
-    fmr0_th = thrs[ind]
-
-    ind, fmr1000 = get_fmr_op(fmr, fnmr, 0.001)
-    fmr1000_th = thrs[ind]
-
-    ind, fmr100 = get_fmr_op(fmr, fnmr, 0.01)
-    fmr100_th = thrs[ind]
-
-    ind, fmr20 = get_fmr_op(fmr, fnmr, 0.05)
-    fmr20_th = thrs[ind]
-
-    ind, fmr10 = get_fmr_op(fmr, fnmr, 0.1)
-    fmr10_th = thrs[ind]
-
-    # Estimating FNMR operating points
-    ind, fnmr0 = get_fnmr_op(fmr, fnmr, 0)
-    fnmr0_th = thrs[ind]
 
     # Calculating distributions mean and variance
     gmean = np.mean(gen_scores)
@@ -231,25 +683,87 @@ def get_eer_stats(gen_scores, imp_scores, hformat=False, ds_scores=False):
         imean = np.mean(imp_scores)
         istd = np.std(imp_scores)
 
-    dec = get_decidability_value(gmean, gstd, imean, istd)
+    return get_stats_from_roc(thrs, fm, fnm, gnumber, inumber, gmean, gstd,
+                              imean, istd, gen_scores, imp_scores, fmr_ops,
+                              fnmr_ops, pauc_ranges, lazy)
+
+
+def get_eer_stats_batch(gen_scores, imp_scores, ds_scores=False):
+    """Calculates EER associated statistics for several experiments at once
 
-    # Calculating area under the ROC curve
-    auc = calculate_roc_auc(fmr, fnmr)
+    Experiments must share the number of genuine and impostor scores
+    (e.g. several models evaluated on the same comparisons). Curves and
+    metrics of all the experiments are computed with array operations
+    along the experiments axis.
 
-    j_index, j_index_th = get_youden_index(fmr, fnmr)
-    j_index_th = thrs[j_index_th]
+    @param gen_scores: The genuine scores (experiments x scores)
+    @type gen_scores: ndarray
+    @param imp_scores: The impostor scores (experiments x scores)
+    @type imp_scores: ndarray
+    @param ds_scores: Indicates whether the input scores are dissimilarity
+        scores
+    @type ds_scores: bool
+
+    @returns: The statistics of each experiment
+    @rtype: list
+    """
+    gen_scores = np.atleast_2d(np.asarray(gen_scores, dtype=np.float64))
+    imp_scores = np.atleast_2d(np.asarray(imp_scores, dtype=np.float64))
 
-    mccoef, mccoef_th = get_matthews_ccoef(fm, fnm, gnumber, inumber)
-    mccoef_th = thrs[mccoef_th]
+    gnumber = gen_scores.shape[1]
+    inumber = imp_scores.shape[1]
 
-    # Stacking stats
-    return Stats(thrs=thrs, fmr=fmr, fnmr=fnmr, auc=auc, eer=eer,
-                 fmr0=fmr0, fmr100=fmr100, fmr1000=fmr1000,
-                 fmr20=fmr20, fmr10=fmr10, fnmr0=fnmr0,
-                 gen_scores=gen_scores, imp_scores=imp_scores,
-                 gmean=gmean, gstd=gstd, imean=imean, istd=istd,
-                 eer_low=eer_low, eer_high=eer_high, decidability=dec,
-                 j_index=j_index, j_index_th=j_index_th, eer_th=eer_th,
-                 mccoef=mccoef, mccoef_th=mccoef_th, fmr0_th=fmr0_th,
-                 fmr1000_th=fmr1000_th, fmr100_th=fmr100_th,
-                 fmr20_th=fmr20_th, fmr10_th=fmr10_th, fnmr0_th=fnmr0_th)
+    thrs, fm, fnm, mask = calculate_roc_batch(gen_scores, imp_scores,
+                                              ds_scores, rates=False)
+    fmr = fm / inumber
+    fnmr = fnm / gnumber
+    rows = np.arange(len(thrs))
+
+    # Estimating EER
+    eer_ind, eer_low, eer_high, eer = get_eer_values_batch(fmr, fnmr)
+
+    # Estimating operating points
+    ops = {}
+    for name, op in [('fmr0', 0), ('fmr1000', 0.001), ('fmr100', 0.01),
+                     ('fmr20', 0.05), ('fmr10', 0.1)]:
+        ind, ops[name] = get_fmr_op_batch(fmr, fnmr, op)
+        ops[name + '_th'] = thrs[rows, ind]
+
+    ind, ops['fnmr0'] = get_fnmr_op_batch(fmr, fnmr, 0)
+    ops['fnmr0_th'] = thrs[rows, ind]
+
+    # Calculating distributions mean and variance
+    gmean = gen_scores.mean(axis=1)
+    gstd = gen_scores.std(axis=1)
+    imean = imp_scores.mean(axis=1)
+    istd = imp_scores.std(axis=1)
+
+    # Calculating area under the ROC curves
+    auc = calculate_roc_auc_batch(fmr, fnmr, mask)
+    if (auc < 0.5).any():
+        warn("It is possible that you had set the wrong score"
+             " type. Please consider reviewing if you are using"
+             " dissimilarity or similarity scores")
+
+    j_index, j_index_th = get_youden_index_batch(fmr, fnmr)
+    mccoef, mccoef_th = get_matthews_ccoef_batch(fm, fnm, gnumber, inumber)
+
+    stats = []
+    for i in rows:
+        st = Stats(thrs=thrs[i][mask[i]], fmr=fmr[i][mask[i]],
+                   fnmr=fnmr[i][mask[i]], auc=auc[i], eer=eer[i],
+                   gen_scores=gen_scores[i], imp_scores=imp_scores[i],
+                   gmean=gmean[i], gstd=gstd[i], imean=imean[i],
+                   istd=istd[i], eer_low=eer_low[i], eer_high=eer_high[i],
+                   decidability=get_decidability_value(gmean[i], gstd[i],
+                                                       imean[i], istd[i]),
+                   j_index=j_index[i], j_index_th=thrs[i, j_index_th[i]],
+                   eer_th=thrs[i, eer_ind[i]], mccoef=mccoef[i],
+                   mccoef_th=thrs[i, mccoef_th[i]],
+                   rank_auc=calculate_rank_auc(fm[i][mask[i]],
+                                               fnm[i][mask[i]], gnumber,
+                                               inumber),
+                   **{name: values[i] for name, values in ops.items()})
+        stats.append(st)
+
+    return stats
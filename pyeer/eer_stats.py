@@ -1,6 +1,8 @@
 # -*- coding:utf-8 -*-
 
-import operator
+import io
+import os
+import tempfile
 import warnings
 
 from collections import namedtuple
@@ -8,11 +10,28 @@ from warnings import warn
 
 import numpy as np
 
+from .loaders import load_binary_scores, is_binary_file
 
 __copyright__ = 'Copyright 2017'
 __author__ = u'Bsc. Manuel Aguado Martínez'
 
 
+# Default memory budget (bytes) of the out-of-core ROC computation
+DEFAULT_MAX_MEMORY = 2 ** 28
+
+# Maximum number of sorted runs merged at once by the out-of-core ROC
+# computation (each run keeps three files open)
+MAX_MERGE_FAN_IN = 64
+
+# Integer scores spanning at most max(COUNTING_MIN_RANGE, number of scores)
+# values (and at most COUNTING_MAX_RANGE) are counted instead of sorted
+COUNTING_MIN_RANGE = 2 ** 16
+COUNTING_MAX_RANGE = 2 ** 24
+
+# Default maximum distance between a decimated curve and the original one
+DEFAULT_DECIMATION_TOLERANCE = 1e-3
+
+
 Stats = namedtuple('Stats', [
 
     # Rate curves
@@ -54,7 +73,26 @@ Stats = namedtuple('Stats', [
     'eer',  # Equal error rate
     'eer_low',  # Equal error rate (low)
     'eer_high',  # Equal error rate (high)
-    'eer_th'  # The threshold for which eer_low and eer_high were calculated
+    'eer_th',  # The threshold for which eer_low and eer_high were calculated
+
+    # User defined operation points
+    'custom_ops',  # (name, value, threshold) for each operation point
+
+    # Partial areas under the ROC curve
+    'paucs',  # (name, value) for each FMR range
+
+    # Scores histograms (replacing the raw scores, see compact_stats)
+    'gen_hist',  # Genuine scores histogram (ScoreHistogram)
+    'imp_hist',  # Impostor scores histogram (ScoreHistogram)
+
+    # Exact area under the ROC curve (see calculate_rank_auc)
+    'rank_auc',  # Mann-Whitney AUC, ties counted as one half
+], defaults=[(), (), None, None, None])
+
+
+ScoreHistogram = namedtuple('ScoreHistogram', [
+    'edges',  # Bin edges (one more than counts)
+    'counts',  # Number of scores of each bin
 ])
 
 
@@ -75,111 +113,301 @@ def calculate_roc_hist(gscores, iscores, ds_scores=False, rates=True):
     @return: (thresholds, FMR, FNMR) or (thresholds, FM, FNM)
     @rtype: tuple
     """
-    match_thr = 0
-    maximum_thr = max([max(gscores), len(gscores),
-                       max(iscores), len(iscores)])
+    gscores = np.sort(np.asarray(gscores))
+    iscores = np.asarray(iscores)
+
+    maximum_thr = max([gscores[-1], len(gscores),
+                       iscores.max(), len(iscores)])
+    thresholds = np.arange(int(np.floor(maximum_thr)) + 1)
 
     gscores_number = float(len(gscores))
-    iscores_number = float(sum(iscores))
+    iscores_number = float(iscores.sum())
+
+    # Impostor scores lower than each threshold. Thresholds are never
+    # fewer than the histogram bins, the ones beyond the last bin
+    # accumulate all the impostor scores
     iscores = np.cumsum(iscores)
+    below = np.empty(len(thresholds), dtype=np.float64)
+    below[0] = 0
+    below[1:len(iscores)] = iscores[:-1]
+    below[len(iscores):] = iscores_number
 
-    thresholds = []
-    fm_rates = []
-    fnm_rates = []
-
-    while match_thr <= maximum_thr:
-        if 0 < match_thr < len(iscores):
-            if ds_scores:
-                false_match = iscores[match_thr - 1]
-            else:
-                false_match = iscores_number - iscores[match_thr - 1]
-        elif match_thr == 0:
-            if ds_scores:
-                false_match = 0
-            else:
-                false_match = iscores_number  # Accepting everyone
-        else:
-            if ds_scores:
-                false_match = iscores_number
-            else:
-                false_match = 0
+    if ds_scores:
+        fm_rates = below
+        fnm_rates = len(gscores) - np.searchsorted(gscores, thresholds,
+                                                   side='right')
+    else:
+        fm_rates = iscores_number - below
+        fnm_rates = np.searchsorted(gscores, thresholds, side='left')
 
-        fm_rates.append(false_match)
+    if rates:
+        fm_rates = fm_rates / iscores_number
+        fnm_rates = fnm_rates / gscores_number
 
-        # List convertion for Python3 compatibility
-        if ds_scores:
-            fnm = len(list(filter(lambda s: s > match_thr, gscores)))
-        else:
-            fnm = len(list(filter(lambda s: s < match_thr, gscores)))
-        fnm_rates.append(fnm)
+    return thresholds.tolist(), fm_rates, fnm_rates
 
-        thresholds.append(match_thr)
-        match_thr += 1
 
-    if rates:
-        fm_rates = np.array(fm_rates) / iscores_number
-        fnm_rates = np.array(fnm_rates) / gscores_number
-    else:
-        fm_rates = np.array(fm_rates)
-        fnm_rates = np.array(fnm_rates)
+def calculate_roc(gscores, iscores, ds_scores=False, rates=True,
+                  score_range=None):
+    """Calculates FMR, FNMR
 
-    return thresholds, fm_rates, fnm_rates
+    Both score sets are sorted independently and merged into the set of
+    unique thresholds. The number of false matches and false non-matches
+    at each threshold is then obtained by binary search over the sorted
+    arrays, so no intermediate Python objects are created.
 
+    Integer scores (or floats holding integer values) spanning a small
+    range are counted instead of sorted (see calculate_roc_int), which
+    gives the same result in linear time. The range can also be given
+    explicitly with score_range.
 
-def calculate_roc(gscores, iscores, ds_scores=False, rates=True):
-    """Calculates FMR, FNMR
+    Memory-mapped arrays and binary score filenames (.npy, .npz, .f32
+    and .f64) are processed out-of-core (see calculate_roc_ooc). Text
+    score files must be loaded first (see loaders.load_scores).
 
     @param gscores: Genuine matching scores
-    @type gscores: Union[list, ndarray]
+    @type gscores: Union[list, ndarray, memmap, str]
     @param iscores: Impostor matching scores
-    @type giscores: Union[list, ndarray]
+    @type giscores: Union[list, ndarray, memmap, str]
     @param ds_scores: Indicates whether input scores are
         dissimilarity scores
     @type ds_scores: bool
     @param rates: Indicates whether to return error rates instead
         of error values
     @type rates: bool
+    @param score_range: (lowest, highest) possible integer score. If
+        given, scores must be integers within this range and they are
+        counted without checking whether the range is small.
+    @type score_range: tuple
 
     @return: (thresholds, FMR, FNMR) or (thresholds, FM, FNM)
     @rtype: tuple
     """
-    if isinstance(gscores, list):
-        gscores = np.array(gscores, dtype=np.float64)
+    if is_out_of_core(gscores) or is_out_of_core(iscores):
+        return calculate_roc_ooc(gscores, iscores, ds_scores, rates)
+
+    for scores in [gscores, iscores]:
+        if isinstance(scores, str):
+            raise ValueError('%s is not a binary score file, text score'
+                             ' files must be loaded first (see'
+                             ' loaders.load_scores)' % scores)
 
-    if isinstance(iscores, list):
-        iscores = np.array(iscores, dtype=np.float64)
+    if score_range is None:
+        score_range = get_counting_range(gscores, iscores)
 
-    if gscores.dtype == int:
-        gscores = np.float64(gscores)
+    if score_range is not None:
+        return calculate_roc_int(gscores, iscores, ds_scores, rates,
+                                 score_range)
 
-    if iscores.dtype == int:
-        iscores = np.float64(iscores)
+    gscores = np.asarray(gscores, dtype=np.float64)
+    iscores = np.asarray(iscores, dtype=np.float64)
 
     if ds_scores:
         gscores = gscores * -1
         iscores = iscores * -1
 
+    # Stable sorts keep genuine scores first among equal values (e.g. 0.0
+    # and -0.0) so thresholds match the ones of a combined stable sort
+    gscores = np.sort(gscores, kind='stable')
+    iscores = np.sort(iscores, kind='stable')
+
+    return calculate_roc_sorted(gscores, iscores, ds_scores, rates)
+
+
+def calculate_roc_int(gscores, iscores, ds_scores=False, rates=True,
+                      score_range=None):
+    """Calculates FMR, FNMR from integer scores by counting
+
+    Scores are counted with np.bincount over the score range and FM and
+    FNM are obtained from cumulative sums, so time is linear in the
+    number of scores plus the size of the range, and memory is
+    proportional to the range. Results are the same as the ones of
+    calculate_roc.
+
+    @param gscores: Genuine matching scores (integer values)
+    @type gscores: Union[list, ndarray]
+    @param iscores: Impostor matching scores (integer values)
+    @type iscores: Union[list, ndarray]
+    @param ds_scores: Indicates whether input scores are
+        dissimilarity scores
+    @type ds_scores: bool
+    @param rates: Indicates whether to return error rates instead
+        of error values
+    @type rates: bool
+    @param score_range: (lowest, highest) possible score. If not given,
+        the range of the scores is used.
+    @type score_range: tuple
+
+    @return: (thresholds, FMR, FNMR) or (thresholds, FM, FNM)
+    @rtype: tuple
+    """
+    gscores = np.asarray(gscores).astype(np.int64, copy=False)
+    iscores = np.asarray(iscores).astype(np.int64, copy=False)
+
+    if score_range is None:
+        low = min(gscores.min(), iscores.min())
+        high = max(gscores.max(), iscores.max())
+    else:
+        low, high = int(score_range[0]), int(score_range[1])
+        if (min(gscores.min(), iscores.min()) < low or
+                max(gscores.max(), iscores.max()) > high):
+            raise ValueError('Scores out of the given score range')
+
+    # Counting scores, in descending order for dissimilarity scores
+    if ds_scores:
+        gcounts = np.bincount(high - gscores, minlength=high - low + 1)
+        icounts = np.bincount(high - iscores, minlength=high - low + 1)
+    else:
+        gcounts = np.bincount(gscores - low, minlength=high - low + 1)
+        icounts = np.bincount(iscores - low, minlength=high - low + 1)
+
+    # Number of scores lower (or greater) than each value
+    gcumul = np.cumsum(gcounts) - gcounts
+    icumul = np.cumsum(icounts) - icounts
+
+    # Only values of some score are thresholds
+    ind = np.flatnonzero(gcounts + icounts)
+    thresholds = high - ind if ds_scores else ind + low
+
+    fnm = gcumul[ind].astype(np.float64)
+    fm = len(iscores) - icumul[ind].astype(np.float64)
+
+    if rates:
+        fnm = fnm / len(gscores)
+        fm = fm / len(iscores)
+
+    return thresholds.astype(np.float64), fm, fnm
+
+
+def get_counting_range(gscores, iscores):
+    """Returns the range of integer scores if they can be counted
+
+    @param gscores: Genuine matching scores
+    @type gscores: Union[list, ndarray]
+    @param iscores: Impostor matching scores
+    @type iscores: Union[list, ndarray]
+
+    @returns: (lowest, highest) score if every score is an integer value
+        and the range is small enough to count scores instead of sorting
+        them, otherwise None
+    @rtype: tuple
+    """
+    gscores = np.asarray(gscores)
+    iscores = np.asarray(iscores)
+
+    if (len(gscores) == 0 or len(iscores) == 0 or
+            gscores.dtype.kind not in 'iuf' or
+            iscores.dtype.kind not in 'iuf'):
+        return None
+
+    low = min(gscores.min(), iscores.min())
+    high = max(gscores.max(), iscores.max())
+
+    if not (np.isfinite(low) and np.isfinite(high)):
+        return None
+
+    span = float(high) - float(low) + 1
+    if span > min(COUNTING_MAX_RANGE,
+                  max(COUNTING_MIN_RANGE, len(gscores) + len(iscores))):
+        return None
+
+    for scores in [gscores, iscores]:
+        if scores.dtype.kind == 'f' and np.any(np.mod(scores, 1)):
+            return None
+
+    return int(low), int(high)
+
+
+def calculate_roc_sorted(gscores, iscores, ds_scores=False, rates=True):
+    """Calculates FMR, FNMR from score arrays sorted in ascending order
+
+    If ds_scores is True, the given arrays must hold the negated
+    dissimilarity scores (i.e. -1 * scores) sorted in ascending order.
+
+    @param gscores: Sorted genuine matching scores
+    @type gscores: ndarray
+    @param iscores: Sorted impostor matching scores
+    @type iscores: ndarray
+    @param ds_scores: Indicates whether input scores are negated
+        dissimilarity scores
+    @type ds_scores: bool
+    @param rates: Indicates whether to return error rates instead
+        of error values
+    @type rates: bool
+
+    @return: (thresholds, FMR, FNMR) or (thresholds, FM, FNM)
+    @rtype: tuple
+    """
     gscores_number = len(gscores)
     iscores_number = len(iscores)
 
-    # Labeling genuine scores as 1 and impostor scores as 0
-    gscores = zip(gscores, [1] * gscores_number)
-    iscores = zip(iscores, [0] * iscores_number)
+    # Merging unique values of both sorted arrays
+    thresholds = merge_sorted_unique(get_sorted_unique(gscores),
+                                     get_sorted_unique(iscores))
+
+    # Calculating FNM and FM distributions
+    fnm = np.searchsorted(gscores, thresholds, side='left')  # rejecting s < t
+    fm = iscores_number - np.searchsorted(iscores, thresholds, side='left')
+
+    fnm = fnm.astype(np.float64)
+    fm = fm.astype(np.float64)
+
+    # Calculating FMR and FNMR
+    if rates:
+        fnm_rates = fnm / gscores_number
+        fm_rates = fm / iscores_number
+    else:
+        fnm_rates = fnm
+        fm_rates = fm
+
+    if ds_scores:
+        return thresholds * -1, fm_rates, fnm_rates
 
-    # Python3 compatibility
-    gscores = list(gscores)
-    iscores = list(iscores)
+    return thresholds, fm_rates, fnm_rates
 
-    # Stacking scores
-    scores = np.array(sorted(gscores + iscores, key=operator.itemgetter(0)))
-    cumul = np.cumsum(scores[:, 1])
 
-    # Grouping scores
-    thresholds, u_indices = np.unique(scores[:, 0], return_index=True)
+def calculate_roc_counts(gvalues, gcounts, ivalues, icounts,
+                         ds_scores=False, rates=True):
+    """Calculates FMR, FNMR from the counts of each unique score value
+
+    @param gvalues: Unique genuine scores sorted in ascending order
+    @type gvalues: ndarray
+    @param gcounts: The number of occurrences of each genuine score
+    @type gcounts: ndarray
+    @param ivalues: Unique impostor scores sorted in ascending order
+    @type ivalues: ndarray
+    @param icounts: The number of occurrences of each impostor score
+    @type icounts: ndarray
+    @param ds_scores: Indicates whether input scores are
+        dissimilarity scores
+    @type ds_scores: bool
+    @param rates: Indicates whether to return error rates instead
+        of error values
+    @type rates: bool
+
+    @return: (thresholds, FMR, FNMR) or (thresholds, FM, FNM)
+    @rtype: tuple
+    """
+    if ds_scores:
+        gvalues, gcounts = gvalues[::-1] * -1, gcounts[::-1]
+        ivalues, icounts = ivalues[::-1] * -1, icounts[::-1]
+
+    # Number of scores lower than each unique value
+    gcumul = np.concatenate(([0], np.cumsum(gcounts)))
+    icumul = np.concatenate(([0], np.cumsum(icounts)))
+
+    gscores_number = gcumul[-1]
+    iscores_number = icumul[-1]
+
+    thresholds = merge_sorted_unique(gvalues, ivalues)
 
     # Calculating FNM and FM distributions
-    fnm = cumul[u_indices] - scores[u_indices][:, 1]  # rejecting s < t
-    fm = iscores_number - (u_indices - fnm)
+    fnm = gcumul[np.searchsorted(gvalues, thresholds, side='left')]
+    fm = iscores_number - icumul[np.searchsorted(ivalues, thresholds,
+                                                 side='left')]
+
+    fnm = fnm.astype(np.float64)
+    fm = fm.astype(np.float64)
 
     # Calculating FMR and FNMR
     if rates:
@@ -195,6 +423,362 @@ def calculate_roc(gscores, iscores, ds_scores=False, rates=True):
     return thresholds, fm_rates, fnm_rates
 
 
+def get_sorted_unique(scores):
+    """Returns the unique values of an array sorted in ascending order
+
+    The first occurrence of each group of equal values is kept.
+
+    @param scores: Scores sorted in ascending order
+    @type scores: ndarray
+
+    @returns: The unique scores
+    @rtype: ndarray
+    """
+    if len(scores) == 0:
+        return scores
+
+    mask = np.empty(len(scores), dtype=bool)
+    mask[0] = True
+    np.not_equal(scores[1:], scores[:-1], out=mask[1:])
+    return scores[mask]
+
+
+def merge_sorted_unique(a, b):
+    """Merges two arrays of unique values sorted in ascending order
+
+    When a value is present in both arrays the one from the first array
+    is kept.
+
+    @param a: Unique values sorted in ascending order
+    @type a: ndarray
+    @param b: Unique values sorted in ascending order
+    @type b: ndarray
+
+    @returns: The sorted union of both arrays
+    @rtype: ndarray
+    """
+    if len(a) == 0:
+        return b
+    if len(b) == 0:
+        return a
+
+    pos = np.searchsorted(a, b, side='left')
+    new = a[np.minimum(pos, len(a) - 1)] != b
+    new |= pos == len(a)
+
+    return np.insert(a, pos[new], b[new])
+
+
+def merge_unique_counts(values, counts):
+    """Merges several sets of unique values and their counts
+
+    Every set is sorted in ascending order, so a stable sort of their
+    concatenation merges the sorted runs (k-way merge) instead of sorting
+    from scratch. Counts of values present in several sets are added.
+
+    @param values: Arrays of unique values sorted in ascending order
+    @type values: iterable
+    @param counts: The number of occurrences of each value of each array
+    @type counts: iterable
+
+    @returns: (unique values sorted in ascending order, counts)
+    @rtype: tuple
+    """
+    values = np.concatenate([np.asarray(v, dtype=np.float64)
+                             for v in values])
+    counts = np.concatenate([np.asarray(c, dtype=np.int64) for c in counts])
+
+    if len(values) == 0:
+        return values, counts
+
+    order = np.argsort(values, kind='stable')
+    values = values[order]
+    counts = counts[order]
+
+    starts = np.flatnonzero(np.append(True, values[1:] != values[:-1]))
+    return values[starts], np.add.reduceat(counts, starts)
+
+
+def combine_moments(moments_a, moments_b):
+    """Combines the moments of two disjoint sets of scores
+
+    Reference:
+    Chan, T. F., Golub, G. H., & LeVeque, R. J. (1979). Updating formulae
+    and a pairwise algorithm for computing sample variances.
+
+    @param moments_a: (count, mean, sum of squared deviations) of the
+        first set of scores
+    @type moments_a: tuple
+    @param moments_b: (count, mean, sum of squared deviations) of the
+        second set of scores
+    @type moments_b: tuple
+
+    @returns: (count, mean, sum of squared deviations) of both sets
+    @rtype: tuple
+    """
+    n_a, mean_a, m2_a = moments_a
+    n_b, mean_b, m2_b = moments_b
+
+    if n_b == 0:
+        return moments_a
+    if n_a == 0:
+        return moments_b
+
+    n = n_a + n_b
+    delta = mean_b - mean_a
+    mean = mean_a + delta * n_b / n
+    m2 = m2_a + m2_b + delta ** 2 * n_a * n_b / n
+
+    return n, mean, m2
+
+
+def is_out_of_core(scores):
+    """Indicates whether the given scores must be processed out-of-core
+
+    @param scores: Matching scores
+    @type scores: Union[list, ndarray, memmap, str]
+
+    @returns: True if scores are a memory-mapped array or the filename of
+        a binary score file (.npy, .npz, .f32 or .f64)
+    @rtype: bool
+    """
+    if isinstance(scores, str):
+        return is_binary_file(scores)
+    return isinstance(scores, np.memmap)
+
+
+def calculate_roc_ooc(gscores, iscores, ds_scores=False, rates=True,
+                      max_memory=DEFAULT_MAX_MEMORY, dtype=None,
+                      tmp_dir=None, moments=False):
+    """Calculates FMR, FNMR out-of-core
+
+    Scores are read by chunks that are sorted and reduced to unique values
+    with counts, written to temporary files (sorted runs) and finally
+    combined with a k-way merge. The memory used to sort and merge the
+    scores is bounded by max_memory. The returned curves need memory
+    proportional to the number of unique scores.
+
+    @param gscores: Genuine matching scores. Binary files are loaded
+        with loaders.load_binary_scores (raw files without a known
+        extension need the dtype).
+    @type gscores: Union[ndarray, memmap, str]
+    @param iscores: Impostor matching scores. Binary files are loaded
+        with loaders.load_binary_scores (raw files without a known
+        extension need the dtype).
+    @type iscores: Union[ndarray, memmap, str]
+    @param ds_scores: Indicates whether input scores are
+        dissimilarity scores
+    @type ds_scores: bool
+    @param rates: Indicates whether to return error rates instead
+        of error values
+    @type rates: bool
+    @param max_memory: Memory budget in bytes to sort and merge scores
+    @type max_memory: int
+    @param dtype: The data type of raw binary score files without a known
+        extension
+    @type dtype: numpy.dtype
+    @param tmp_dir: Directory for the temporary files. If not given,
+        the system default is used.
+    @type tmp_dir: str
+    @param moments: Indicates whether to also return the
+        (count, mean, standard deviation) of genuine and impostor scores
+    @type moments: bool
+
+    @return: (thresholds, FMR, FNMR) or (thresholds, FM, FNM). If moments
+        is True, (genuine moments, impostor moments) are appended.
+    @rtype: tuple
+    """
+    sources = []
+    for scores in [gscores, iscores]:
+        if isinstance(scores, str):
+            scores = load_binary_scores(scores, dtype)
+        sources.append(scores)
+
+    with tempfile.TemporaryDirectory(dir=tmp_dir) as work_dir:
+        # Generating sorted runs (32 bytes per score while sorting)
+        chunk_size = max(1, max_memory // 32)
+
+        runs = []
+        all_moments = [(0, 0.0, 0.0), (0, 0.0, 0.0)]
+        for label, scores in enumerate(sources):
+            for start in range(0, len(scores), chunk_size):
+                chunk = np.array(scores[start:start + chunk_size],
+                                 dtype=np.float64)
+                if ds_scores:
+                    chunk *= -1
+                chunk.sort()
+
+                mean = chunk.mean()
+                all_moments[label] = combine_moments(
+                    all_moments[label],
+                    (len(chunk), mean, ((chunk - mean) ** 2).sum()))
+
+                values = get_sorted_unique(chunk)
+                counts = np.diff(np.append(
+                    np.searchsorted(chunk, values, side='left'), len(chunk)))
+                del chunk
+
+                # A run stores unique values, genuine and impostor counts
+                run_counts = [np.zeros(len(values), dtype=np.int64)] * 2
+                run_counts[label] = counts.astype(np.int64)
+
+                name = os.path.join(work_dir, 'run%d' % len(runs))
+                values.tofile(name + '.values')
+                run_counts[0].tofile(name + '.gcounts')
+                run_counts[1].tofile(name + '.icounts')
+                runs.append((name, len(values)))
+
+        # Merging runs by groups until a single one is left
+        while len(runs) > 1:
+            merged_runs = []
+            for start in range(0, len(runs), MAX_MERGE_FAN_IN):
+                name = os.path.join(work_dir, 'run%d' % (len(runs) + start))
+                group = runs[start:start + MAX_MERGE_FAN_IN]
+                merged_runs.append(__merge_runs(group, name, max_memory))
+            runs = merged_runs
+
+        if runs:
+            name, length = runs[0]
+            thresholds = np.fromfile(name + '.values', dtype=np.float64)
+            fnm = np.fromfile(name + '.gcounts', dtype=np.int64)
+            fm = np.fromfile(name + '.icounts', dtype=np.int64)
+        else:
+            thresholds = np.empty(0)
+            fnm = fm = np.empty(0, dtype=np.int64)
+
+    gscores_number = all_moments[0][0]
+    iscores_number = all_moments[1][0]
+
+    # Calculating FNM and FM distributions from exclusive cumulative sums
+    fnm = (np.cumsum(fnm) - fnm).astype(np.float64)
+    fm = (iscores_number - (np.cumsum(fm) - fm)).astype(np.float64)
+
+    if rates:
+        fnm = fnm / gscores_number
+        fm = fm / iscores_number
+
+    if ds_scores:
+        thresholds = thresholds * -1
+
+    if not moments:
+        return thresholds, fm, fnm
+
+    dists = []
+    for n, mean, m2 in all_moments:
+        dists.append((n, -mean if ds_scores else mean,
+                      np.sqrt(m2 / n) if n else 0.0))
+
+    return thresholds, fm, fnm, dists[0], dists[1]
+
+
+def __merge_runs(runs, filename, max_memory):
+    """Merges sorted runs of unique values and counts
+
+    The merged unique values are written to filename + '.values' and the
+    counts of genuine and impostor scores for each value are written to
+    filename + '.gcounts' and filename + '.icounts' respectively. Runs
+    follow the same layout.
+
+    @param runs: (base filename, length) of each run
+    @type runs: list
+    @param filename: The base filename of the merged run
+    @type filename: str
+    @param max_memory: Memory budget in bytes
+    @type max_memory: int
+
+    @returns: (base filename, length) of the merged run
+    @rtype: tuple
+    """
+    # Each buffered element needs about 96 bytes while merging
+    block_size = max(1, max_memory // (96 * len(runs)))
+    exts = ['.values', '.gcounts', '.icounts']
+    dtypes = [np.float64, np.int64, np.int64]
+
+    runs = [(name, length) for name, length in runs if length > 0]
+    maps = [[np.memmap(name + ext, dtype=dtype, mode='r', shape=(length,))
+             for ext, dtype in zip(exts, dtypes)] for name, length in runs]
+
+    positions = [0] * len(runs)
+    buffers = [None] * len(runs)
+    carry = None
+    length = 0
+
+    outs = [open(filename + ext, 'wb') for ext in exts]
+    try:
+        while True:
+            # Refilling empty buffers
+            for j, (name, run_length) in enumerate(runs):
+                if buffers[j] is None and positions[j] < run_length:
+                    end = positions[j] + block_size
+                    buffers[j] = [np.array(m[positions[j]:end])
+                                  for m in maps[j]]
+                    positions[j] = min(end, run_length)
+
+            active = [j for j in range(len(runs)) if buffers[j] is not None]
+            if not active:
+                break
+
+            # Every value up to the smallest buffered maximum can be merged
+            cut = min(buffers[j][0][-1] for j in active)
+
+            parts = [[], [], []]
+            for j in active:
+                n = np.searchsorted(buffers[j][0], cut, side='right')
+                for part, array in zip(parts, buffers[j]):
+                    part.append(array[:n])
+
+                buffers[j] = ([array[n:] for array in buffers[j]]
+                              if n < len(buffers[j][0]) else None)
+
+            values, gcounts, icounts = [np.concatenate(p) for p in parts]
+            order = np.argsort(values, kind='stable')
+            values = values[order]
+
+            starts = np.flatnonzero(np.append(True,
+                                              values[1:] != values[:-1]))
+            values = values[starts]
+            gcounts = np.add.reduceat(gcounts[order], starts)
+            icounts = np.add.reduceat(icounts[order], starts)
+
+            # Next blocks may still contain the cut value, so it is
+            # retained until the following iteration
+            if carry is not None:
+                if carry[0][0] == values[0]:
+                    gcounts[0] += carry[1][0]
+                    icounts[0] += carry[2][0]
+                else:
+                    for out, array in zip(outs, carry):
+                        array.tofile(out)
+                    length += 1
+
+            carry = [values[-1:], gcounts[-1:], icounts[-1:]]
+            for out, array in zip(outs, [values, gcounts, icounts]):
+                array[:-1].tofile(out)
+            length += len(values) - 1
+
+        if carry is not None:
+            for out, array in zip(outs, carry):
+                array.tofile(out)
+            length += 1
+    finally:
+        for out in outs:
+            out.close()
+
+    return filename, length
+
+
+def __get_roc_area(fmr, fnmr):
+    """Integrates a ROC curve with the trapezoidal rule"""
+    x1 = fmr[:-1]
+    x2 = fmr[1:]
+
+    tpr = 1 - fnmr
+    y1 = tpr[:-1]
+    y2 = tpr[1:]
+
+    return ((x1 - x2) * (y1 + (y2 - y1) / 2)).sum()
+
+
 def calculate_roc_auc(fmr, fnmr):
     """Calculates the area under a ROC curve
 
@@ -206,14 +790,7 @@ def calculate_roc_auc(fmr, fnmr):
     @returns: Area under the ROC curve
     @rtype: float
     """
-    x1 = fmr[:-1]
-    x2 = fmr[1:]
-
-    tpr = 1 - fnmr
-    y1 = tpr[:-1]
-    y2 = tpr[1:]
-
-    auc = ((x1 - x2) * (y1 + (y2 - y1) / 2)).sum()
+    auc = __get_roc_area(fmr, fnmr)
 
     if auc < 0.5:
         warn("It is possible that you had set the wrong score"
@@ -223,6 +800,98 @@ def calculate_roc_auc(fmr, fnmr):
     return auc
 
 
+def calculate_rank_auc(fm, fnm, gnumber, inumber):
+    """Calculates the exact area under a ROC curve from error counts
+
+    Mann-Whitney U statistic: the probability of a genuine score being
+    better than an impostor score, counting ties as one half. It is
+    computed from the false match and false non-match counts at each
+    unique threshold (as returned by calculate_roc, calculate_roc_hist or
+    calculate_roc_ooc with rates=False), so the scores are not ranked
+    again. Both curve directions are supported: FMR falls along the
+    thresholds for similarity scores and rises for dissimilarity scores
+    in histogram format.
+
+    @param fm: False matches for each threshold
+    @type fm: ndarray
+    @param fnm: False non-matches for each threshold
+    @type fnm: ndarray
+    @param gnumber: The number of genuine scores
+    @type gnumber: Union[int, float]
+    @param inumber: The number of impostor scores
+    @type inumber: Union[int, float]
+
+    @returns: Area under the ROC curve
+    @rtype: float
+    """
+    fm = np.asarray(fm, dtype=np.float64)
+    fnm = np.asarray(fnm, dtype=np.float64)
+
+    if fm[0] >= fm[-1]:
+        # Accepted scores (impostor scores counted in fm) get better along
+        # the thresholds: genuine and impostor scores equal to each one
+        gcounts = np.diff(fnm, append=gnumber)
+        icounts = -np.diff(fm, append=0)
+
+        # Impostor scores worse than each threshold
+        worse = inumber - fm
+    else:
+        # Scores get worse along the thresholds (fm counts the impostor
+        # scores better than each threshold)
+        gcounts = -np.diff(fnm, prepend=gnumber)
+        icounts = np.diff(fm, append=inumber)
+        worse = inumber - fm - icounts
+
+    return np.dot(gcounts, worse + icounts / 2) / (float(gnumber) * inumber)
+
+
+def calculate_roc_pauc(fmr, fnmr, fmr_ranges):
+    """Calculates partial areas under a ROC curve
+
+    The ROC curve (1 - FNMR against FMR) is linearly interpolated between
+    consecutive thresholds, from (0, 0) to the point of the highest FMR.
+    For curves returned by calculate_roc, which end at (1, 1), the
+    partial area over [0, 1] is the exact area under the curve (see
+    calculate_rank_auc).
+
+    @param fmr: False Match Rates
+    @type fmr: ndarray
+    @param fnmr: False Non-Match Rates
+    @type fnmr: ndarray
+    @param fmr_ranges: (lowest, highest) FMR of each partial area,
+        e.g. [(0, 0.001), (0, 0.01)]
+    @type fmr_ranges: iterable
+
+    @returns: The partial area under the ROC curve for each FMR range
+    @rtype: ndarray
+    """
+    fmr_ranges = np.asarray(fmr_ranges, dtype=np.float64).reshape(-1, 2)
+
+    # ROC curve points sorted by FMR (FMR rises along the thresholds for
+    # dissimilarity scores in histogram format)
+    fmr = np.asarray(fmr, dtype=np.float64)
+    fnmr = np.asarray(fnmr, dtype=np.float64)
+    if fmr[0] > fmr[-1]:
+        fmr, fnmr = fmr[::-1], fnmr[::-1]
+    x = np.concatenate(([0], fmr))
+    y = np.concatenate(([0], 1 - fnmr))
+
+    dx = np.diff(x)
+    area = np.concatenate(([0], np.cumsum(dx * (y[:-1] + y[1:]) / 2)))
+
+    # Area from 0 to each range limit
+    limits = np.clip(fmr_ranges.ravel(), 0, x[-1])
+    k = np.clip(np.searchsorted(x, limits, side='right') - 1, 0, len(x) - 2)
+
+    step = limits - x[k]
+    slope = np.divide(y[k + 1] - y[k], dx[k], out=np.zeros(len(k)),
+                      where=dx[k] > 0)
+    cumul = area[k] + step * (y[k] + slope * step / 2)
+
+    cumul = cumul.reshape(-1, 2)
+    return cumul[:, 1] - cumul[:, 0]
+
+
 def get_fnmr_op(fmr, fnmr, op):
     """Returns the value of the given FNMR operating point
 
@@ -269,6 +938,131 @@ def get_fmr_op(fmr, fnmr, op):
     return index, fnmr[index]
 
 
+class OperatingPointIndex(object):
+    """Index of an error rates curve for fast operating point queries
+
+    FMR and FNMR values are monotonic along the thresholds (FMR does not
+    increase and FNMR does not decrease for the curves of calculate_roc,
+    the other way around for dissimilarity scores in histogram format),
+    so the point closest to any FMR or FNMR target is found by binary
+    search. Results are the ones of get_fmr_op and get_fnmr_op, including
+    how ties are resolved. Curves which are not monotonic are scanned
+    like get_fmr_op and get_fnmr_op do.
+    """
+
+    def __init__(self, thrs, fmr, fnmr):
+        """
+        @param thrs: Thresholds
+        @type thrs: Union[list, ndarray]
+        @param fmr: False Match Rates
+        @type fmr: ndarray
+        @param fnmr: False Non-Match Rates
+        @type fnmr: ndarray
+        """
+        self.thrs = np.asarray(thrs)
+        self.fmr = np.asarray(fmr)
+        self.fnmr = np.asarray(fnmr)
+
+        self._fmr_rising = self.__direction(self.fmr)
+        self._fnmr_rising = self.__direction(self.fnmr)
+
+    def fmr_indexes(self, ops):
+        """Returns the curve indexes of the given FMR operating points
+
+        @param ops: FMR operating points
+        @type ops: Union[float, list, ndarray]
+
+        @returns: The first index of the point with the closest FMR
+        @rtype: ndarray
+        """
+        ops = np.atleast_1d(np.asarray(ops, dtype=np.float64))
+        return self.__closest(self.fmr, self._fmr_rising, ops, first=True)
+
+    def fnmr_indexes(self, ops):
+        """Returns the curve indexes of the given FNMR operating points
+
+        @param ops: FNMR operating points
+        @type ops: Union[float, list, ndarray]
+
+        @returns: The last index of the point with the closest FNMR
+        @rtype: ndarray
+        """
+        ops = np.atleast_1d(np.asarray(ops, dtype=np.float64))
+        return self.__closest(self.fnmr, self._fnmr_rising, ops, first=False)
+
+    def fmr_ops(self, ops):
+        """Returns the values of the given FMR operating points
+
+        @param ops: FMR operating points
+        @type ops: Union[float, list, ndarray]
+
+        @returns: (FNMR values, thresholds)
+        @rtype: tuple
+        """
+        index = self.fmr_indexes(ops)
+        return self.fnmr[index], self.thrs[index]
+
+    def fnmr_ops(self, ops):
+        """Returns the values of the given FNMR operating points
+
+        @param ops: FNMR operating points
+        @type ops: Union[float, list, ndarray]
+
+        @returns: (FMR values, thresholds)
+        @rtype: tuple
+        """
+        index = self.fnmr_indexes(ops)
+        return self.fmr[index], self.thrs[index]
+
+    @staticmethod
+    def __direction(curve):
+        """Returns True for non-decreasing curves, False for non-increasing
+        ones and None for curves which are not monotonic"""
+        steps = np.diff(curve)
+        if (steps >= 0).all():
+            return True
+        if (steps <= 0).all():
+            return False
+        return None
+
+    @staticmethod
+    def __closest(curve, rising, ops, first):
+        """Returns the first (or last) index of the curve value closest to
+        each target, like np.argmin(abs(curve - op))"""
+        if rising is None:
+            distances = abs(curve[None, :] - ops[:, None])
+            if first:
+                return np.argmin(distances, axis=1)
+            return len(curve) - 1 - np.argmin(distances[:, ::-1], axis=1)
+
+        # Curve values in ascending order
+        values = curve if rising else curve[::-1]
+        pos = np.searchsorted(values, ops, side='left')
+        lower = values[np.maximum(pos - 1, 0)]
+        upper = values[np.minimum(pos, len(values) - 1)]
+
+        # Equally close values are resolved in favor of the one found
+        # first (or last) in the curve
+        prefer_lower = rising == first
+        lower_dist = abs(lower - ops)
+        upper_dist = abs(upper - ops)
+        closest = np.where(lower_dist < upper_dist, lower, upper)
+        if prefer_lower:
+            closest = np.where(lower_dist <= upper_dist, lower, upper)
+
+        if rising:
+            if first:
+                return np.searchsorted(values, closest, side='left')
+            return np.searchsorted(values, closest, side='right') - 1
+
+        # Index i of the curve is index n - 1 - i in ascending order
+        if first:
+            return len(values) - np.searchsorted(values, closest,
+                                                 side='right')
+        return len(values) - 1 - np.searchsorted(values, closest,
+                                                 side='left')
+
+
 def get_eer_values(fmr, fnmr):
     """Returns the value of the Equal Error Rate
 
@@ -402,3 +1196,871 @@ def get_matthews_ccoef(fm, fnm, gnumber, inumber):
 
     th = np.argmax(all_mcc)
     return all_mcc[th], th
+
+
+def decimate_curve(fmr, fnmr, tolerance=DEFAULT_DECIMATION_TOLERANCE,
+                   log_scale=False):
+    """Selects a subset of the points of a DET curve preserving its shape
+
+    Ramer-Douglas-Peucker algorithm: the segment joining the first and
+    last points is split at the point farthest from it until every
+    discarded point lies within the given distance of the decimated
+    curve. Points are measured in the (FMR, FNMR) plane or, if log_scale
+    is True, in the (log10(FMR), log10(FNMR)) plane. In log scale, zero
+    rates are replaced by the smallest positive rate of the curve.
+
+    @param fmr: False Match Rates
+    @type fmr: ndarray
+    @param fnmr: False Non-Match Rates
+    @type fnmr: ndarray
+    @param tolerance: The maximum distance between discarded points and
+        the decimated curve (in decades if log_scale is True)
+    @type tolerance: float
+    @param log_scale: Indicates whether to measure distances in log scale
+    @type log_scale: bool
+
+    @returns: The sorted indexes of the kept points
+    @rtype: ndarray
+    """
+    x = np.asarray(fmr, dtype=np.float64)
+    y = np.asarray(fnmr, dtype=np.float64)
+
+    if len(x) < 3:
+        return np.arange(len(x))
+
+    if log_scale:
+        positive = np.concatenate((x[x > 0], y[y > 0]))
+        floor = positive.min() if len(positive) else 1.0
+        x = np.log10(np.maximum(x, floor))
+        y = np.log10(np.maximum(y, floor))
+
+    keep = np.zeros(len(x), dtype=bool)
+    keep[[0, -1]] = True
+
+    segments = [(0, len(x) - 1)]
+    while segments:
+        start, end = segments.pop()
+        if end - start < 2:
+            continue
+
+        dx = x[end] - x[start]
+        dy = y[end] - y[start]
+        px = x[start + 1:end] - x[start]
+        py = y[start + 1:end] - y[start]
+
+        # Distances to the line joining the segment ends (or to the
+        # start point if both ends are the same point)
+        length = np.hypot(dx, dy)
+        if length > 0:
+            dist = np.abs(px * dy - py * dx) / length
+        else:
+            dist = np.hypot(px, py)
+
+        farthest = np.argmax(dist)
+        if dist[farthest] > tolerance:
+            split = start + 1 + farthest
+            keep[split] = True
+            segments.append((start, split))
+            segments.append((split, end))
+
+    return np.flatnonzero(keep)
+
+
+def calculate_roc_auc_batch(fmr, fnmr, mask=None):
+    """Calculates the area under several ROC curves sharing thresholds
+
+    @param fmr: False Match Rates, one curve per row
+    @type fmr: ndarray
+    @param fnmr: False Non-Match Rates, one curve per row
+    @type fnmr: ndarray
+    @param mask: The points of each curve to integrate, e.g. the mask
+        returned by calculate_roc_batch. Each area is then computed over
+        the masked points only, so it is the same value calculate_roc_auc
+        gives for that curve (copies of repeated points are left out of
+        the sum).
+    @type mask: ndarray
+
+    @returns: Area under each ROC curve
+    @rtype: ndarray
+    """
+    if mask is not None:
+        return np.array([__get_roc_area(fmr[i][mask[i]], fnmr[i][mask[i]])
+                         for i in range(len(fmr))])
+
+    tpr = 1 - fnmr
+    return ((fmr[:, :-1] - fmr[:, 1:]) *
+            (tpr[:, :-1] + (tpr[:, 1:] - tpr[:, :-1]) / 2)).sum(axis=1)
+
+
+def get_fnmr_op_batch(fmr, fnmr, op):
+    """Returns the value of the given FNMR operating point for several
+    curves sharing thresholds (see get_fnmr_op)
+
+    @param fmr: False Match Rates, one curve per row
+    @type fmr: ndarray
+    @param fnmr: False Non-Match Rates, one curve per row
+    @type fnmr: ndarray
+    @param op: Operating point
+    @type op: float
+
+    @returns: Indexes, FMR values
+    @rtype: tuple
+    """
+    temp = abs(fnmr - op)
+    index = temp.shape[1] - 1 - np.argmin(temp[:, ::-1], axis=1)
+    return index, fmr[np.arange(len(fmr)), index]
+
+
+def get_fmr_op_batch(fmr, fnmr, op):
+    """Returns the value of the given FMR operating point for several
+    curves sharing thresholds (see get_fmr_op)
+
+    @param fmr: False Match Rates, one curve per row
+    @type fmr: ndarray
+    @param fnmr: False Non-Match Rates, one curve per row
+    @type fnmr: ndarray
+    @param op: Operating point
+    @type op: float
+
+    @returns: Indexes, FNMR values
+    @rtype: tuple
+    """
+    index = np.argmin(abs(fmr - op), axis=1)
+    return index, fnmr[np.arange(len(fnmr)), index]
+
+
+def get_eer_values_batch(fmr, fnmr):
+    """Returns the values of the Equal Error Rate for several curves
+    sharing thresholds (see get_eer_values)
+
+    @param fmr: False Match Rates (FMR), one curve per row
+    @type fmr: ndarray
+    @param fnmr: False Non-Match Rates (FNMR), one curve per row
+    @type fnmr: ndarray
+
+    @returns: indexes for EERlow and EERhigh, EERlow, EERhigh, EER
+    @rtype: tuple
+    """
+    rows = np.arange(len(fmr))
+    diff = fmr - fnmr
+
+    below = diff <= 0
+    found = below.any(axis=1)
+    if not found.all():
+        warnings.warn('It seems that the FMR and FNMR curves'
+                      ' do not intersect each other. Did you mean'
+                      ' to use dissimilarity scores?', RuntimeWarning)
+
+    t2 = np.argmax(below, axis=1)
+    t1 = np.where((diff[rows, t2] != 0) & (t2 != 0), t2 - 1, t2)
+
+    first = (fmr[rows, t1] + fnmr[rows, t1] <=
+             fmr[rows, t2] + fnmr[rows, t2])
+
+    index = np.where(first, t1, t2)
+    eer_low = np.where(first, fnmr[rows, t1], fmr[rows, t2])
+    eer_high = np.where(first, fmr[rows, t1], fnmr[rows, t2])
+    eer = (fnmr[rows, index] + fmr[rows, index]) / 2
+
+    index[~found] = 0
+    eer_low[~found] = 1
+    eer_high[~found] = 1
+    eer[~found] = 1
+
+    return index, eer_low, eer_high, eer
+
+
+def get_youden_index_batch(fmr, fnmr):
+    """Computes the Youden's index and the corresponding threshold for
+    several curves sharing thresholds (see get_youden_index)
+
+    @param fmr: False Match Rates (FMR), one curve per row
+    @type fmr: ndarray
+    @param fnmr: False Non-Match Rates (FNMR), one curve per row
+    @type fnmr: ndarray
+
+    @returns: Youden's Indexes, thresholds indexes
+    @rtype: tuple
+    """
+    j = 1 - fnmr - fmr
+    th = np.argmax(j, axis=1)
+    return j[np.arange(len(j)), th], th
+
+
+def get_matthews_ccoef_batch(fm, fnm, gnumber, inumber):
+    """Estimate the maximum Matthews Correlation Coefficient for several
+    curves sharing thresholds (see get_matthews_ccoef)
+
+    @param fm: False Positives, one curve per row
+    @type fm: ndarray
+    @param fnm: False Negatives, one curve per row
+    @type fnm: ndarray
+    @param gnumber: The number of positive samples
+    @type gnumber: int
+    @param inumber: The number of negative samples
+    @type inumber: int
+
+    @returns: (Matthews Correlation Coefficients, thresholds indexes)
+    @rtype: tuple
+    """
+    tn = inumber - fm
+    tp = gnumber - fnm
+
+    numerator = tp * tn - fm * fnm
+
+    denominator_a = np.sqrt((tp + fm)) * np.sqrt((tp + fnm))
+    denominator_b = np.sqrt((tn + fm)) * np.sqrt((tn + fnm))
+    denominator = denominator_a * denominator_b
+
+    denominator[denominator == 0] = 1
+
+    all_mcc = numerator / denominator
+
+    th = np.argmax(all_mcc, axis=1)
+    return all_mcc[np.arange(len(all_mcc)), th], th
+
+
+def calculate_roc_batch(gscores, iscores, ds_scores=False, rates=True):
+    """Calculates FMR, FNMR for several experiments at once
+
+    Each row of the given arrays holds the scores of an experiment. Every
+    score is used as a threshold, so all the curves share the same length.
+    Points of repeated scores are copies of the point of their first
+    occurrence, which is marked in the returned mask. Selecting the masked
+    points of a row gives the output of calculate_roc for that experiment.
+
+    @param gscores: Genuine matching scores (experiments x scores)
+    @type gscores: ndarray
+    @param iscores: Impostor matching scores (experiments x scores)
+    @type iscores: ndarray
+    @param ds_scores: Indicates whether input scores are
+        dissimilarity scores
+    @type ds_scores: bool
+    @param rates: Indicates whether to return error rates instead
+        of error values
+    @type rates: bool
+
+    @return: (thresholds, FMR, FNMR, mask) or (thresholds, FM, FNM, mask)
+    @rtype: tuple
+    """
+    gscores = np.atleast_2d(np.asarray(gscores, dtype=np.float64))
+    iscores = np.atleast_2d(np.asarray(iscores, dtype=np.float64))
+
+    gscores_number = gscores.shape[1]
+    iscores_number = iscores.shape[1]
+
+    scores = np.concatenate((gscores, iscores), axis=1)
+    if ds_scores:
+        scores *= -1
+
+    # Sorting scores. Counts are taken at the first occurrence of each
+    # score, so the order among equal scores does not matter
+    order = np.argsort(scores, axis=1)
+    scores = np.take_along_axis(scores, order, axis=1)
+    labels = order < gscores_number
+    del order
+
+    # Genuine scores before each position
+    fnm = np.cumsum(labels, axis=1) - labels
+
+    # Index of the first occurrence of each score
+    mask = np.ones(scores.shape, dtype=bool)
+    np.not_equal(scores[:, 1:], scores[:, :-1], out=mask[:, 1:])
+    first = np.where(mask, np.arange(scores.shape[1]), 0)
+    np.maximum.accumulate(first, axis=1, out=first)
+
+    # Calculating FNM and FM distributions
+    fnm = np.take_along_axis(fnm, first, axis=1).astype(np.float64)
+    fm = iscores_number - (first - fnm)
+
+    if rates:
+        fnm = fnm / gscores_number
+        fm = fm / iscores_number
+
+    if ds_scores:
+        scores *= -1
+
+    return scores, fm, fnm, mask
+
+
+def get_stats_from_roc(thrs, fm, fnm, gnumber, inumber, gmean, gstd,
+                       imean, istd, gen_scores=None, imp_scores=None,
+                       fmr_ops=(), fnmr_ops=(), pauc_ranges=(),
+                       lazy=False):
+    """Calculates EER associated statistics from false match and false
+    non-match counts
+
+    @param thrs: Thresholds
+    @type thrs: Union[list, ndarray]
+    @param fm: False matches for each threshold
+    @type fm: ndarray
+    @param fnm: False non-matches for each threshold
+    @type fnm: ndarray
+    @param gnumber: The number of genuine scores
+    @type gnumber: Union[int, float]
+    @param inumber: The number of impostor scores
+    @type inumber: Union[int, float]
+    @param gmean: The mean value of the genuine scores
+    @type gmean: float
+    @param gstd: The standard deviation value of the genuine scores
+    @type gstd: float
+    @param imean: The mean value of the impostor scores
+    @type imean: float
+    @param istd: The standard deviation value of the impostor scores
+    @type istd: float
+    @param gen_scores: The genuine scores to store in the stats
+    @type gen_scores: Union[list, ndarray, None]
+    @param imp_scores: The impostor scores to store in the stats
+    @type imp_scores: Union[list, ndarray, None]
+    @param fmr_ops: Additional FMR operating points
+    @type fmr_ops: iterable
+    @param fnmr_ops: Additional FNMR operating points
+    @type fnmr_ops: iterable
+    @param pauc_ranges: (lowest, highest) FMR of each partial area under
+        the ROC curve, e.g. [(0, 0.001)]
+    @type pauc_ranges: iterable
+    @param lazy: Indicates whether to return a LazyStats object computing
+        each statistic on first access instead of computing all of them
+    @type lazy: bool
+
+    @returns: The statistics
+    @rtype: Union[Stats, LazyStats]
+    """
+    stats = LazyStats(thrs, fm, fnm, gnumber, inumber, gmean, gstd,
+                      imean, istd, gen_scores, imp_scores, fmr_ops, fnmr_ops,
+                      pauc_ranges)
+
+    return stats if lazy else stats.to_stats()
+
+
+class LazyStats(object):
+    """EER associated statistics computed on demand
+
+    Drop-in replacement of the Stats named tuple. Only the thresholds and
+    the false match and false non-match counts are kept at creation. Each
+    statistic (or group of statistics sharing the same computation, e.g.
+    eer, eer_low, eer_high and eer_th) is computed on first access and
+    cached, so asking only for the EER does not compute the AUC, the
+    Youden's index, the Matthews correlation coefficient or the operating
+    points. Scores are kept by reference, they are not copied.
+    """
+
+    _fields = Stats._fields
+
+    # Name of the method computing each statistic
+    _getters = {
+        'fmr': '_get_fmr',
+        'fnmr': '_get_fnmr',
+        'auc': '_get_auc',
+        'rank_auc': '_get_rank_auc',
+        'j_index': '_get_j_index',
+        'j_index_th': '_get_j_index',
+        'mccoef': '_get_mccoef',
+        'mccoef_th': '_get_mccoef',
+        'fmr0': '_get_fmr_ops',
+        'fmr1000': '_get_fmr_ops',
+        'fmr100': '_get_fmr_ops',
+        'fmr20': '_get_fmr_ops',
+        'fmr10': '_get_fmr_ops',
+        'fmr0_th': '_get_fmr_ops',
+        'fmr1000_th': '_get_fmr_ops',
+        'fmr100_th': '_get_fmr_ops',
+        'fmr20_th': '_get_fmr_ops',
+        'fmr10_th': '_get_fmr_ops',
+        'fnmr0': '_get_fnmr_ops',
+        'fnmr0_th': '_get_fnmr_ops',
+        'decidability': '_get_decidability',
+        'eer': '_get_eer',
+        'eer_low': '_get_eer',
+        'eer_high': '_get_eer',
+        'eer_th': '_get_eer',
+        'custom_ops': '_get_custom_ops',
+        'paucs': '_get_paucs',
+        '_op_index': '_get_index',
+    }
+
+    def __init__(self, thrs, fm, fnm, gnumber, inumber, gmean, gstd, imean,
+                 istd, gen_scores=None, imp_scores=None, fmr_ops=(),
+                 fnmr_ops=(), pauc_ranges=()):
+        """
+        @param thrs: Thresholds
+        @type thrs: Union[list, ndarray]
+        @param fm: False matches for each threshold
+        @type fm: ndarray
+        @param fnm: False non-matches for each threshold
+        @type fnm: ndarray
+        @param gnumber: The number of genuine scores
+        @type gnumber: Union[int, float]
+        @param inumber: The number of impostor scores
+        @type inumber: Union[int, float]
+        @param gmean: The mean value of the genuine scores
+        @type gmean: float
+        @param gstd: The standard deviation value of the genuine scores
+        @type gstd: float
+        @param imean: The mean value of the impostor scores
+        @type imean: float
+        @param istd: The standard deviation value of the impostor scores
+        @type istd: float
+        @param gen_scores: The genuine scores to store in the stats
+        @type gen_scores: Union[list, ndarray, None]
+        @param imp_scores: The impostor scores to store in the stats
+        @type imp_scores: Union[list, ndarray, None]
+        @param fmr_ops: Additional FMR operating points
+        @type fmr_ops: iterable
+        @param fnmr_ops: Additional FNMR operating points
+        @type fnmr_ops: iterable
+        @param pauc_ranges: (lowest, highest) FMR of each partial area
+            under the ROC curve
+        @type pauc_ranges: iterable
+        """
+        self.thrs = thrs
+        self.fm = fm
+        self.fnm = fnm
+        self.gnumber = gnumber
+        self.inumber = inumber
+        self.gmean = gmean
+        self.gstd = gstd
+        self.imean = imean
+        self.istd = istd
+        self.gen_scores = gen_scores
+        self.imp_scores = imp_scores
+        self.fmr_ops = fmr_ops
+        self.fnmr_ops = fnmr_ops
+        self.pauc_ranges = pauc_ranges
+        self.gen_hist = None
+        self.imp_hist = None
+
+    def __getattr__(self, name):
+        # Only called for statistics not computed yet
+        getter = self._getters.get(name)
+        if getter is None:
+            raise AttributeError("'%s' object has no attribute '%s'" %
+                                 (type(self).__name__, name))
+
+        self.__dict__.update(getattr(self, getter)())
+        return self.__dict__[name]
+
+    def __iter__(self):
+        return (getattr(self, name) for name in self._fields)
+
+    def __len__(self):
+        return len(self._fields)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return tuple(getattr(self, name) for name in self._fields[index])
+        return getattr(self, self._fields[index])
+
+    def __repr__(self):
+        computed = ', '.join(name for name in self._fields
+                             if name in self.__dict__)
+        return '%s(computed=[%s])' % (type(self).__name__, computed)
+
+    def _asdict(self):
+        """Returns a dictionary with every statistic (computing them all)
+
+        @rtype: dict
+        """
+        return dict((name, getattr(self, name)) for name in self._fields)
+
+    def to_stats(self):
+        """Returns a Stats named tuple (computing every statistic)
+
+        @rtype: Stats
+        """
+        return Stats(**self._asdict())
+
+    def _get_fmr(self):
+        return {'fmr': self.fm / self.inumber}
+
+    def _get_fnmr(self):
+        return {'fnmr': self.fnm / self.gnumber}
+
+    def _get_index(self):
+        return {'_op_index': OperatingPointIndex(self.thrs, self.fmr,
+                                                 self.fnmr)}
+
+    def _get_eer(self):
+        eer_ind, eer_low, eer_high, eer = get_eer_values(self.fmr, self.fnmr)
+        return {'eer': eer, 'eer_low': eer_low, 'eer_high': eer_high,
+                'eer_th': self.thrs[eer_ind]}
+
+    def _get_fmr_ops(self):
+        ind = self._op_index.fmr_indexes([0, 0.001, 0.01, 0.05, 0.1])
+        names = ['fmr0', 'fmr1000', 'fmr100', 'fmr20', 'fmr10']
+
+        values = dict(zip(names, self.fnmr[ind]))
+        values.update((name + '_th', self.thrs[i])
+                      for name, i in zip(names, ind))
+        return values
+
+    def _get_fnmr_ops(self):
+        ind = self._op_index.fnmr_indexes(0)[0]
+        return {'fnmr0': self.fmr[ind], 'fnmr0_th': self.thrs[ind]}
+
+    def _get_custom_ops(self):
+        index = self._op_index
+
+        custom_ops = []
+        for name, ops, get_indexes, rates in [
+                ('FMR', self.fmr_ops, index.fmr_indexes, self.fnmr),
+                ('FNMR', self.fnmr_ops, index.fnmr_indexes, self.fmr)]:
+            if len(ops) == 0:
+                continue
+            for op, i in zip(ops, get_indexes(ops)):
+                custom_ops.append(('%s@%g' % (name, op), rates[i],
+                                   self.thrs[i]))
+
+        return {'custom_ops': tuple(custom_ops)}
+
+    def _get_paucs(self):
+        if len(self.pauc_ranges) == 0:
+            return {'paucs': ()}
+
+        values = calculate_roc_pauc(self.fmr, self.fnmr, self.pauc_ranges)
+        return {'paucs': tuple(('pAUC@%g-%g' % (low, high), value)
+                               for (low, high), value in
+                               zip(self.pauc_ranges, values))}
+
+    def _get_decidability(self):
+        return {'decidability': get_decidability_value(
+            self.gmean, self.gstd, self.imean, self.istd)}
+
+    def _get_auc(self):
+        return {'auc': calculate_roc_auc(self.fmr, self.fnmr)}
+
+    def _get_rank_auc(self):
+        return {'rank_auc': calculate_rank_auc(self.fm, self.fnm,
+                                               self.gnumber, self.inumber)}
+
+    def _get_j_index(self):
+        j_index, j_index_th = get_youden_index(self.fmr, self.fnmr)
+        return {'j_index': j_index, 'j_index_th': self.thrs[j_index_th]}
+
+    def _get_mccoef(self):
+        mccoef, mccoef_th = get_matthews_ccoef(self.fm, self.fnm,
+                                               self.gnumber, self.inumber)
+        return {'mccoef': mccoef, 'mccoef_th': self.thrs[mccoef_th]}
+
+
+def decimate_stats(stats, tolerance=DEFAULT_DECIMATION_TOLERANCE,
+                   log_scale=False):
+    """Returns a copy of the stats with decimated rate curves
+
+    Only thrs, fmr and fnmr are decimated (see decimate_curve). Every
+    other statistic (EER, operating points, AUC, etc.) keeps the value
+    computed from the full curve. LazyStats are fully computed before
+    decimating the curves.
+
+    @param stats: The statistics
+    @type stats: Union[Stats, LazyStats]
+    @param tolerance: The maximum distance between discarded points and
+        the decimated curve (in decades if log_scale is True)
+    @type tolerance: float
+    @param log_scale: Indicates whether to measure distances in log scale
+    @type log_scale: bool
+
+    @returns: The statistics with decimated curves
+    @rtype: Stats
+    """
+    values = stats._asdict()
+    ind = decimate_curve(values['fmr'], values['fnmr'], tolerance,
+                         log_scale)
+
+    thrs = values['thrs']
+    values['thrs'] = ([thrs[i] for i in ind] if isinstance(thrs, list)
+                      else np.asarray(thrs)[ind])
+    values['fmr'] = np.asarray(values['fmr'])[ind]
+    values['fnmr'] = np.asarray(values['fnmr'])[ind]
+
+    return Stats(**values)
+
+
+def get_score_histogram(scores, bins=100, hformat=False):
+    """Computes the histogram of a set of scores
+
+    @param scores: The scores
+    @type scores: Union[list, ndarray]
+    @param bins: The number of bins (ignored if hformat=True)
+    @type bins: int
+    @param hformat: Indicates whether to use a bin per integer score
+        value, the one used to plot genuine scores of experiments with
+        impostor scores in histogram format
+    @type hformat: bool
+
+    @returns: The histogram
+    @rtype: ScoreHistogram
+    """
+    if hformat:
+        edges = np.arange(max(scores) + 1)
+        counts = np.histogram(scores, bins=edges)[0]
+    else:
+        counts, edges = np.histogram(scores, bins=bins)
+
+    return ScoreHistogram(edges=edges, counts=counts)
+
+
+def compact_stats(stats, hformat=False, bins=100):
+    """Returns a copy of the stats with score histograms instead of scores
+
+    The raw scores (gen_scores and imp_scores) are replaced by fixed-bin
+    histograms (gen_hist and imp_hist), which is all the distribution
+    plots need. Means and standard deviations are kept. Stats without
+    raw scores are returned unchanged.
+
+    @param stats: The statistics
+    @type stats: Union[Stats, LazyStats]
+    @param hformat: Indicates whether the impostor scores are in histogram
+        format. In that case they are kept as the impostor histogram (a
+        bin per integer score) and genuine scores are counted in the same
+        way.
+    @type hformat: bool
+    @param bins: The number of bins of the histograms (ignored if
+        hformat=True)
+    @type bins: int
+
+    @returns: The statistics with score histograms
+    @rtype: Stats
+    """
+    values = stats._asdict()
+    gen_scores = values['gen_scores']
+    imp_scores = values['imp_scores']
+
+    if gen_scores is not None:
+        values['gen_hist'] = get_score_histogram(gen_scores, bins, hformat)
+
+    if imp_scores is not None:
+        if hformat:
+            imp_scores = np.asarray(imp_scores)
+            values['imp_hist'] = ScoreHistogram(
+                edges=np.arange(len(imp_scores) + 1), counts=imp_scores)
+        else:
+            values['imp_hist'] = get_score_histogram(imp_scores, bins)
+
+    values['gen_scores'] = values['imp_scores'] = None
+
+    return Stats(**values)
+
+
+class ROCAccumulator(object):
+    """Accumulates genuine and impostor scores by batches
+
+    Only the number of occurrences of each unique score value is kept, so
+    memory depends on the number of distinct thresholds and not on the
+    number of comparisons. If a resolution is given, scores are quantized
+    to multiples of it (rounding down) before being counted, bounding the
+    number of thresholds to the score range divided by the resolution.
+
+    Accumulators built by different workers can be combined with merge
+    (or merge_all) as long as they share the same score type and
+    resolution, and moved between machines with to_bytes and from_bytes.
+    """
+
+    def __init__(self, ds_scores=False, resolution=None):
+        """
+        @param ds_scores: Indicates whether input scores are
+            dissimilarity scores
+        @type ds_scores: bool
+        @param resolution: The quantization step of the scores. If not
+            given, exact counts are kept for each unique score.
+        @type resolution: float
+        """
+        self.ds_scores = ds_scores
+        self.resolution = resolution
+
+        # Unique values and counts per score type
+        self._values = [np.empty(0), np.empty(0)]
+        self._counts = [np.empty(0, dtype=np.int64),
+                        np.empty(0, dtype=np.int64)]
+
+        # Count, mean and sum of squared deviations per score type
+        self._moments = [(0, 0.0, 0.0), (0, 0.0, 0.0)]
+
+    @property
+    def gnumber(self):
+        """The number of accumulated genuine scores"""
+        return self._moments[0][0]
+
+    @property
+    def inumber(self):
+        """The number of accumulated impostor scores"""
+        return self._moments[1][0]
+
+    def update(self, gen_scores=None, imp_scores=None):
+        """Adds a batch of genuine and/or impostor scores
+
+        @param gen_scores: Genuine matching scores
+        @type gen_scores: Union[list, ndarray, None]
+        @param imp_scores: Impostor matching scores
+        @type imp_scores: Union[list, ndarray, None]
+
+        @returns: The accumulator itself
+        @rtype: ROCAccumulator
+        """
+        for i, scores in enumerate([gen_scores, imp_scores]):
+            if scores is None or len(scores) == 0:
+                continue
+
+            scores = np.asarray(scores, dtype=np.float64).ravel()
+
+            n = len(scores)
+            mean = scores.mean()
+            m2 = ((scores - mean) ** 2).sum()
+            self._moments[i] = combine_moments(self._moments[i], (n, mean, m2))
+
+            if self.resolution is not None:
+                scores = np.floor(scores / self.resolution) * self.resolution
+
+            values, counts = np.unique(scores, return_counts=True)
+            self._add_counts(i, values, counts)
+
+        return self
+
+    def merge(self, other):
+        """Adds the scores accumulated by another accumulator
+
+        @param other: The accumulator to merge
+        @type other: ROCAccumulator
+
+        @returns: The accumulator itself
+        @rtype: ROCAccumulator
+        """
+        if (other.ds_scores != self.ds_scores or
+                other.resolution != self.resolution):
+            raise ValueError('Only accumulators with the same score type'
+                             ' and resolution can be merged')
+
+        for i in range(2):
+            if other._moments[i][0] == 0:
+                continue
+
+            self._moments[i] = combine_moments(self._moments[i],
+                                               other._moments[i])
+            self._add_counts(i, other._values[i], other._counts[i])
+
+        return self
+
+    @classmethod
+    def merge_all(cls, accumulators):
+        """Merges several accumulators at once (k-way merge)
+
+        @param accumulators: The accumulators to merge. They are not
+            modified.
+        @type accumulators: iterable
+
+        @returns: A new accumulator with the scores of every accumulator
+        @rtype: ROCAccumulator
+        """
+        accumulators = list(accumulators)
+        if not accumulators:
+            raise ValueError('At least one accumulator is needed')
+
+        first = accumulators[0]
+        for other in accumulators[1:]:
+            if (other.ds_scores != first.ds_scores or
+                    other.resolution != first.resolution):
+                raise ValueError('Only accumulators with the same score'
+                                 ' type and resolution can be merged')
+
+        merged = cls(first.ds_scores, first.resolution)
+        for i in range(2):
+            merged._values[i], merged._counts[i] = merge_unique_counts(
+                [acc._values[i] for acc in accumulators],
+                [acc._counts[i] for acc in accumulators])
+
+            for acc in accumulators:
+                merged._moments[i] = combine_moments(merged._moments[i],
+                                                     acc._moments[i])
+
+        return merged
+
+    def to_bytes(self):
+        """Serializes the accumulator
+
+        @returns: The serialized accumulator
+        @rtype: bytes
+        """
+        buf = io.BytesIO()
+        resolution = np.nan if self.resolution is None else self.resolution
+        header = np.array([self.ds_scores, resolution], dtype=np.float64)
+
+        np.savez(buf, header=header,
+                 gvalues=self._values[0], gcounts=self._counts[0],
+                 gmoments=np.array(self._moments[0], dtype=np.float64),
+                 ivalues=self._values[1], icounts=self._counts[1],
+                 imoments=np.array(self._moments[1], dtype=np.float64))
+        return buf.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Deserializes an accumulator
+
+        @param data: An accumulator serialized with to_bytes
+        @type data: bytes
+
+        @returns: The accumulator
+        @rtype: ROCAccumulator
+        """
+        with np.load(io.BytesIO(data)) as arrays:
+            ds_scores, resolution = arrays['header'].tolist()
+
+            acc = cls(bool(ds_scores),
+                      None if np.isnan(resolution) else resolution)
+            for i, prefix in enumerate('gi'):
+                acc._values[i] = arrays[prefix + 'values']
+                acc._counts[i] = arrays[prefix + 'counts']
+
+                n, mean, m2 = arrays[prefix + 'moments'].tolist()
+                acc._moments[i] = (int(n), mean, m2)
+
+        return acc
+
+    def roc(self, rates=True):
+        """Calculates FMR, FNMR from the accumulated scores
+
+        @param rates: Indicates whether to return error rates instead
+            of error values
+        @type rates: bool
+
+        @return: (thresholds, FMR, FNMR) or (thresholds, FM, FNM)
+        @rtype: tuple
+        """
+        return calculate_roc_counts(self._values[0], self._counts[0],
+                                    self._values[1], self._counts[1],
+                                    self.ds_scores, rates)
+
+    def finalize(self, fmr_ops=(), fnmr_ops=(), pauc_ranges=()):
+        """Calculates EER associated statistics from the accumulated scores
+
+        Raw scores are not kept by the accumulator, so the gen_scores and
+        imp_scores fields of the returned stats are None.
+
+        @param fmr_ops: Additional FMR operating points
+        @type fmr_ops: iterable
+        @param fnmr_ops: Additional FNMR operating points
+        @type fnmr_ops: iterable
+        @param pauc_ranges: (lowest, highest) FMR of each partial area
+            under the ROC curve
+        @type pauc_ranges: iterable
+
+        @returns: The statistics
+        @rtype: Stats
+        """
+        if self.gnumber == 0 or self.inumber == 0:
+            raise ValueError('Both genuine and impostor scores are needed')
+
+        thrs, fm, fnm = self.roc(rates=False)
+
+        gnumber, gmean, gm2 = self._moments[0]
+        inumber, imean, im2 = self._moments[1]
+
+        return get_stats_from_roc(thrs, fm, fnm, gnumber, inumber,
+                                  gmean, np.sqrt(gm2 / gnumber),
+                                  imean, np.sqrt(im2 / inumber),
+                                  fmr_ops=fmr_ops, fnmr_ops=fnmr_ops,
+                                  pauc_ranges=pauc_ranges)
+
+    def _add_counts(self, i, values, counts):
+        """Merges unique values and counts into the ones of a score type"""
+        self._values[i], self._counts[i] = merge_unique_counts(
+            [self._values[i], values], [self._counts[i], counts])
@@ -0,0 +1,317 @@
+# -*- coding:utf-8 -*-
+
+import argparse
+import io
+
+from os.path import splitext, join, basename
+
+import numpy as np
+
+from .cmc_stats import convert_cmc_file
+
+__copyright__ = 'Copyright 2017'
+__author__ = u'Bsc. Manuel Aguado Martínez'
+
+
+# Size in bytes of the blocks read from score files
+DEFAULT_BLOCK_SIZE = 2 ** 24
+
+# Data types of raw (little-endian) binary score files by extension
+RAW_DTYPES = {'.f32': '<f4', '.f64': '<f8'}
+
+# Extensions of binary score files
+BINARY_EXTENSIONS = ('.npy', '.npz') + tuple(RAW_DTYPES)
+
+
+def iter_scores(filename, column=-1, delimiter=None, dtype=np.float64,
+                block_size=DEFAULT_BLOCK_SIZE):
+    """Reads a text score file by blocks
+
+    Each block of complete lines is parsed at once by the NumPy text
+    parser, so no Python objects are created per score. Blank lines are
+    ignored.
+
+    @param filename: The scores file. Each line holds a score in the
+        given column.
+    @type filename: str
+    @param column: The index of the score column. Negative indexes count
+        from the last column (default=-1, the last column)
+    @type column: int
+    @param delimiter: The column delimiter. If not given, columns are
+        separated by any whitespace.
+    @type delimiter: str
+    @param dtype: The data type of the returned scores
+    @type dtype: numpy.dtype
+    @param block_size: The number of bytes read at once
+    @type block_size: int
+
+    @returns: A generator of score arrays
+    @rtype: generator
+    """
+    with open(filename, 'rb') as sf:
+        tail = b''
+        while True:
+            block = sf.read(block_size)
+            if not block:
+                break
+
+            # Parsing only complete lines
+            end = block.rfind(b'\n') + 1
+            if end == 0:
+                tail += block
+                continue
+
+            lines = tail + block[:end]
+            tail = block[end:]
+
+            yield __parse_block(lines, column, delimiter, dtype)
+
+        if tail.strip():
+            yield __parse_block(tail, column, delimiter, dtype)
+
+
+def load_scores(filename, column=-1, delimiter=None, dtype=np.float64,
+                block_size=DEFAULT_BLOCK_SIZE):
+    """Loads a score file into an array
+
+    Binary files (.npy, .npz, .f32 and .f64) are loaded with
+    load_binary_scores. For text files, lines are counted first so scores
+    are parsed by blocks (see iter_scores) straight into a preallocated
+    array.
+
+    @param filename: The scores file. Each line holds a score in the
+        given column.
+    @type filename: str
+    @param column: The index of the score column. Negative indexes count
+        from the last column (default=-1, the last column)
+    @type column: int
+    @param delimiter: The column delimiter. If not given, columns are
+        separated by any whitespace.
+    @type delimiter: str
+    @param dtype: The data type of the returned scores
+    @type dtype: numpy.dtype
+    @param block_size: The number of bytes read at once
+    @type block_size: int
+
+    @returns: The scores
+    @rtype: Union[ndarray, memmap]
+    """
+    if is_binary_file(filename):
+        return load_binary_scores(filename)
+
+    scores = np.empty(__count_lines(filename, block_size), dtype=dtype)
+
+    position = 0
+    for block in iter_scores(filename, column, delimiter, dtype,
+                             block_size):
+        scores[position:position + len(block)] = block
+        position += len(block)
+
+    # Blank lines are not scores
+    if position < len(scores):
+        scores = scores[:position].copy()
+
+    return scores
+
+
+def load_binary_scores(filename, dtype=None):
+    """Loads a binary score file
+
+    - .npy: memory-mapped (read-only), so nothing is read or copied until
+      scores are used.
+    - .npz: the array named scores (or the only array) is loaded.
+    - .f32, .f64: raw little-endian float32/float64 files, memory-mapped.
+    - Other extensions: raw files of the given dtype, memory-mapped. The
+      dtype must be given, so text files are never misread as raw scores.
+
+    Memory-mapped arrays are processed out-of-core by get_eer_stats and
+    calculate_roc; use numpy.asarray to process them in memory.
+
+    @param filename: The scores file
+    @type filename: str
+    @param dtype: The data type of raw files without a known extension
+    @type dtype: numpy.dtype
+
+    @raise ValueError: If the extension is unknown and no dtype is given.
+
+    @returns: The scores
+    @rtype: Union[ndarray, memmap]
+    """
+    ext = splitext(filename)[1].lower()
+
+    if ext == '.npy':
+        return np.load(filename, mmap_mode='r')
+
+    if ext == '.npz':
+        with np.load(filename) as arrays:
+            if 'scores' in arrays.files:
+                return arrays['scores']
+            if len(arrays.files) != 1:
+                raise ValueError('%s must hold a single array or an array'
+                                 ' named scores' % filename)
+            return arrays[arrays.files[0]]
+
+    if ext in RAW_DTYPES:
+        return np.memmap(filename, dtype=RAW_DTYPES[ext], mode='r')
+
+    if dtype is None:
+        raise ValueError('Unknown binary format: %s (use .npy, .npz, .f32 or'
+                         ' .f64, or give the dtype of raw files)' % filename)
+
+    return np.memmap(filename, dtype=dtype, mode='r')
+
+
+def is_binary_file(filename):
+    """Indicates whether a score file is binary (by its extension)
+
+    @param filename: The scores file
+    @type filename: str
+
+    @rtype: bool
+    """
+    return splitext(filename)[1].lower() in BINARY_EXTENSIONS
+
+
+def convert_scores(filename, out_filename, column=-1, delimiter=None,
+                   dtype=np.float64, block_size=DEFAULT_BLOCK_SIZE):
+    """Converts a text score file to a binary score file
+
+    Histogram format files (one count per line) are converted in the same
+    way. The output format depends on the output extension (.npy, .npz,
+    .f32 or .f64). Files are converted by blocks, so memory does not
+    depend on the file size (except for .npz files, which are compressed
+    archives built in memory).
+
+    @param filename: The text scores file
+    @type filename: str
+    @param out_filename: The binary scores file
+    @type out_filename: str
+    @param column: The index of the score column
+    @type column: int
+    @param delimiter: The column delimiter (None for any whitespace)
+    @type delimiter: str
+    @param dtype: The data type of .npy and .npz files
+    @type dtype: numpy.dtype
+    @param block_size: The number of bytes read at once
+    @type block_size: int
+    """
+    ext = splitext(out_filename)[1].lower()
+    blocks = iter_scores(filename, column, delimiter, dtype, block_size)
+
+    if ext == '.npz':
+        np.savez(out_filename, scores=load_scores(filename, column,
+                                                  delimiter, dtype,
+                                                  block_size))
+    elif ext == '.npy':
+        length = __count_lines(filename, block_size)
+        scores = np.lib.format.open_memmap(out_filename, mode='w+',
+                                           dtype=dtype, shape=(length,))
+
+        position = 0
+        for block in blocks:
+            scores[position:position + len(block)] = block
+            position += len(block)
+        scores.flush()
+
+        # Blank lines are not scores
+        if position < length:
+            scores = np.array(scores[:position])
+            np.save(out_filename, scores)
+    elif ext in RAW_DTYPES:
+        with open(out_filename, 'wb') as bf:
+            for block in blocks:
+                block.astype(RAW_DTYPES[ext]).tofile(bf)
+    else:
+        raise ValueError('Unknown binary format: %s' % out_filename)
+
+
+def convert_scores_cmd():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("-i", "--input_files", required=True,
+                    help="The text scores files (histogram format files"
+                         " are supported). Multiple files must be separated"
+                         " by a comma")
+    ap.add_argument("-f", "--format", required=False, default='npy',
+                    help="The output format. Valid formats are: (npy, npz,"
+                         " f32, f64). Default npy")
+    ap.add_argument("-o", "--output_path", required=False, default=None,
+                    help="Path to save the converted files. If not given,"
+                         " they are saved next to the input files")
+    ap.add_argument("-sc", "--score_column", required=False, default=-1,
+                    help="The index of the score column. Negative indexes"
+                         " count from the last column (default=-1, the last"
+                         " column)")
+    ap.add_argument("-sd", "--score_delimiter", required=False, default=None,
+                    help="The column delimiter. If not given, columns are"
+                         " separated by whitespaces")
+    ap.add_argument("-dt", "--dtype", required=False, default='float64',
+                    help="The data type of npy and npz files"
+                         " (default=float64)")
+    ap.add_argument("-cmc", "--cmc", required=False, action='store_true',
+                    help="Indicates that the input files are CMC scores or"
+                         " true pairs files (see getcmcinf). They are always"
+                         " converted to npz")
+    args = ap.parse_args()
+
+    out_format = 'npz' if args.cmc else args.format
+
+    for filename in args.input_files.split(','):
+        filename = filename.strip()
+        out_filename = splitext(filename)[0] + '.' + out_format
+        if args.output_path is not None:
+            out_filename = join(args.output_path, basename(out_filename))
+
+        print('Converting %s to %s...' % (filename, out_filename))
+        if args.cmc:
+            convert_cmc_file(filename, out_filename,
+                             args.score_delimiter or ' ')
+        else:
+            convert_scores(filename, out_filename, int(args.score_column),
+                           args.score_delimiter, np.dtype(args.dtype))
+
+
+def __count_lines(filename, block_size):
+    """Counts the lines of a file (including an unterminated last line)
+
+    @param filename: The file
+    @type filename: str
+    @param block_size: The number of bytes read at once
+    @type block_size: int
+
+    @returns: The number of lines
+    @rtype: int
+    """
+    lines = 0
+    last = b'\n'
+
+    with open(filename, 'rb') as sf:
+        while True:
+            block = sf.read(block_size)
+            if not block:
+                break
+            lines += block.count(b'\n')
+            last = block[-1:]
+
+    return lines + (last != b'\n')
+
+
+def __parse_block(lines, column, delimiter, dtype):
+    """Parses the score column of a block of lines
+
+    @param lines: Complete lines of a score file
+    @type lines: bytes
+    @param column: The index of the score column
+    @type column: int
+    @param delimiter: The column delimiter (None for any whitespace)
+    @type delimiter: str
+    @param dtype: The data type of the scores
+    @type dtype: numpy.dtype
+
+    @returns: The scores
+    @rtype: ndarray
+    """
+    if not lines.strip():
+        return np.empty(0, dtype=dtype)
+
+    return np.loadtxt(io.BytesIO(lines), dtype=dtype, delimiter=delimiter,
+                      usecols=column, ndmin=1, comments=None)
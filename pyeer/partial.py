@@ -0,0 +1,219 @@
+# -*- coding:utf-8 -*-
+
+import argparse
+
+from os.path import join, isdir
+from os import listdir
+
+import numpy as np
+
+from .eer_stats import ROCAccumulator
+from .loaders import load_scores
+from .report import generate_eer_report, export_error_rates
+from .plot import plot_eer_stats
+
+__copyright__ = 'Copyright 2017'
+__author__ = u'Bsc. Manuel Aguado Martínez'
+
+
+def save_partial_counts(accumulator, filename):
+    """Saves the unique scores and counts of an accumulator
+
+    Partial count files hold the sorted unique genuine and impostor
+    scores, the number of occurrences of each one and the moments of the
+    scores, which is all that is needed to merge shards evaluated on
+    different machines (see merge_partial_counts).
+
+    @param accumulator: The accumulator
+    @type accumulator: ROCAccumulator
+    @param filename: The partial counts file (.npz)
+    @type filename: str
+    """
+    with open(filename, 'wb') as pf:
+        pf.write(accumulator.to_bytes())
+
+
+def load_partial_counts(filename):
+    """Loads a partial counts file saved with save_partial_counts
+
+    @param filename: The partial counts file
+    @type filename: str
+
+    @returns: The accumulator
+    @rtype: ROCAccumulator
+    """
+    with open(filename, 'rb') as pf:
+        return ROCAccumulator.from_bytes(pf.read())
+
+
+def get_partial_counts(gen_scores=None, imp_scores=None, ds_scores=False,
+                       resolution=None):
+    """Counts the unique scores of a shard
+
+    @param gen_scores: The genuine scores of the shard
+    @type gen_scores: Union[list, ndarray, None]
+    @param imp_scores: The impostor scores of the shard
+    @type imp_scores: Union[list, ndarray, None]
+    @param ds_scores: Indicates whether input scores are dissimilarity
+        scores
+    @type ds_scores: bool
+    @param resolution: The quantization step of the scores. If not given,
+        exact counts are kept for each unique score.
+    @type resolution: float
+
+    @returns: The accumulator of the shard
+    @rtype: ROCAccumulator
+    """
+    return ROCAccumulator(ds_scores, resolution).update(gen_scores,
+                                                        imp_scores)
+
+
+def merge_partial_counts(filenames):
+    """Merges partial counts files (k-way merge)
+
+    @param filenames: The partial counts files
+    @type filenames: iterable
+
+    @returns: The accumulator with the scores of every shard
+    @rtype: ROCAccumulator
+    """
+    return ROCAccumulator.merge_all(load_partial_counts(f)
+                                    for f in filenames)
+
+
+def get_partial_counts_cmd():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("-g", "--gscores_files", required=False, default=None,
+                    help="The genuine scores files of the shard. Multiple"
+                         " files must be separated by a comma. Binary files"
+                         " (.npy, .npz, .f32 and .f64) are also accepted")
+    ap.add_argument("-i", "--iscores_files", required=False, default=None,
+                    help="The impostor scores files of the shard. Multiple"
+                         " files must be separated by a comma. Binary files"
+                         " (.npy, .npz, .f32 and .f64) are also accepted")
+    ap.add_argument("-o", "--output_file", required=True,
+                    help="The partial counts file (.npz)")
+    ap.add_argument("-ds", "--ds_scores", required=False, action='store_true',
+                    help='Indicates whether the input scores are dissimilarity'
+                         ' scores')
+    ap.add_argument("-rs", "--resolution", required=False, default=None,
+                    help="Quantization step of the scores. If given, scores"
+                         " are rounded down to multiples of it, bounding the"
+                         " size of the partial counts files. Every shard"
+                         " must use the same resolution")
+    ap.add_argument("-sc", "--score_column", required=False, default=-1,
+                    help="The index of the score column. Negative indexes"
+                         " count from the last column (default=-1, the last"
+                         " column)")
+    ap.add_argument("-sd", "--score_delimiter", required=False, default=None,
+                    help="The column delimiter. If not given, columns are"
+                         " separated by whitespaces")
+    args = ap.parse_args()
+
+    if args.gscores_files is None and args.iscores_files is None:
+        ap.error('at least one of -g and -i is required')
+
+    resolution = None if args.resolution is None else float(args.resolution)
+    accumulator = ROCAccumulator(args.ds_scores, resolution)
+    column = int(args.score_column)
+
+    for files, name in [(args.gscores_files, 'genuine'),
+                        (args.iscores_files, 'impostor')]:
+        if files is None:
+            continue
+
+        for filename in files.split(','):
+            filename = filename.strip()
+            print('Counting %s scores of %s...' % (name, filename))
+            scores = np.asarray(load_scores(filename, column,
+                                            args.score_delimiter))
+
+            if name == 'genuine':
+                accumulator.update(gen_scores=scores)
+            else:
+                accumulator.update(imp_scores=scores)
+
+    save_partial_counts(accumulator, args.output_file)
+    print('Partial counts saved to %s' % args.output_file)
+
+
+def merge_partial_counts_cmd():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("-p", "--path", required=False, default='.',
+                    help="The path to the partial counts files."
+                         " (Default='.')")
+    ap.add_argument("-s", "--shard_files", required=True,
+                    help="The partial counts files of the shards (see"
+                         " partialcounts). Multiple files must be separated"
+                         " by a comma. Instead of the filenames, a directory"
+                         " relative to PATH could be given")
+    ap.add_argument("-e", "--experiment_id", required=False, default='exp',
+                    help="The experiment id (default=exp)")
+    ap.add_argument("-o", "--output_file", required=False, default=None,
+                    help="If given, the merged partial counts are saved to"
+                         " this file, so it can be merged again with other"
+                         " shards")
+    ap.add_argument("-sp", "--save_path", required=False, default='',
+                    help="Path to save the plots and stats report")
+    ap.add_argument("-rf", "--report_format", required=False, default='csv',
+                    help="Format to save the report. Valid formats are:"
+                         " (csv, html, tex, json). Default csv.")
+    ap.add_argument("-np", "--no_plots", required=False, action='store_true',
+                    help="Indicates whether to not plot the results")
+    ap.add_argument("-pf", "--plots_format", required=False, default='png',
+                    help="Format to save plots. Valid formats are:"
+                         "(png, pdf, ps, eps and svg)")
+    ap.add_argument("-lw", "--line_width", required=False, default=3,
+                    help="The width of the plotted curves (default=3)")
+    ap.add_argument("-lf", "--legend_font_size", required=False, default=15,
+                    help="The size of the legend font (default=15)")
+    ap.add_argument("-sr", "--save_dpi", required=False, default=None,
+                    help="Plots resolution (dots per inch). If not given"
+                         " it will default to the value savefig.dpi in the"
+                         " matplotlibrc file")
+    ap.add_argument("-fo", "--fmr_ops", required=False, default='',
+                    help="Additional FMR operating points (e.g. 1e-5,1e-6)")
+    ap.add_argument("-fno", "--fnmr_ops", required=False, default='',
+                    help="Additional FNMR operating points (e.g. 0.01,0.05)")
+    ap.add_argument("-pa", "--pauc_ranges", required=False, default='',
+                    help="FMR ranges of partial areas under the ROC curve"
+                         " (e.g. 0:0.001,0:0.01)")
+    args = ap.parse_args()
+
+    if isdir(join(args.path, args.shard_files)):
+        shard_path = join(args.path, args.shard_files)
+        filenames = [join(shard_path, f) for f in sorted(listdir(shard_path))
+                     if f.endswith('.npz')]
+    else:
+        filenames = [join(args.path, f.strip())
+                     for f in args.shard_files.split(',')]
+
+    print('Merging %d partial counts files...' % len(filenames))
+    accumulator = merge_partial_counts(filenames)
+
+    if args.output_file is not None:
+        save_partial_counts(accumulator, args.output_file)
+        print('Merged partial counts saved to %s' % args.output_file)
+
+    fmr_ops = [float(op) for op in args.fmr_ops.split(',') if op.strip()]
+    fnmr_ops = [float(op) for op in args.fnmr_ops.split(',') if op.strip()]
+    pauc_ranges = [tuple(float(v) for v in r.split(':'))
+                   for r in args.pauc_ranges.split(',') if r.strip()]
+
+    print('%s: Calculating stats...' % args.experiment_id)
+    stats = [accumulator.finalize(fmr_ops, fnmr_ops, pauc_ranges)]
+    ids = [args.experiment_id]
+
+    print('Generating report...')
+    filename = join(args.save_path, 'pyeer_report.' + args.report_format)
+    generate_eer_report(stats, ids, filename)
+
+    filename = join(args.save_path, ids[0] + ' (Rates).csv')
+    export_error_rates(stats[0].fmr, stats[0].fnmr, filename)
+
+    if not args.no_plots:
+        print('Plotting...')
+        dpi = None if args.save_dpi is None else int(args.save_dpi)
+        plot_eer_stats(stats, ids, int(args.line_width),
+                       lgf_size=int(args.legend_font_size), dpi=dpi,
+                       save_path=args.save_path, ext='.' + args.plots_format)
@@ -4,6 +4,8 @@ import matplotlib.pyplot as plt
 import numpy as np
 from matplotlib.font_manager import FontProperties
 
+from .eer_stats import get_score_histogram, ScoreHistogram
+
 
 STYLES = ['s--', 'v--', 'o--', '^--', ',--', '<--', '>--', '1--', '2--',
           '3--', '4--', '.--', 'p--', '*--', 'h--', 'H--', '+--', 'x--',
@@ -216,6 +218,20 @@ def plt_distributions(stats, ids, hformat=False, bins=100,
     @type ext: str
     """
     for i, st in enumerate(stats):
+        # Scores histograms (see eer_stats.compact_stats) or raw scores
+        ghist, ihist = st.gen_hist, st.imp_hist
+        if ghist is None and st.gen_scores is not None:
+            ghist = get_score_histogram(st.gen_scores, bins, hformat)
+        if ihist is None and st.imp_scores is not None:
+            ihist = (ScoreHistogram(np.arange(len(st.imp_scores) + 1),
+                                    np.asarray(st.imp_scores))
+                     if hformat else
+                     get_score_histogram(st.imp_scores, bins))
+
+        # Stats computed without keeping the scores
+        if ghist is None or ihist is None:
+            continue
+
         # Plotting score distributions
         title = 'Score distributions experiment: ' + ids[i]
         fig, ax1 = plt.subplots()
@@ -230,22 +246,17 @@ def plt_distributions(stats, ids, hformat=False, bins=100,
         ax2.set_ylabel('Frequency (Impostors)')
 
         if hformat:
-            # Obtaining histogram
-            m = max(st.gen_scores)
-            x = np.arange(m)
-            ghist = np.histogram(st.gen_scores, bins=np.arange(m + 1))[0]
-
-            ax1.plot(x, ghist, color='g',
-                     label='Genuine scores %d' % len(st.gen_scores))
-
-            x = np.arange(len(st.imp_scores))
-            ax2.plot(x, st.imp_scores, color='r',
-                     label='Impostor scores %d' % sum(st.imp_scores))
+            ax1.plot(ghist.edges[:-1], ghist.counts, color='g',
+                     label='Genuine scores %d' % ghist.counts.sum())
+            ax2.plot(ihist.edges[:-1], ihist.counts, color='r',
+                     label='Impostor scores %d' % ihist.counts.sum())
         else:
-            ax1.hist(st.gen_scores, bins=bins, color='g',
-                     label='Genuine scores %d' % len(st.gen_scores))
-            ax2.hist(st.imp_scores, bins=bins, alpha=0.5, color='r',
-                     label='Impostor scores %d' % len(st.imp_scores))
+            ax1.hist(ghist.edges[:-1], bins=ghist.edges,
+                     weights=ghist.counts, color='g',
+                     label='Genuine scores %d' % ghist.counts.sum())
+            ax2.hist(ihist.edges[:-1], bins=ihist.edges,
+                     weights=ihist.counts, alpha=0.5, color='r',
+                     label='Impostor scores %d' % ihist.counts.sum())
 
         fig.legend(prop=FontProperties(size=lgf_size), bbox_to_anchor=(1, 1),
                    bbox_transform=ax1.transAxes)
@@ -0,0 +1,244 @@
+# -*- coding:utf-8 -*-
+
+import json
+import os
+import sys
+import time
+
+from collections import namedtuple, OrderedDict
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+__copyright__ = 'Copyright 2017'
+__author__ = u'Bsc. Manuel Aguado Martínez'
+
+
+# Maximum resident set size units of getrusage (bytes on macOS)
+RSS_UNIT = 1 if sys.platform == 'darwin' else 1024
+
+
+StageRecord = namedtuple('StageRecord', [
+    'stage',  # Stage name (e.g. load, roc, report)
+    'experiment',  # Experiment id (None for stages of every experiment)
+    'start',  # Start time (seconds since the epoch)
+    'wall_time',  # Wall time (seconds)
+    'cpu_time',  # CPU time of the process (seconds)
+    'peak_rss',  # Peak resident set size of the process at the end (bytes)
+    'rss_increase',  # Increase of the peak resident set size (bytes)
+    'pid',  # Process id
+])
+
+
+# Functions called with the StageRecord of each finished stage
+__hooks = []
+
+
+def register_hook(hook):
+    """Registers a function called with the record of each finished stage
+
+    Stages are recorded only while some hook is registered, so they cost
+    nothing otherwise.
+
+    @param hook: A function receiving a StageRecord
+    @type hook: callable
+    """
+    __hooks.append(hook)
+
+
+def unregister_hook(hook):
+    """Unregisters a function registered with register_hook
+
+    @param hook: The registered function
+    @type hook: callable
+    """
+    __hooks.remove(hook)
+
+
+def has_hooks():
+    """Indicates whether any hook is registered
+
+    @rtype: bool
+    """
+    return bool(__hooks)
+
+
+def emit(record):
+    """Calls every registered hook with a stage record
+
+    Used to forward the records of stages run in other processes.
+
+    @param record: The stage record
+    @type record: StageRecord
+    """
+    for hook in list(__hooks):
+        hook(record)
+
+
+def get_peak_rss():
+    """Returns the peak resident set size of the process
+
+    @returns: The peak resident set size in bytes (None if not available)
+    @rtype: int
+    """
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * RSS_UNIT
+
+
+@contextmanager
+def stage(name, experiment=None):
+    """Records the wall time, CPU time and peak memory of a stage
+
+    Usage:
+
+        with stage('load', 'exp1'):
+            scores = load_scores(filename)
+
+    @param name: The stage name
+    @type name: str
+    @param experiment: The experiment id
+    @type experiment: str
+    """
+    if not __hooks:
+        yield
+        return
+
+    rss = get_peak_rss()
+    start = time.time()
+    wall = time.perf_counter()
+    cpu = time.process_time()
+    try:
+        yield
+    finally:
+        wall = time.perf_counter() - wall
+        cpu = time.process_time() - cpu
+        peak_rss = get_peak_rss()
+        increase = None if rss is None else peak_rss - rss
+
+        emit(StageRecord(name, experiment, start, wall, cpu, peak_rss,
+                         increase, os.getpid()))
+
+
+class Profiler(object):
+    """Hook collecting the stage records
+
+    Usage:
+
+        with Profiler() as profiler:
+            stats = ...
+        profiler.print_summary()
+        profiler.save_trace('pyeer_profile.json')
+    """
+
+    def __init__(self):
+        self.records = []
+
+    def __call__(self, record):
+        self.records.append(record)
+
+    def __enter__(self):
+        register_hook(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        unregister_hook(self)
+
+    def summary(self):
+        """Aggregates the records by experiment and stage
+
+        @returns: A dictionary {(experiment, stage): (calls, wall time,
+            CPU time, peak RSS)} in order of appearance
+        @rtype: OrderedDict
+        """
+        rows = OrderedDict()
+        for r in self.records:
+            key = (r.experiment, r.stage)
+            calls, wall, cpu, rss = rows.get(key, (0, 0.0, 0.0, None))
+            if r.peak_rss is not None:
+                rss = max(rss or 0, r.peak_rss)
+            rows[key] = (calls + 1, wall + r.wall_time, cpu + r.cpu_time,
+                         rss)
+
+        return rows
+
+    def print_summary(self, file=None):
+        """Prints a table with the time and memory of each stage
+
+        @param file: The output stream (default=sys.stdout)
+        @type file: file
+        """
+        header = ('Experiment', 'Stage', 'Calls', 'Wall (s)', 'CPU (s)',
+                  'Peak RSS (MB)')
+        rows = [header]
+        total_wall = total_cpu = 0.0
+        for (experiment, name), (calls, wall, cpu, rss) in \
+                self.summary().items():
+            rows.append((experiment or '-', name, str(calls), '%.3f' % wall,
+                         '%.3f' % cpu,
+                         '-' if rss is None else '%.1f' % (rss / 2.0 ** 20)))
+            total_wall += wall
+            total_cpu += cpu
+        rows.append(('Total', '', '', '%.3f' % total_wall,
+                     '%.3f' % total_cpu, ''))
+
+        widths = [max(len(row[i]) for row in rows)
+                  for i in range(len(header))]
+        for row in rows:
+            print('  '.join(v.ljust(w) for v, w in zip(row, widths)).rstrip(),
+                  file=file)
+
+    def save_trace(self, filename):
+        """Saves the records as a JSON trace
+
+        The trace uses the Trace Event Format (complete events), so it can
+        be opened with chrome://tracing or https://ui.perfetto.dev. CPU
+        time and memory of each stage are stored in the event arguments.
+
+        @param filename: The trace file
+        @type filename: str
+        """
+        events = []
+        for r in self.records:
+            name = r.stage if r.experiment is None else \
+                '%s: %s' % (r.experiment, r.stage)
+            events.append({
+                'name': name,
+                'cat': r.stage,
+                'ph': 'X',
+                'ts': r.start * 1e6,
+                'dur': r.wall_time * 1e6,
+                'pid': r.pid,
+                'tid': r.pid,
+                'args': {
+                    'stage': r.stage,
+                    'experiment': r.experiment,
+                    'wall_time': r.wall_time,
+                    'cpu_time': r.cpu_time,
+                    'peak_rss': r.peak_rss,
+                    'rss_increase': r.rss_increase,
+                },
+            })
+
+        with open(filename, 'w') as tf:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, tf,
+                      indent=1)
+
+
+def save_profile(profiler, save_path):
+    """Prints the stages summary and saves the trace of a profiled run
+
+    @param profiler: The profiler of the run
+    @type profiler: Profiler
+    @param save_path: Path to save the trace (pyeer_profile.json)
+    @type save_path: str
+    """
+    print('Profile:')
+    profiler.print_summary()
+
+    filename = os.path.join(save_path, 'pyeer_profile.json')
+    profiler.save_trace(filename)
+    print('Profile trace saved to %s' % filename)
@@ -4,6 +4,8 @@ import csv
 import pkg_resources
 import json
 
+from .eer_stats import decimate_curve
+
 __copyright__ = 'Copyright 2017'
 __author__ = u'Bsc. Manuel Aguado Martínez'
 
@@ -44,10 +46,18 @@ def generate_json_eer_report(stats, ids, save_file):
                 'FNMR': 'False Non-Match Rate',
                 '_TH': 'Threshold',
                 'EER_TH': 'Threshold for which EERlow and EERHigh were'
-                          ' calculated'
+                          ' calculated',
             }
         }
 
+        legend = jdict['Legend:']
+        if any(st.custom_ops for st in stats):
+            legend['FMR@X'] = 'FNMR at the FMR operating point X'
+            legend['FNMR@X'] = 'FMR at the FNMR operating point X'
+        if any(st.paucs for st in stats):
+            legend['pAUC@A-B'] = ('Partial area under the ROC curve for FMR'
+                                  ' in [A, B]')
+
         for i, st in enumerate(stats):
             st_dict = {
                 'GMean': st.gmean,
@@ -77,6 +87,16 @@ def generate_json_eer_report(stats, ids, save_file):
                 'FMR10 Threshold': st.fmr10_th,
                 'ZeroFNMR Threshold': st.fnmr0_th,
             }
+
+            # Writing user defined operating points
+            for name, value, th in st.custom_ops:
+                st_dict[name] = value
+                st_dict[name + ' Threshold'] = th
+
+            # Writing partial areas under the ROC curve
+            for name, value in st.paucs:
+                st_dict[name] = value
+
             jdict['Stats for %s' % ids[i]] = st_dict
 
         json.dump(jdict, sf, ensure_ascii=False, indent=4)
@@ -152,6 +172,11 @@ def generate_html_eer_report(stats, ids, save_file):
         sf.write('<th>%s</th>\n' % 'FMR20 Threshold')
         sf.write('<th>%s</th>\n' % 'FMR10 Threshold')
         sf.write('<th>%s</th>\n' % 'ZeroFNMR Threshold')
+        for name, _, _ in (stats[0].custom_ops if stats else []):
+            sf.write('<th>%s</th>\n' % name)
+            sf.write('<th>%s</th>\n' % (name + ' Threshold'))
+        for name, _ in (stats[0].paucs if stats else []):
+            sf.write('<th>%s</th>\n' % name)
         sf.write('</tr>\n')
         sf.write('</thead>\n')
 
@@ -188,6 +213,11 @@ def generate_html_eer_report(stats, ids, save_file):
             sf.write('<td>%f</td>\n' % st.fmr20_th)
             sf.write('<td>%f</td>\n' % st.fmr10_th)
             sf.write('<td>%f</td>\n' % st.fnmr0_th)
+            for _, value, th in st.custom_ops:
+                sf.write('<td>%f</td>\n' % value)
+                sf.write('<td>%f</td>\n' % th)
+            for _, value in st.paucs:
+                sf.write('<td>%f</td>\n' % value)
             sf.write('<tr>\n')
 
         # Closing table body
@@ -223,6 +253,14 @@ def generate_html_eer_report(stats, ids, save_file):
         sf.write('<tr><td colspan="27"><strong>EER Threshold:</strong> '
                  ' Threshold for which EERlow and EERHigh were calculated'
                  '</td></tr>\n')
+        if any(st.custom_ops for st in stats):
+            sf.write('<tr><td colspan="27"><strong>FMR@X, FNMR@X:</strong> '
+                     ' FNMR (FMR) at the FMR (FNMR) operating point X'
+                     '</td></tr>\n')
+        if any(st.paucs for st in stats):
+            sf.write('<tr><td colspan="27"><strong>pAUC@A-B:</strong> '
+                     ' Partial area under the ROC curve for FMR in [A, B]'
+                     '</td></tr>\n')
 
         # Closing table footer
         sf.write('<tfoot>\n')
@@ -288,6 +326,12 @@ def generate_tex_eer_report(stats, ids, save_file):
         sf.write('\item \\textbf{EER TH:} Threshold for which EERlow'
                  ' and EERHigh were calculated\n')
         sf.write('\item TH: Threshold\n')
+        if any(st.custom_ops for st in stats):
+            sf.write('\item \\textbf{FMR@X, FNMR@X:} FNMR (FMR) at the FMR'
+                     ' (FNMR) operating point X\n')
+        if any(st.paucs for st in stats):
+            sf.write('\item \\textbf{pAUC@A-B:} Partial area under the ROC'
+                     ' curve for FMR in [A, B]\n')
         sf.write('\end{itemize}\n')
 
         # Beginning table
@@ -559,6 +603,54 @@ def generate_tex_eer_report(stats, ids, save_file):
         # Ending table
         sf.write('\end{table}\n')
 
+        if any(st.custom_ops or st.paucs for st in stats):
+            # Beginning table
+            sf.write('\\begin{table}\n')
+
+            # Centering
+            sf.write('\centering\n')
+
+            # Writing table caption
+            sf.write('\caption{%s.}\label{eer_table8}\n' % caption)
+
+            # Beginning tabular block
+            sf.write('\\begin{tabular}{%s}\n' % ('l' * 4))
+
+            # Inserting line
+            sf.write('\hline\n')
+
+            # Inserting table headers
+            sf.write('\\textbf{%s} ' % 'Experiment ID')
+            sf.write('& \\textbf{%s} ' % 'Operating point')
+            sf.write('& \\textbf{%s} ' % 'Value')
+            sf.write('& \\textbf{%s} ' % 'TH')
+            sf.write('\\\\\n')
+
+            for i, st in enumerate(stats):
+                for name, value, th in st.custom_ops:
+                    # Writing operating point values
+                    sf.write('\hline\n')
+                    sf.write('%s' % ids[i])
+                    sf.write(' & %s' % name)
+                    sf.write(' & %f' % value)
+                    sf.write(' & %f' % th)
+                    sf.write('\\\\\n')
+
+                for name, value in st.paucs:
+                    # Writing partial area values
+                    sf.write('\hline\n')
+                    sf.write('%s' % ids[i])
+                    sf.write(' & %s' % name)
+                    sf.write(' & %f' % value)
+                    sf.write(' & -')
+                    sf.write('\\\\\n')
+
+            # Ending tabular block
+            sf.write('\end{tabular}\n')
+
+            # Ending table
+            sf.write('\end{table}\n')
+
         # Writing document end
         sf.write('\end{document}\n')
 
@@ -589,6 +681,10 @@ def generate_csv_eer_report(stats, ids, save_file):
                'FMR20', 'FMR10', 'ZeroFNMR', 'EER_TH', 'ZeroFMR_TH',
                'FMR1000_TH', 'FMR100_TH', 'FMR20_TH', 'FMR10_TH',
                'ZeroFNMR_TH']
+        for name, _, _ in (stats[0].custom_ops if stats else []):
+            row += [name, name + '_TH']
+        for name, _ in (stats[0].paucs if stats else []):
+            row.append(name)
         writer.writerow(row)
 
         for i, st in enumerate(stats):
@@ -599,6 +695,10 @@ def generate_csv_eer_report(stats, ids, save_file):
                    st.eer, st.fmr0, st.fmr1000, st.fmr100, st.fmr20,
                    st.fmr10, st.fnmr0, st.eer_th, st.fmr0_th, st.fmr1000_th,
                    st.fmr100_th, st.fmr20_th, st.fmr10_th, st.fnmr0_th]
+            for _, value, th in st.custom_ops:
+                row += [value, th]
+            for _, value in st.paucs:
+                row.append(value)
             writer.writerow(row)
 
         # Writing legend
@@ -622,9 +722,16 @@ def generate_csv_eer_report(stats, ids, save_file):
         writer.writerow(['_TH: Threshold'])
         writer.writerow(['EER_TH: Threshold for which EERlow and EERHigh were'
                          ' calculated'])
+        if any(st.custom_ops for st in stats):
+            writer.writerow(['FMR@X: FNMR at the FMR operating point X'])
+            writer.writerow(['FNMR@X: FMR at the FNMR operating point X'])
+        if any(st.paucs for st in stats):
+            writer.writerow(['pAUC@A-B: Partial area under the ROC curve for'
+                             ' FMR in [A, B]'])
 
 
-def export_error_rates(fmr, fnmr, filename):
+def export_error_rates(fmr, fnmr, filename, tolerance=None,
+                       log_scale=False):
     """Exports the given error rates to a CSV file
 
     @param fmr: False Match Rates
@@ -633,7 +740,19 @@ def export_error_rates(fmr, fnmr, filename):
     @type fnmr: iterable
     @param filename: The output filename
     @type filename: str
+    @param tolerance: If given, the curve is decimated before being
+        exported, keeping every discarded point within this distance of
+        the exported curve (see eer_stats.decimate_curve)
+    @type tolerance: float
+    @param log_scale: Indicates whether the decimation tolerance is
+        measured in log scale
+    @type log_scale: bool
     """
+    if tolerance is not None:
+        ind = decimate_curve(fmr, fnmr, tolerance, log_scale)
+        fmr = [fmr[i] for i in ind]
+        fnmr = [fnmr[i] for i in ind]
+
     with open(filename, 'w') as sf:
         # Creating CSV writer
         writer = csv.writer(sf)
@@ -642,8 +761,7 @@ def export_error_rates(fmr, fnmr, filename):
         writer.writerow(['FMR', 'FNMR'])
 
         # Writing rates
-        for i in range(len(fmr)):
-            writer.writerow([fmr[i], fnmr[i]])
+        writer.writerows(zip(fmr, fnmr))
 
 
 def generate_eer_report(stats, ids, save_file):
@@ -673,6 +791,49 @@ def generate_eer_report(stats, ids, save_file):
         raise ValueError('Unsupported file format')
 
 
+def generate_bootstrap_report(stats, ids, save_file):
+    """ Generate a CSV file with the given bootstrap confidence intervals
+
+    @param stats: An iterable with instances of the named tuple
+        BootstrapStats
+    @type stats: iterable
+    @param ids: An iterable with an ID (str) for each stat
+    @type ids: iterable
+    @param save_file: The filename used to save the report
+    @type save_file: str
+    """
+    with open(save_file, 'w') as sf:
+
+        # Writing headers
+        writer = csv.writer(sf)
+
+        # Writing package version
+        pkg_version = pkg_resources.require('pyeer')[0].version
+        writer.writerow(['Generated using PyEER ' + pkg_version])
+
+        row = ['Experiment ID', 'Confidence', 'Resamples', 'EER',
+               'EER_CI_low', 'EER_CI_high', 'FMR1000', 'FMR1000_CI_low',
+               'FMR1000_CI_high', 'FMR100', 'FMR100_CI_low',
+               'FMR100_CI_high', 'AUC', 'AUC_CI_low', 'AUC_CI_high']
+        writer.writerow(row)
+
+        for i, bst in enumerate(stats):
+            # Writing stats
+            st = bst.stats
+            row = [ids[i], bst.confidence, bst.resamples,
+                   st.eer, bst.eer_ci[0], bst.eer_ci[1],
+                   st.fmr1000, bst.fmr1000_ci[0], bst.fmr1000_ci[1],
+                   st.fmr100, bst.fmr100_ci[0], bst.fmr100_ci[1],
+                   st.auc, bst.auc_ci[0], bst.auc_ci[1]]
+            writer.writerow(row)
+
+        # Writing legend
+        writer.writerow([])
+        writer.writerow(['Legend:'])
+        writer.writerow(['_CI_low, _CI_high: Bootstrap percentile confidence'
+                         ' interval'])
+
+
 def generate_csv_cmc_report(stats, max_rank, save_file):
     """ Generates a CSV file with the given CMC rank values
 
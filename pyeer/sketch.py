@@ -0,0 +1,344 @@
+# -*- coding:utf-8 -*-
+
+import io
+
+from collections import namedtuple
+
+import numpy as np
+
+from .eer_stats import calculate_roc_counts, get_stats_from_roc,\
+    combine_moments
+
+__copyright__ = 'Copyright 2017'
+__author__ = u'Bsc. Manuel Aguado Martínez'
+
+
+# Default accuracy parameter of the sketches
+DEFAULT_K = 2048
+
+# Ratio between the capacities of consecutive compactors
+CAPACITY_RATIO = 2.0 / 3.0
+
+# Minimum capacity of a compactor
+MIN_CAPACITY = 8
+
+
+SketchErrors = namedtuple('SketchErrors', [
+    'fmr',  # Bound of the absolute error of a false match rate
+    'fnmr',  # Bound of the absolute error of a false non-match rate
+    'confidence',  # Probability of each bound to hold (pointwise)
+])
+
+
+class KLLSketch(object):
+    """Mergeable quantile sketch of a set of scores
+
+    Implementation of the KLL sketch. Scores are stored in a hierarchy of
+    compactors, the items of the compactor at level h representing 2^h
+    scores each. When a compactor exceeds its capacity it is sorted and
+    every other item (starting at a random offset) is promoted to the next
+    level. Memory is bounded by about 3 * k items regardless of the number
+    of summarized scores.
+
+    Each compaction at level h changes the rank of any value by at most
+    2^h, with zero mean. The sketch keeps track of these errors, so both a
+    deterministic bound and a probabilistic (Hoeffding) bound of the rank
+    error are available (see rank_error). The deterministic bound holds
+    for every value at once, the probabilistic one for each value on its
+    own. The typical normalized rank error is about 2 / k.
+
+    Reference:
+    Karnin, Z., Lang, K., & Liberty, E. (2016). Optimal quantile
+    approximation in streams. In 2016 IEEE 57th Annual Symposium on
+    Foundations of Computer Science (FOCS) (pp. 71-78).
+    """
+
+    def __init__(self, k=DEFAULT_K, seed=None):
+        """
+        @param k: Accuracy parameter. Capacity of the top compactor.
+        @type k: int
+        @param seed: Seed of the random compactions
+        @type seed: int
+        """
+        self.k = int(k)
+        self.n = 0
+
+        self._compactors = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+        # Sum of the maximum rank errors and of their squares
+        self._max_error = 0
+        self._sq_error = 0.0
+
+        # Count, mean and sum of squared deviations of the scores
+        self._moments = (0, 0.0, 0.0)
+
+    def __len__(self):
+        return self.n
+
+    @property
+    def size(self):
+        """The number of items retained by the sketch"""
+        return sum(len(c) for c in self._compactors)
+
+    def update(self, scores):
+        """Adds a batch of scores to the sketch
+
+        @param scores: Matching scores
+        @type scores: Union[list, ndarray]
+
+        @returns: The sketch itself
+        @rtype: KLLSketch
+        """
+        scores = np.asarray(scores, dtype=np.float64).ravel()
+        if len(scores) == 0:
+            return self
+
+        mean = scores.mean()
+        self._moments = combine_moments(
+            self._moments, (len(scores), mean, ((scores - mean) ** 2).sum()))
+
+        self.n += len(scores)
+        self._compactors[0] = np.concatenate((self._compactors[0], scores))
+        self._compress()
+
+        return self
+
+    def merge(self, other):
+        """Adds the scores summarized by another sketch
+
+        @param other: The sketch to merge
+        @type other: KLLSketch
+
+        @returns: The sketch itself
+        @rtype: KLLSketch
+
+        @raise ValueError: If the sketches have different k.
+        """
+        if other.k != self.k:
+            raise ValueError('Cannot merge sketches with different k'
+                             ' (%d and %d)' % (self.k, other.k))
+
+        while len(self._compactors) < len(other._compactors):
+            self._compactors.append(np.empty(0))
+
+        for h, compactor in enumerate(other._compactors):
+            self._compactors[h] = np.concatenate((self._compactors[h],
+                                                  compactor))
+
+        self.n += other.n
+        self._max_error += other._max_error
+        self._sq_error += other._sq_error
+        self._moments = combine_moments(self._moments, other._moments)
+        self._compress()
+
+        return self
+
+    def values(self):
+        """Returns the retained items and their weights
+
+        @returns: (unique values sorted in ascending order, weights)
+        @rtype: tuple
+        """
+        values = np.concatenate(self._compactors)
+        weights = np.concatenate([np.full(len(c), 2 ** h, dtype=np.int64)
+                                  for h, c in enumerate(self._compactors)])
+
+        order = np.argsort(values, kind='stable')
+        values = values[order]
+
+        starts = np.flatnonzero(np.append(True, values[1:] != values[:-1]))
+        return values[starts], np.add.reduceat(weights[order], starts)
+
+    def rank(self, value):
+        """Estimates the number of scores lower than the given value
+
+        @param value: A score value
+        @type value: float
+
+        @returns: The estimated rank
+        @rtype: int
+        """
+        return sum(2 ** h * int(np.count_nonzero(c < value))
+                   for h, c in enumerate(self._compactors))
+
+    def quantile(self, q):
+        """Estimates the score at the given normalized rank
+
+        @param q: Normalized rank in [0, 1]
+        @type q: float
+
+        @returns: The estimated quantile
+        @rtype: float
+        """
+        values, weights = self.values()
+        index = np.searchsorted(np.cumsum(weights), q * self.n, side='left')
+        return values[min(index, len(values) - 1)]
+
+    def rank_error(self, confidence=None):
+        """Returns a bound of the absolute rank error of any value
+
+        The deterministic bound holds for all the values simultaneously.
+        The probabilistic (Hoeffding) bound is pointwise: it holds with
+        the given probability for any single value, not for all of them
+        at once.
+
+        @param confidence: The probability of the bound to hold for a
+            given value. If not given, a deterministic bound is returned.
+        @type confidence: float
+
+        @returns: The maximum number of scores by which any rank estimate
+            differs from the true rank
+        @rtype: float
+        """
+        if confidence is None or confidence >= 1:
+            return float(self._max_error)
+
+        # Hoeffding bound for a sum of bounded zero-mean errors
+        bound = np.sqrt(2 * self._sq_error * np.log(2 / (1 - confidence)))
+        return float(min(bound, self._max_error))
+
+    def moments(self):
+        """Returns the exact mean and standard deviation of the scores
+
+        @returns: (mean, standard deviation)
+        @rtype: tuple
+        """
+        n, mean, m2 = self._moments
+        return mean, np.sqrt(m2 / n) if n else 0.0
+
+    def to_bytes(self):
+        """Serializes the sketch
+
+        @returns: The serialized sketch
+        @rtype: bytes
+        """
+        buf = io.BytesIO()
+        header = np.array([self.k, self.n, self._max_error,
+                           self._moments[0]], dtype=np.int64)
+        moments = np.array((self._sq_error,) + self._moments[1:],
+                           dtype=np.float64)
+        compactors = {'c%d' % h: c for h, c in enumerate(self._compactors)}
+
+        np.savez(buf, header=header, moments=moments, **compactors)
+        return buf.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data, seed=None):
+        """Deserializes a sketch
+
+        @param data: A sketch serialized with to_bytes
+        @type data: bytes
+        @param seed: Seed of the random compactions
+        @type seed: int
+
+        @returns: The sketch
+        @rtype: KLLSketch
+        """
+        with np.load(io.BytesIO(data)) as arrays:
+            k, n, max_error, count = arrays['header'].tolist()
+            sq_error, mean, m2 = arrays['moments'].tolist()
+
+            sketch = cls(k, seed)
+            sketch.n = n
+            sketch._max_error = max_error
+            sketch._sq_error = sq_error
+            sketch._moments = (count, mean, m2)
+
+            levels = len([name for name in arrays.files
+                          if name.startswith('c')])
+            sketch._compactors = [arrays['c%d' % h] for h in range(levels)]
+
+        return sketch
+
+    def _capacity(self, h):
+        """Returns the capacity of the compactor at level h"""
+        depth = len(self._compactors) - 1 - h
+        return max(MIN_CAPACITY,
+                   int(np.ceil(self.k * CAPACITY_RATIO ** depth)))
+
+    def _compress(self):
+        """Compacts every compactor exceeding its capacity"""
+        h = 0
+        while h < len(self._compactors):
+            compactor = self._compactors[h]
+
+            if len(compactor) <= self._capacity(h):
+                h += 1
+                continue
+
+            if h == len(self._compactors) - 1:
+                self._compactors.append(np.empty(0))
+
+            compactor = np.sort(compactor)
+
+            # An odd item is kept in the compactor
+            keep = compactor[-1:] if len(compactor) % 2 else compactor[:0]
+            compactor = compactor[:len(compactor) - len(keep)]
+
+            offset = self._rng.integers(2)
+            self._compactors[h] = keep
+            self._compactors[h + 1] = np.concatenate(
+                (self._compactors[h + 1], compactor[offset::2]))
+
+            self._max_error += 2 ** h
+            self._sq_error += 4.0 ** h
+
+            # Capacities depend on the number of compactors
+            h = 0
+
+
+def get_sketch_stats(gsketch, isketch, ds_scores=False, confidence=0.99):
+    """Calculates approximated EER associated statistics from sketches
+
+    FMR and FNMR curves are computed from the weighted items retained
+    by the sketches, so an FMR value differs from the true FMR at the
+    same threshold by at most errors.fmr and an FNMR value differs from
+    the true FNMR by at most errors.fnmr. With confidence=None these
+    bounds are deterministic and hold for every threshold at once.
+    Otherwise they are pointwise (Hoeffding) bounds: each one holds with
+    probability confidence at any single threshold, not simultaneously
+    over the whole curve. Consequently:
+
+    - fmr0, fmr1000, fmr100, fmr20, fmr10: the reported FNMR is within
+      errors.fnmr of the true FNMR at a threshold whose true FMR is within
+      errors.fmr of the operating point.
+    - fnmr0: the reported FMR is within errors.fmr of the true FMR at a
+      threshold whose true FNMR is within errors.fnmr of zero.
+    - eer, eer_low, eer_high: within max(errors.fmr, errors.fnmr).
+
+    Means and standard deviations are exact. Raw scores are not available,
+    so the gen_scores and imp_scores fields of the stats are None.
+
+    @param gsketch: The sketch of the genuine scores
+    @type gsketch: KLLSketch
+    @param isketch: The sketch of the impostor scores
+    @type isketch: KLLSketch
+    @param ds_scores: Indicates whether input scores are
+        dissimilarity scores
+    @type ds_scores: bool
+    @param confidence: The probability of each error bound to hold at a
+        given threshold (pointwise). If None, deterministic bounds holding
+        for every threshold are returned.
+    @type confidence: float
+
+    @returns: (stats, errors)
+    @rtype: tuple
+    """
+    gvalues, gcounts = gsketch.values()
+    ivalues, icounts = isketch.values()
+
+    thrs, fm, fnm = calculate_roc_counts(gvalues, gcounts, ivalues, icounts,
+                                         ds_scores, rates=False)
+
+    gmean, gstd = gsketch.moments()
+    imean, istd = isketch.moments()
+
+    stats = get_stats_from_roc(thrs, fm, fnm, gsketch.n, isketch.n,
+                               gmean, gstd, imean, istd)
+
+    errors = SketchErrors(fmr=isketch.rank_error(confidence) / isketch.n,
+                          fnmr=gsketch.rank_error(confidence) / gsketch.n,
+                          confidence=confidence)
+
+    return stats, errors
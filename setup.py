@@ -17,6 +17,9 @@ setup(
         'console_scripts': [
             'geteerinf = pyeer.eer_info:get_eer_info_cmd',
             'getcmcinf = pyeer.cmc_info:get_cmc_info',
+            'convscores = pyeer.loaders:convert_scores_cmd',
+            'partialcounts = pyeer.partial:get_partial_counts_cmd',
+            'mergecounts = pyeer.partial:merge_partial_counts_cmd',
         ],
     },
 
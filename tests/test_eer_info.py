@@ -0,0 +1,23 @@
+# -*- coding:utf-8 -*-
+import numpy as np
+import pytest
+
+from pyeer.eer_info import get_eer_stats, get_eer_stats_batch
+
+
+@pytest.mark.parametrize('seed', range(5))
+@pytest.mark.parametrize('ds_scores', [False, True])
+def test_batch_auc(seed, ds_scores):
+    # Few distinct values so that the batch curves have many padded points
+    rng = np.random.RandomState(seed)
+    gscores = rng.randint(10, 40, (4, 300)) / 7.0
+    iscores = rng.randint(0, 30, (4, 500)) / 7.0
+    if ds_scores:
+        gscores, iscores = -gscores, -iscores
+
+    batch_stats = get_eer_stats_batch(gscores, iscores, ds_scores)
+
+    for i, st in enumerate(batch_stats):
+        exp_stats = get_eer_stats(gscores[i], iscores[i], ds_scores=ds_scores)
+        assert st.auc == exp_stats.auc
+        assert st.rank_auc == exp_stats.rank_auc
@@ -0,0 +1,64 @@
+# -*- coding:utf-8 -*-
+import numpy as np
+import pytest
+
+from pyeer.eer_stats import calculate_roc, calculate_roc_hist,\
+    calculate_roc_ooc, calculate_rank_auc
+
+
+def brute_force_auc(gscores, iscores, ds_scores):
+    g = np.asarray(gscores, dtype=np.float64)[:, np.newaxis]
+    i = np.asarray(iscores, dtype=np.float64)[np.newaxis, :]
+    better = (g < i) if ds_scores else (g > i)
+    return better.mean() + 0.5 * (g == i).mean()
+
+
+def random_scores(seed, gnumber=300, inumber=500, levels=40):
+    # Few distinct values so that most scores are tied
+    rng = np.random.RandomState(seed)
+    gscores = rng.randint(levels // 4, levels, gnumber)
+    iscores = rng.randint(0, 3 * levels // 4, inumber)
+    return gscores, iscores
+
+
+@pytest.mark.parametrize('seed', range(5))
+@pytest.mark.parametrize('ds_scores', [False, True])
+def test_rank_auc(seed, ds_scores):
+    gscores, iscores = random_scores(seed)
+    if ds_scores:
+        gscores, iscores = -gscores, -iscores
+
+    _, fm, fnm = calculate_roc(gscores, iscores, ds_scores, rates=False)
+    auc = calculate_rank_auc(fm, fnm, len(gscores), len(iscores))
+
+    assert auc == pytest.approx(brute_force_auc(gscores, iscores,
+                                                ds_scores), abs=1e-12)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_rank_auc_out_of_core(seed):
+    gscores, iscores = random_scores(seed)
+    gscores = gscores.astype(np.float64)
+    iscores = iscores.astype(np.float64)
+
+    _, fm, fnm = calculate_roc_ooc(gscores, iscores, rates=False,
+                                   max_memory=1024)
+    auc = calculate_rank_auc(fm, fnm, len(gscores), len(iscores))
+
+    assert auc == pytest.approx(brute_force_auc(gscores, iscores, False),
+                                abs=1e-12)
+
+
+@pytest.mark.parametrize('seed', range(5))
+@pytest.mark.parametrize('ds_scores', [False, True])
+def test_rank_auc_hist(seed, ds_scores):
+    gscores, iscores = random_scores(seed)
+    if ds_scores:
+        gscores, iscores = gscores.max() - gscores, iscores.max() - iscores
+    ihist = np.bincount(iscores)
+
+    _, fm, fnm = calculate_roc_hist(gscores, ihist, ds_scores, rates=False)
+    auc = calculate_rank_auc(fm, fnm, len(gscores), ihist.sum())
+
+    assert auc == pytest.approx(brute_force_auc(gscores, iscores,
+                                                ds_scores), abs=1e-12)